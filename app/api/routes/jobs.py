@@ -4,24 +4,119 @@ created_date:07-05-2025
 modified_date:08-05-2025
 Description:Getting the jobs
 """
-from aiocache import Cache
-from pydantic import BaseModel
-from sqlalchemy import select
+from pydantic import BaseModel, TypeAdapter
+from sqlalchemy import select, func
+from sqlalchemy.ext.asyncio import AsyncSession
 import gzip
 import io
-from typing import Optional, List, Dict
-from fastapi import APIRouter, Depends, Query, HTTPException
-from sqlalchemy.orm import Session
-import time
+import orjson
+from typing import Optional, List, Dict, Literal, Tuple
+from fastapi import APIRouter, Depends, Header, Query, HTTPException, Request, Response
 from app.db.models.job import Job
-from app.schemas.job import JobsData
-from app.db.session import get_db
+from app.db.models.resume import Resume
+from app.schemas.job import JobsData, JobSearchResult, BulkIngestReport, JobFacets, JobBatchItem
+from app.schemas.resumes import CandidateMatch
+from app.db.session import get_async_db
+from app.crud.job import get_job_by_id, get_jobs_by_ids, search_jobs
+from app.core.cache import response_cache, to_json_bytes, list_tag, entity_tag
+from app.core.warmer import Loader, cache_warmer
+from app.core.coalesce import cached_lookup
+from app.core.batch import BATCH_MAX_IDS, batch_get, parse_ids
+from app.core.config import settings
 from app.core.logger import get_logger
+from app.core.pagination import apply_page, next_cursor, NEXT_CURSOR_HEADER
+from app.core.streaming import ndjson_response
+from app.core.counting import count_rows, count_headers, CountMode
+from app.core.etag import (ETAG_HEADER, VERSION_COLUMN, current_item_etag, etag_matches, item_etag,
+                           not_modified, page_etag, rows_etag)
+from app.core.serialization import columns_of, encode_rows, json_bytes_response, project
+from app.db.skills import SkillMatch, parse_skills, skills_filter
+from app.db.salary import salary_filter
+from fastapi.responses import StreamingResponse
+from app.services.matching import matching_engine
+from app.services.job_ingest import ingest_jobs
+from app.services.entities import companies, locations
+from app.services.facets import facet_base, job_facets
 
 router = APIRouter()
-cache = Cache.from_url("memory://")  # In-memory cache
 logger = get_logger("jobs")
 
+# Cache namespace of this router in the shared response cache
+CACHE_NAMESPACE = "jobs"
+JOB_ADAPTER = TypeAdapter(JobsData)
+
+# Upload formats accepted by POST /jobs/bulk, by Content-Type
+BULK_CONTENT_TYPES = {
+    "application/x-ndjson": "ndjson",
+    "application/jsonl": "ndjson",
+    "text/csv": "csv",
+}
+
+# Columns selected by the list and stream endpoints (plain rows, encoded without ORM objects)
+JOB_COLUMNS = columns_of(Job, exclude=("version",))
+# Heavy columns the list, filter and stream endpoints leave out unless asked for with fields=
+JOB_DEFERRED = ("description",)
+
+# Sort orders accepted by the filter endpoint; every key ends with the id so it is unique
+JOB_SORTS = {
+    "id": (Job.id,),
+    "title": (Job.title, Job.id),
+    "company": (Job.company, Job.id),
+    "location": (Job.location, Job.id),
+    "salary": (Job.salary_min, Job.id),  # lowest-paying first, by the bottom of the range
+    "-salary": (Job.salary_max, Job.id),  # highest-paying first, by the top of the range
+}
+
+# Sort orders paged in descending order
+DESCENDING_SORTS = {"-salary"}
+
+
+def _page_headers(jobs: list, sort: str, limit: int) -> Dict[str, str]:
+    """Returns the X-Next-Cursor header when another page may follow."""
+    cursor = next_cursor(jobs, sort, JOB_SORTS[sort], limit)
+    return {NEXT_CURSOR_HEADER: cursor} if cursor else {}
+
+
+async def _apply_filters(
+        db: AsyncSession,
+        query,
+        tittle: Optional[str],
+        company: Optional[str],
+        location: Optional[str],
+        skills: Optional[str],
+        match: SkillMatch,
+        salary_min: Optional[int],
+        salary_max: Optional[int],
+        currency: Optional[str],
+) -> Tuple[object, str]:
+    """Applies the /jobs/filter filters to `query`; returns it with a cache key identifying the filter set."""
+    if salary_min is not None and salary_max is not None and salary_min > salary_max:
+        # Not an empty result: Postgres rejects the inverted range outright
+        raise HTTPException(status_code=422, detail="salary_min must not be greater than salary_max")
+    dialect = db.get_bind().dialect.name
+    if tittle:
+        query = query.filter(Job.title.like(f"%{tittle}%"))
+    if company:
+        # Every spelling of the company resolves to one indexed id; unknown values keep the substring match
+        company_id = await companies.resolve(db, company)
+        query = query.filter(Job.company_id == company_id if company_id is not None
+                             else Job.company.like(f"%{company}%"))
+    if location:
+        location_id = await locations.resolve(db, location)
+        query = query.filter(Job.location_id == location_id if location_id is not None
+                             else Job.location.like(f"%{location}%"))
+    skill_list = parse_skills(skills)
+    if skill_list:
+        # Containment on the GIN-indexed JSONB column (json_each membership on SQLite)
+        query = query.filter(skills_filter(Job.required_skills, skill_list, match, dialect))
+    if salary_min is not None or salary_max is not None:
+        # Range overlap on the GiST-indexed int8range (plain comparisons off Postgres)
+        query = query.filter(salary_filter(Job.salary_min, Job.salary_max, salary_min, salary_max, dialect))
+    if currency:
+        currency = currency.upper()
+        query = query.filter(Job.salary_currency == currency)
+    return query, f"{tittle}_{company}_{location}_{','.join(skill_list)}_{match}_{salary_min}_{salary_max}_{currency}"
+
 ################### 1--------------- get data by  pagination with get users -------------------
 """
   Fetches a all  jobs  from the database.
@@ -37,28 +132,51 @@ logger = get_logger("jobs")
   """
 
 @router.get("/",response_model=List[JobsData],summary="Get all Jobs (paginated)")
-async def get_all_jobs(skip: int = Query(0),limit: int = Query(10000),db: Session = Depends(get_db),):
+async def get_all_jobs(
+        skip: int = Query(0, ge=0),
+        limit: int = Query(10000, ge=1),
+        after_id: Optional[int] = Query(None, description="Return jobs with an id greater than this (keyset mode)"),
+        cursor: Optional[str] = Query(None, description=f"Opaque cursor from the {NEXT_CURSOR_HEADER} header"),
+        fields: Optional[str] = Query(None, description="Comma-separated columns to return, * for all; "
+                                                        "description only when listed"),
+        if_none_match: Optional[str] = Header(None),
+        db: AsyncSession = Depends(get_async_db),
+):
     """
         Fetches a all  jobs by  pagination  from the database or cache.
+        With `after_id`/`cursor` the page seeks on the id index instead of using OFFSET.
+        Only the columns in `fields` (plus id) are read and returned.
+        Answers 304 when the page's ETag matches If-None-Match.
         """
 
-    start_time = time.time()
 
     try:
 
-        logger.info(f"[GET /jobs] skip={skip}, limit={limit}")
+        logger.info(f"[GET /jobs] skip={skip}, limit={limit}, after_id={after_id}, cursor={cursor}, fields={fields}")
+
+        # Fetch jobs from DB, only the requested columns
+        projection = project(JOB_COLUMNS, fields, deferred=JOB_DEFERRED)
+        stmt = apply_page(select(*projection.columns, Job.version), "id", JOB_SORTS["id"],
+                          cursor=cursor, after_id=after_id, skip=skip, limit=limit)
 
-        # Fetch jobs from DB
-        jobs = db.query(Job).order_by(Job.id).offset(skip).limit(limit).all()
+        # With If-None-Match, validate the client's copy from the (id, version) index before reading the page
+        page_key = f"jobs_{skip}_{limit}_{after_id}_{cursor}_{projection.key}"
+        if if_none_match:
+            etag = await page_etag(db, stmt, Job, page_key)
+            if etag_matches(if_none_match, etag):
+                return not_modified(etag)
+
+        jobs = (await db.execute(stmt)).all()
 
         # Log the number of jobs retrieved
         logger.info(f"[GET /Jobs] Retrieved {len(jobs)} jobs from DB")
-        duration = time.time() - start_time  # End timing the request
-        logger.info(f"[GET /Jobs] Retrieved {len(jobs)} jobs in {duration:.3f} seconds")
 
-        # Return the jobs (You may choose to stream compressed data if needed)
-        return jobs
+        # Return the jobs encoded straight from the rows, skipping the response_model pass
+        return json_bytes_response(encode_rows(jobs, without=(VERSION_COLUMN,)),
+                                   {**_page_headers(jobs, "id", limit), ETAG_HEADER: rows_etag(jobs, page_key)})
 
+    except HTTPException:
+        raise
     except Exception as e:
         logger.exception(f"Failed to fetch jobs. Error: {str(e)}")
         raise HTTPException(status_code=500, detail="Could not fetch jobs")
@@ -80,61 +198,221 @@ async def fetch_jobs_with_filters(
         tittle: Optional[str] = Query(None),  # Optional filter for tittle
         company: Optional[str] = Query(None),  # Optional filter for company
         location: Optional[str] = Query(None),  # Optional filter for location
-        skip: int = Query(...),  # Pagination is mandatory, no default value
-        limit: int = Query(...),  # Pagination is mandatory, no default value
-        db: Session = Depends(get_db),  # Dependency for DB session
+        skills: Optional[str] = Query(None),  # Comma-separated required skills, e.g. python,sql
+        match: SkillMatch = Query("all"),  # Jobs requiring all of the skills, or any of them
+        salary_min: Optional[int] = Query(None, ge=0),  # Jobs paying at least this much (top of their range)
+        salary_max: Optional[int] = Query(None, ge=0),  # Jobs paying at most this much (bottom of their range)
+        currency: Optional[str] = Query(None, min_length=3, max_length=3),  # ISO code the salaries are in, e.g. INR
+        skip: int = Query(0, ge=0),  # Offset mode, ignored when a cursor is given
+        limit: int = Query(..., ge=1),  # Page size is mandatory, no default value
+        sort: Literal["id", "title", "company", "location", "salary", "-salary"] = Query("id"),  # Sort key, ties broken by id
+        after_id: Optional[int] = Query(None),  # Keyset mode for sort=id
+        cursor: Optional[str] = Query(None),  # Keyset mode, taken from the X-Next-Cursor header
+        count: CountMode = Query("none"),  # X-Total-Count: exact, estimate (planner/cached) or none
+        fields: Optional[str] = Query(None),  # Columns to return, e.g. id,title,company; * for all (description only when listed)
+        if_none_match: Optional[str] = Header(None),  # ETag of the page the client has; 304 when unchanged
+        db: AsyncSession = Depends(get_async_db),  # Dependency for DB session
 ):
     """
         Fetches All   jobs  with pagination and filter  from the database or cache.
         """
     try:
-        start_time = time.time()
-        logger.info(f"[GET /jobs/filter] Filters: tittle={tittle}, company={company}, location={location}, skip={skip}, limit={limit}")
+        logger.info(f"[GET /jobs/filter] Filters: tittle={tittle}, company={company}, location={location}, skills={skills}, match={match}, salary_min={salary_min}, salary_max={salary_max}, currency={currency}, skip={skip}, limit={limit}, sort={sort}, cursor={cursor}, count={count}, fields={fields}")
+
+        # Start the base query on the requested columns; the sort key is always read, for the cursor
+        projection = project(JOB_COLUMNS, fields, deferred=JOB_DEFERRED,
+                             always=("id", *(column.key for column in JOB_SORTS[sort])))
+        query = select(*projection.columns)
+
+        # Apply filters if provided
+        query, filters = await _apply_filters(db, query, tittle, company, location, skills, match,
+                                              salary_min, salary_max, currency)
+        if sort in ("salary", "-salary"):
+            # Jobs without a parsed salary have no place in a salary order (and NULLs cannot be seeked past)
+            query = query.filter(JOB_SORTS[sort][0].isnot(None))
+
+        # Create cache keys based on the filters (for the total) and the pagination (for the page)
+        filter_key = f"jobs_{filters}"
+        cache_key = f"{filter_key}_{skip}_{limit}_{sort}_{after_id}_{cursor}_{projection.key}"
+
+        # Apply pagination (mandatory), seeking on the sort key when a cursor is given
+        page = apply_page(query.add_columns(Job.version), sort, JOB_SORTS[sort], cursor=cursor,
+                          after_id=after_id, skip=skip, limit=limit, descending=sort in DESCENDING_SORTS)
+
+        async def load_page(session: AsyncSession):
+            # The ETag comes from the rows read, so it always matches the body
+            jobs = (await session.execute(page)).all()
+            logger.info(f"[GET /jobs/filter] Retrieved {len(jobs)} filtered jobs")
+            return (encode_rows(jobs, without=(VERSION_COLUMN,)),
+                    {**_page_headers(jobs, sort, limit), ETAG_HEADER: rows_etag(jobs, cache_key)})
+
+        # An unchanged page costs one index lookup: 304 before the count, the cache, the read and the encoding
+        if if_none_match:
+            etag = await page_etag(db, page, Job, cache_key)
+            if etag_matches(if_none_match, etag):
+                return not_modified(etag)
+
+        # Total matching the filters, only as precise as the client asked for
+        total = await count_rows(db, query, count, f"count_{filter_key}", CACHE_NAMESPACE)
+        logger.info(f"[GET /jobs/filter] Total ({count}): {total}")
+
+        # Check if the serialized page is already cached
+        cached_result = await response_cache.get(cache_key)
+        if cached_result is not None:
+            logger.debug(f"[GET /jobs/filter] Cache hit for filters: {cache_key}")
+            cache_warmer.hit(cache_key)
+            body, headers = cached_result.body, dict(cached_result.headers)
+        else:
+            logger.debug(f"[GET /jobs/filter] Cache miss for filters: {cache_key}")
+            body, headers = await load_page(db)
 
-        # Create a cache key based on the filters and pagination
-        cache_key = f"jobs_{tittle}_{company}_{location}_{skip}_{limit}"
+            # Cache the serialized page so a hit skips the ORM, validation and JSON encoding,
+            # and let the warmer refresh it while it stays popular
+            tags = [CACHE_NAMESPACE, list_tag(CACHE_NAMESPACE)]
+            await response_cache.set(cache_key, body, tags=tags, headers=headers)
+            cache_warmer.track(cache_key, load_page, tags=tags)
 
-        # Check if the result is already cached
-        cached_result = await cache.get(cache_key)
-        if cached_result:
-            logger.info(f"[GET /jobs/filter] Cache hit for filters: {cache_key}")
-            return cached_result
-        else:
-            logger.info(f"[GET /jobs/filter] Cache miss for filters: {cache_key}")
+        headers.update(count_headers(total))
+        return json_bytes_response(body, headers)
 
-            # Start the base query
-            query = db.query(Job).order_by(Job.id)
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.exception(f"Failed to fetch filtered jobs. Error: {str(e)}")
+        raise HTTPException(status_code=500, detail="Could not fetch filtered Jobs")
 
-            # Apply filters if provided
-            if tittle:
-                query = query.filter(Job.tittle.like(f"%{tittle}%"))
-            if company:
-                query = query.filter(Job.company.like(f"%{company}%"))
-            if location:
-                query = query.filter(Job.location.like(f"%{location}%"))
+##################   3. NDJSON export stream   ###########################
+@router.get("/stream", response_class=StreamingResponse, summary="Export all Jobs as NDJSON")
+async def stream_jobs(
+        batch_size: int = Query(1000, ge=1, le=10000),  # Rows fetched from the cursor and written per chunk
+        after_id: Optional[int] = Query(None),  # Resume an interrupted export after this id
+        compress: bool = Query(False, alias="gzip"),  # gzip-frame the stream (Content-Encoding: gzip)
+        fields: Optional[str] = Query(None),  # Columns to export (plus id); * for all, description only when listed
+) -> StreamingResponse:
+    """
+    Streams every job as newline-delimited JSON, in id order, from a server-side cursor with
+    bounded memory. Exports the list page columns by default (no description); `fields=*`
+    exports every column.
+    """
+    logger.info(f"[GET /jobs/stream] batch_size={batch_size}, after_id={after_id}, gzip={compress}, fields={fields}")
+    stmt = select(*project(JOB_COLUMNS, fields, deferred=JOB_DEFERRED).columns).order_by(Job.id)
+    if after_id is not None:
+        stmt = stmt.where(Job.id > after_id)
+    return ndjson_response(stmt, "/jobs/stream", batch_size=batch_size, compress=compress)
 
-            # Get the total count of jobs matching the filters (useful for pagination)
-            total = query.count()
 
-            # Apply pagination (mandatory)
-            jobs = query.offset(skip).limit(limit).all()
+##################   4. ranked full-text search   ###########################
+"""
+  Searches jobs by relevance over title, description, company and location.
+
+  Args:
+      q: Free-text query (words are AND-ed; quotes and `-word` work on Postgres).
+      skip: Number of ranked results to skip.
+      limit: Number of results to return.
+      db: The database session dependency.
+  Returns:
+      Jobs ordered by relevance, with a rank and highlighted title/description snippets.
+
+  Raises:
+      HTTPException: If the search index can not be queried.
+  """
+@router.get("/search", response_model=List[JobSearchResult], summary="Full-text search over Jobs")
+async def search_all_jobs(
+        q: str = Query(..., min_length=1, max_length=200),  # Search text is mandatory
+        skip: int = Query(0, ge=0),
+        limit: int = Query(20, ge=1, le=100),
+        db: AsyncSession = Depends(get_async_db),
+):
+    """
+        Fetches jobs matching `q` from the full-text index, best match first, or from cache.
+        """
+    try:
+        cache_key = f"jobs_search_{q}_{skip}_{limit}"
 
-            logger.info(f"[GET /jobs/filter] Retrieved {len(jobs)} filtered jobs, total matching: {total}")
+        cached_result = await response_cache.get(cache_key)
+        if cached_result is not None:
+            logger.debug(f"[GET /jobs/search] Cache hit for: {cache_key}")
+            cache_warmer.hit(cache_key)
+            return cached_result.to_response()
 
-            # Log the query duration
-            duration = time.time() - start_time
-            logger.info(f"[GET /jobs/filter] Query executed in {duration:.3f} seconds")
+        async def load_results(session: AsyncSession):
+            results = await search_jobs(session, q, skip=skip, limit=limit)
+            logger.info(f"[GET /jobs/search] q={q!r} returned {len(results)} jobs")
+            return orjson.dumps(results), {}
 
-            # Optionally cache the result
-            await cache.set(cache_key, jobs)
+        body, _ = await load_results(db)
+        # Search results are cheap to recompute, keep them briefly
+        tags = [CACHE_NAMESPACE, list_tag(CACHE_NAMESPACE)]
+        await response_cache.set(cache_key, body, ttl=60, tags=tags)
+        cache_warmer.track(cache_key, load_results, ttl=60, tags=tags)
 
-            return jobs
+        return json_bytes_response(body)
 
+    except HTTPException:
+        raise
     except Exception as e:
-        logger.exception(f"Failed to fetch filtered jobs. Error: {str(e)}")
-        raise HTTPException(status_code=500, detail="Could not fetch filtered Jobs")
+        logger.exception(f"Failed to search jobs. Error: {str(e)}")
+        raise HTTPException(status_code=500, detail="Could not search Jobs")
+
+##################   5. best matching candidates for a job   ###########################
+"""
+  Ranks resumes by how well their extracted skills overlap the job's required skills.
+
+  Args:
+      job_id: The ID of the job to match.
+      k: Number of candidates to return.
+      db: The database session dependency.
+  Returns:
+      Up to k resumes with their score and the skills they share with the job.
+
+  Raises:
+      HTTPException: If the job is not found.
+  """
+@router.get("/{job_id}/candidates", response_model=List[CandidateMatch], summary="Best matching resumes for a job")
+async def get_job_candidates(
+        job_id: int,
+        k: int = Query(10, ge=1, le=100),
+        db: AsyncSession = Depends(get_async_db),
+):
+    try:
+        ranked = await matching_engine.candidates_for_job(db, job_id, k)
+        if ranked is None:
+            logger.warning(f"[GET /jobs/{job_id}/candidates] job not found in database.")
+            raise HTTPException(status_code=404, detail="job not found")
 
-##################   3. fetch  job by id            ###########################
+        # Load the k matched resumes in one query
+        ids = [resume_id for resume_id, _, _ in ranked]
+        resumes = {resume.id: resume for resume in (await db.execute(select(Resume).where(Resume.id.in_(ids)))).scalars()}
+
+        results = []
+        for resume_id, score, matched_skills in ranked:
+            resume = resumes.get(resume_id)
+            if resume is None:
+                # Deleted since it was indexed
+                matching_engine.resumes.remove(resume_id)
+                continue
+            results.append({"score": score, "matched_skills": matched_skills, "resume": resume})
+
+        logger.info(f"[GET /jobs/{job_id}/candidates] {len(results)} candidates")
+        return results
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.exception(f"Failed to match candidates for job {job_id}. Error: {str(e)}")
+        raise HTTPException(status_code=500, detail="Could not match candidates")
+
+def _job_loader(job_id: int) -> Loader:
+    """Rebuilds the cached body of one job; shared by the by-id and batch endpoints."""
+    async def load_job(session: AsyncSession):
+        job = await get_job_by_id(session, job_id)
+        if job is None:
+            return None
+        return to_json_bytes(JOB_ADAPTER, job), {ETAG_HEADER: item_etag(CACHE_NAMESPACE, job.id, job.version)}
+    return load_job
+
+
+##################   6. fetch  job by id            ###########################
 
 """
   Fetches a   job details   by the id   from the database.
@@ -149,43 +427,174 @@ async def fetch_jobs_with_filters(
       HTTPException: If the jobs are not find then exception will be  is not found.
   """
 @router.get("/jobs/{job_id}", response_model=JobsData)
-async def read_job(job_id: int, db: Session = Depends(get_db)) -> JobsData:
+async def read_job(job_id: int, if_none_match: Optional[str] = Header(None)) -> JobsData:
     """
-    Fetches a single job by their ID from the database or cache.
+    Fetches a single job by their ID from the cache or the database.
+    Concurrent misses share one query, and an expired entry is served while it is refreshed.
+    Answers 304 when the job's current version matches If-None-Match.
     """
-    start_time = time.time()
 
     cache_key = f"jobs_{job_id}"
-    logger.info(cache_key)
-    cached_result = await cache.get(cache_key)
+    tags = [CACHE_NAMESPACE, entity_tag(CACHE_NAMESPACE, job_id)]
 
-    if cached_result:
-        # Cache hit: log the cache hit
-        logger.info(f"[GET /jobs/{job_id}] Cache hit for job {job_id}. Returning from cache.")
-        return cached_result  # Returning cached result
+    load_job = _job_loader(job_id)
 
-    # If data is not found in cache, query the database
     try:
-        job = db.query(Job).filter(Job.id == job_id).first()
+        # Conditional GET: checked against the stored version, not the (possibly stale) cached copy
+        if if_none_match:
+            etag = await current_item_etag(Job, CACHE_NAMESPACE, job_id)
+            if etag_matches(if_none_match, etag):
+                return not_modified(etag)
+
+        lookup = await cached_lookup(cache_key, load_job, ttl=300, tags=tags)  # Cache the job for 5 minutes
 
-        if not job:
+        if lookup.value is None:
             # If job not found in the database
             logger.warning(f"[GET /jobs/{job_id}] job not found in database.")
             raise HTTPException(status_code=404, detail="job not found")
 
-        # Log that the data was fetched from the database
-        logger.info(f"[GET /job/{job_id}] job fetched from database. Caching result for future requests.")
-
-        # Cache the result for future requests
-        await cache.set(cache_key, job, ttl=300)  # Cache the job for 5 minutes
-
-        # Log the query execution time
-        duration = time.time() - start_time
-        logger.info(f"[GET /job/{job_id}] Query executed in {duration:.3f} seconds. job returned from database.")
+        if lookup.source == "loaded":
+            logger.info(f"[GET /jobs/{job_id}] job fetched from database. Caching result for future requests.")
+            cache_warmer.track(cache_key, load_job, ttl=300, tags=tags, stale_ttl=settings.CACHE_STALE_SECONDS)
+        else:
+            # Cache hit (or a stale copy while it is being refreshed)
+            logger.debug(f"[GET /jobs/{job_id}] Cache {lookup.source} for job {job_id}. Returning from cache.")
+            cache_warmer.hit(cache_key)
 
-        return job
+        return lookup.value.to_response()
 
+    except HTTPException:
+        raise
     except Exception as e:
         # Log the error and raise an HTTPException with a status code of 500 (Internal Server Error)
-        logger.error(f"[GET /job/{job_id}] An error occurred: {str(e)}")
+        logger.error(f"[GET /jobs/{job_id}] An error occurred: {str(e)}")
         raise HTTPException(status_code=500, detail="Internal Server Error")
+
+##################   7. bulk ingest   ###########################
+"""
+  Loads jobs in bulk from an NDJSON or CSV upload streamed in the request body.
+
+  Args:
+      request: The incoming request; its body is read as a stream, never buffered whole.
+      format: "ndjson" or "csv"; taken from the Content-Type header when omitted.
+      db: The database session dependency.
+  Returns:
+      Counts of received, inserted, updated and rejected rows, with the line and reason
+      of each rejected row (up to BULK_MAX_REPORTED_ERRORS).
+
+  Raises:
+      HTTPException: If the format is unknown or the load fails.
+  """
+@router.post("/bulk", response_model=BulkIngestReport, summary="Bulk upsert Jobs from NDJSON or CSV")
+async def bulk_ingest_jobs(
+        request: Request,
+        format: Optional[Literal["ndjson", "csv"]] = Query(None),  # Overrides the Content-Type header
+        db: AsyncSession = Depends(get_async_db),
+):
+    content_type = request.headers.get("content-type", "").split(";")[0].strip().lower()
+    fmt = format or BULK_CONTENT_TYPES.get(content_type)
+    if fmt is None:
+        raise HTTPException(status_code=415, detail="Send NDJSON (application/x-ndjson) or CSV (text/csv)")
+
+    try:
+        logger.info(f"[POST /jobs/bulk] format={fmt}")
+        report = await ingest_jobs(db, request.stream(), fmt)
+
+        # Upserted rows may appear on any cached page (the matching index was updated row by row)
+        if report["inserted"] or report["updated"]:
+            await response_cache.invalidate(CACHE_NAMESPACE)
+
+        return report
+
+    except Exception as e:
+        logger.exception(f"[POST /jobs/bulk] Bulk ingest failed. Error: {str(e)}")
+        raise HTTPException(status_code=500, detail="Could not ingest jobs")
+
+##################   8. facet counts   ###########################
+"""
+  Counts the jobs matching the /jobs/filter filters per company, location, required skill
+  and salary bucket, for rendering filter sidebars in one request.
+
+  Args:
+      tittle, company, location, skills, match, salary_min, salary_max, currency: As on /jobs/filter.
+      top: How many values to return per facet, most frequent first.
+      db: The database session dependency.
+  Returns:
+      The total number of matching jobs and the top values of each facet with their counts.
+
+  Raises:
+      HTTPException: If the counts cannot be computed.
+  """
+@router.get("/facets", response_model=JobFacets, summary="Facet counts for Job filters")
+async def job_facet_counts(
+        tittle: Optional[str] = Query(None),
+        company: Optional[str] = Query(None),
+        location: Optional[str] = Query(None),
+        skills: Optional[str] = Query(None),
+        match: SkillMatch = Query("all"),
+        salary_min: Optional[int] = Query(None, ge=0),
+        salary_max: Optional[int] = Query(None, ge=0),
+        currency: Optional[str] = Query(None, min_length=3, max_length=3),
+        top: int = Query(10, ge=1, le=100),  # Values returned per facet
+        db: AsyncSession = Depends(get_async_db),
+):
+    try:
+        query, filters = await _apply_filters(db, facet_base(), tittle, company, location, skills, match,
+                                              salary_min, salary_max, currency)
+
+        # Facets are list data: cached under the namespace's list tag, so any job write invalidates them
+        cache_key = f"facets_{filters}_{top}"
+        cached_result = await response_cache.get(cache_key)
+        if cached_result is not None:
+            logger.debug(f"[GET /jobs/facets] Cache hit for filters: {cache_key}")
+            cache_warmer.hit(cache_key)
+            return json_bytes_response(cached_result.body)
+
+        async def load_facets(session: AsyncSession):
+            facets = await job_facets(session, query, top)
+            logger.info(f"[GET /jobs/facets] Counted facets of {facets['total']} jobs for filters: {cache_key}")
+            return orjson.dumps(facets), {}
+
+        body, _ = await load_facets(db)
+        tags = [CACHE_NAMESPACE, list_tag(CACHE_NAMESPACE)]
+        await response_cache.set(cache_key, body, tags=tags)
+        cache_warmer.track(cache_key, load_facets, tags=tags)
+        return json_bytes_response(body)
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.exception(f"[GET /jobs/facets] Failed to count facets. Error: {str(e)}")
+        raise HTTPException(status_code=500, detail="Could not count Job facets")
+
+##################   9. batch multi-get   ###########################
+"""
+  Fetches several jobs by id in one request, e.g. for a list of saved jobs.
+
+  Args:
+      ids: Comma-separated job ids (at most BATCH_MAX_IDS).
+      db: The database session dependency.
+  Returns:
+      One item per requested id, in the requested order: {"id", "found", "data"},
+      with found=false and data=null for ids that do not exist.
+
+  Raises:
+      HTTPException: If the ids are malformed or the lookup fails.
+  """
+@router.get("/batch", response_model=List[JobBatchItem], summary="Get several Jobs by id")
+async def batch_jobs(
+        ids: str = Query(..., description=f"Comma-separated job ids, at most {BATCH_MAX_IDS}"),
+        db: AsyncSession = Depends(get_async_db),
+):
+    try:
+        job_ids = parse_ids(ids)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    try:
+        body = await batch_get(db, job_ids, CACHE_NAMESPACE, "jobs_", get_jobs_by_ids, JOB_ADAPTER, _job_loader)
+        logger.info(f"[GET /jobs/batch] Returned {len(job_ids)} jobs")
+        return json_bytes_response(body)
+    except Exception as e:
+        logger.exception(f"[GET /jobs/batch] Failed to fetch jobs {ids}. Error: {str(e)}")
+        raise HTTPException(status_code=500, detail="Could not fetch Jobs")
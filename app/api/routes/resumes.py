@@ -1,37 +1,93 @@
-
-from aiocache import Cache
-from typing import Optional, List, Dict
-from fastapi import APIRouter, Depends, Query, HTTPException
-from sqlalchemy.orm import Session
-import time
+import asyncio
+import os
+from pydantic import TypeAdapter
+from typing import Optional, List, Dict, Literal
+from fastapi import APIRouter, Depends, Header, Query, HTTPException, Response
+from sqlalchemy import select, func, cast, String
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.db.models.job import Job
 from app.db.models.resume import Resume
-from app.schemas.resumes import ResumesData
-from app.db.session import get_db
+from app.schemas.job import JobMatch
+from app.schemas.resumes import ResumesData, ResumeIngestRun, ResumeBatchItem
+from app.db.session import get_async_db, AsyncSessionLocal
+from app.core.config import settings
+from app.crud.resume import get_resume_by_id, get_resumes_by_ids
+from app.core.cache import response_cache, to_json_bytes, list_tag, entity_tag
+from app.core.warmer import Loader, cache_warmer
+from app.core.coalesce import cached_lookup
+from app.core.batch import BATCH_MAX_IDS, batch_get, parse_ids
 from app.core.logger import get_logger
+from app.core.pagination import apply_page, next_cursor, NEXT_CURSOR_HEADER
+from app.core.streaming import ndjson_response
+from app.core.counting import count_rows, count_headers, CountMode
+from app.core.etag import (ETAG_HEADER, VERSION_COLUMN, current_item_etag, etag_matches, item_etag,
+                           not_modified, page_etag, rows_etag)
+from app.core.serialization import columns_of, encode_rows, json_bytes_response, project
+from app.db.skills import SkillMatch, parse_skills, skills_filter
+from fastapi.responses import StreamingResponse
+from app.services.matching import matching_engine
+from app.services.resume_parser import IngestRun, ingest_directory, ingest_runs
 
 router = APIRouter()
-cache = Cache.from_url("memory://")  # In-memory cache
 
 
 logger = get_logger("resumes")
 
+# Cache namespace of this router in the shared response cache
+CACHE_NAMESPACE = "resumes"
+RESUME_ADAPTER = TypeAdapter(ResumesData)
+
+# Columns selected by the list and stream endpoints (plain rows, encoded without ORM objects)
+RESUME_COLUMNS = columns_of(Resume, exclude=("content_hash", "version"))
+
+# Sort orders accepted by the filter endpoint; every key ends with the id so it is unique
+RESUME_SORTS = {
+    "id": (Resume.id,),
+    "user_id": (Resume.user_id, Resume.id),
+}
+
+
+def _page_headers(resumes: list, sort: str, limit: int) -> Dict[str, str]:
+    """Returns the X-Next-Cursor header when another page may follow."""
+    cursor = next_cursor(resumes, sort, RESUME_SORTS[sort], limit)
+    return {NEXT_CURSOR_HEADER: cursor} if cursor else {}
+
 @router.get("/",response_model=List[ResumesData],summary="Get all Resumes")
-async def get_all_resumes(skip: int = Query(0),limit: int = Query(10000),db: Session = Depends(get_db),):
-    start_time = time.time()
+async def get_all_resumes(
+        skip: int = Query(0, ge=0),
+        limit: int = Query(10000, ge=1),
+        after_id: Optional[int] = Query(None, description="Return resumes with an id greater than this (keyset mode)"),
+        cursor: Optional[str] = Query(None, description=f"Opaque cursor from the {NEXT_CURSOR_HEADER} header"),
+        fields: Optional[str] = Query(None, description="Comma-separated columns to return, * for all"),
+        if_none_match: Optional[str] = Header(None),
+        db: AsyncSession = Depends(get_async_db),
+):
     try:
-        logger.info(f"[GET /resumes] skip={skip}, limit={limit}")
+        logger.info(f"[GET /resumes] skip={skip}, limit={limit}, after_id={after_id}, cursor={cursor}, fields={fields}")
+
+        # Fetch Resumes from DB, only the requested columns
+        projection = project(RESUME_COLUMNS, fields)
+        stmt = apply_page(select(*projection.columns, Resume.version), "id", RESUME_SORTS["id"],
+                          cursor=cursor, after_id=after_id, skip=skip, limit=limit)
+
+        # With If-None-Match, validate the client's copy from the (id, version) index before reading the page
+        page_key = f"Resumes_{skip}_{limit}_{after_id}_{cursor}_{projection.key}"
+        if if_none_match:
+            etag = await page_etag(db, stmt, Resume, page_key)
+            if etag_matches(if_none_match, etag):
+                return not_modified(etag)
 
-        # Fetch Resumes from DB
-        Resumes = db.query(Resume).order_by(Resume.id).offset(skip).limit(limit).all()
+        Resumes = (await db.execute(stmt)).all()
 
         # Log the number of users retrieved
         logger.info(f"[GET /Resumes] Retrieved {len(Resumes)} users from DB")
-        duration = time.time() - start_time  # End timing the request
-        logger.info(f"[GET /Resumes] Retrieved {len(Resumes)} users in {duration:.3f} seconds")
 
-        # Return the Resumes (You may choose to stream compressed data if needed)
-        return Resumes
+        # Return the Resumes encoded straight from the rows, skipping the response_model pass
+        return json_bytes_response(encode_rows(Resumes, without=(VERSION_COLUMN,)),
+                                   {**_page_headers(Resumes, "id", limit), ETAG_HEADER: rows_etag(Resumes, page_key)})
 
+    except HTTPException:
+        raise
     except Exception as e:
         logger.exception(f"Failed to fetch Resumes. Error: {str(e)}")
         raise HTTPException(status_code=500, detail="Could not fetch Resumes")
@@ -40,98 +96,275 @@ async def get_all_resumes(skip: int = Query(0),limit: int = Query(10000),db: Ses
 @router.get("/filter", response_model=list[ResumesData], summary="Get Resumes with filters")
 async def fetch_resumes_with_filters(
         user_id: Optional[str] = Query(None),  # Optional filter for user_id
-        extracted_skills: Optional[str] = Query(None),  # Optional filter for extracted_skills
+        skills: Optional[str] = Query(None),  # Comma-separated skills, e.g. python,sql
+        match: SkillMatch = Query("all"),  # Resumes with all of the skills, or any of them
+        extracted_skills: Optional[str] = Query(None),  # Former name of `skills`, kept for existing clients
         experience: Optional[str] = Query(None),  # Optional filter for experience
-        skip: int = Query(...),  # Pagination is mandatory, no default value
-        limit: int = Query(...),  # Pagination is mandatory, no default value
-        db: Session = Depends(get_db),  # Dependency for DB session
+        skip: int = Query(0, ge=0),  # Offset mode, ignored when a cursor is given
+        limit: int = Query(..., ge=1),  # Page size is mandatory, no default value
+        sort: Literal["id", "user_id"] = Query("id"),  # Sort key, ties broken by id
+        after_id: Optional[int] = Query(None),  # Keyset mode for sort=id
+        cursor: Optional[str] = Query(None),  # Keyset mode, taken from the X-Next-Cursor header
+        count: CountMode = Query("none"),  # X-Total-Count: exact, estimate (planner/cached) or none
+        fields: Optional[str] = Query(None),  # Columns to return, e.g. id,user_id,extracted_skills; * for all
+        if_none_match: Optional[str] = Header(None),  # ETag of the page the client has; 304 when unchanged
+        db: AsyncSession = Depends(get_async_db),  # Dependency for DB session
 ):
     try:
-        start_time = time.time()
-        logger.info(f"[GET /Resumes/filter] Filters: user_id={user_id}, extracted_skills={extracted_skills}, experience={experience}, skip={skip}, limit={limit}")
-
-        # Create a cache key based on the filters and pagination
-        cache_key = f"Resumes_{user_id}_{extracted_skills}_{experience}_{skip}_{limit}"
-
-        # Check if the result is already cached
-        cached_result = await cache.get(cache_key)
-        if cached_result:
-            logger.info(f"[GET /Resumes/filter] Cache hit for filters: {cache_key}")
-            return cached_result
+        logger.info(f"[GET /Resumes/filter] Filters: user_id={user_id}, skills={skills or extracted_skills}, match={match}, experience={experience}, skip={skip}, limit={limit}, sort={sort}, cursor={cursor}, count={count}, fields={fields}")
+
+        # Start the base query on the requested columns; the sort key is always read, for the cursor
+        projection = project(RESUME_COLUMNS, fields,
+                             always=("id", *(column.key for column in RESUME_SORTS[sort])))
+        query = select(*projection.columns)
+
+        # Apply filters if provided
+        if user_id:
+            query = query.filter(Resume.user_id.like(f"%{user_id}%"))
+        skill_list = parse_skills(skills or extracted_skills)
+        if skill_list:
+            # Containment on the GIN-indexed JSONB column (json_each membership on SQLite)
+            query = query.filter(skills_filter(Resume.extracted_skills, skill_list, match, db.get_bind().dialect.name))
+        if experience:
+            query = query.filter(cast(Resume.experience, String).like(f"%{experience}%"))
+
+        # Create cache keys based on the filters (for the total) and the pagination (for the page)
+        filter_key = f"Resumes_{user_id}_{','.join(skill_list)}_{match}_{experience}"
+        cache_key = f"{filter_key}_{skip}_{limit}_{sort}_{after_id}_{cursor}_{projection.key}"
+
+        # Apply pagination (mandatory), seeking on the sort key when a cursor is given
+        page = apply_page(query.add_columns(Resume.version), sort, RESUME_SORTS[sort],
+                          cursor=cursor, after_id=after_id, skip=skip, limit=limit)
+
+        async def load_page(session: AsyncSession):
+            # The ETag comes from the rows read, so it always matches the body
+            Resumes = (await session.execute(page)).all()
+            logger.info(f"[GET /Resumes/filter] Retrieved {len(Resumes)} filtered Resumes")
+            return (encode_rows(Resumes, without=(VERSION_COLUMN,)),
+                    {**_page_headers(Resumes, sort, limit), ETAG_HEADER: rows_etag(Resumes, cache_key)})
+
+        # An unchanged page costs one index lookup: 304 before the count, the cache, the read and the encoding
+        if if_none_match:
+            etag = await page_etag(db, page, Resume, cache_key)
+            if etag_matches(if_none_match, etag):
+                return not_modified(etag)
+
+        # Total matching the filters, only as precise as the client asked for
+        total = await count_rows(db, query, count, f"count_{filter_key}", CACHE_NAMESPACE)
+        logger.info(f"[GET /Resumes/filter] Total ({count}): {total}")
+
+        # Check if the serialized page is already cached
+        cached_result = await response_cache.get(cache_key)
+        if cached_result is not None:
+            logger.debug(f"[GET /Resumes/filter] Cache hit for filters: {cache_key}")
+            cache_warmer.hit(cache_key)
+            body, headers = cached_result.body, dict(cached_result.headers)
         else:
-            logger.info(f"[GET /Resumes/filter] Cache miss for filters: {cache_key}")
+            logger.debug(f"[GET /Resumes/filter] Cache miss for filters: {cache_key}")
+            body, headers = await load_page(db)
 
-            # Start the base query
-            query = db.query(Resume).order_by(Resume.id)
+            # Cache the serialized page so a hit skips the ORM, validation and JSON encoding,
+            # and let the warmer refresh it while it stays popular
+            tags = [CACHE_NAMESPACE, list_tag(CACHE_NAMESPACE)]
+            await response_cache.set(cache_key, body, tags=tags, headers=headers)
+            cache_warmer.track(cache_key, load_page, tags=tags)
 
-            # Apply filters if provided
-            if user_id:
-                query = query.filter(Resume.user_id.like(f"%{user_id}%"))
-            if extracted_skills:
-                query = query.filter(Resume.extracted_skills.like(f"%{extracted_skills}%"))
-            if experience:
-                query = query.filter(Resume.experience.like(f"%{experience}%"))
+        headers.update(count_headers(total))
+        return json_bytes_response(body, headers)
 
-            # Get the total count of Resumes matching the filters (useful for pagination)
-            total = query.count()
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.exception(f"Failed to fetch filtered Resumes. Error: {str(e)}")
+        raise HTTPException(status_code=500, detail="Could not fetch filtered Resumes")
 
-            # Apply pagination (mandatory)
-            Resumes = query.offset(skip).limit(limit).all()
 
-            logger.info(f"[GET /Resumes/filter] Retrieved {len(Resumes)} filtered Resumes, total matching: {total}")
+@router.get("/stream", response_class=StreamingResponse, summary="Export all Resumes as NDJSON")
+async def stream_resumes(
+        batch_size: int = Query(1000, ge=1, le=10000),  # Rows fetched from the cursor and written per chunk
+        after_id: Optional[int] = Query(None),  # Resume an interrupted export after this id
+        compress: bool = Query(False, alias="gzip"),  # gzip-frame the stream (Content-Encoding: gzip)
+        fields: Optional[str] = Query(None),  # Columns to export (plus id); all of them by default
+) -> StreamingResponse:
+    """
+    Streams every resume with all fields (or those in `fields`) as newline-delimited JSON,
+    in id order, from a server-side cursor with bounded memory. The parsed text is stored
+    apart (resume_texts) and not part of the export.
+    """
+    logger.info(f"[GET /Resumes/stream] batch_size={batch_size}, after_id={after_id}, gzip={compress}, fields={fields}")
+    stmt = select(*project(RESUME_COLUMNS, fields).columns).order_by(Resume.id)
+    if after_id is not None:
+        stmt = stmt.where(Resume.id > after_id)
+    return ndjson_response(stmt, "/Resumes/stream", batch_size=batch_size, compress=compress)
+
+
+@router.get("/{resume_id}/matches", response_model=List[JobMatch], summary="Best matching jobs for a Resume")
+async def get_resume_matches(
+        resume_id: int,
+        k: int = Query(10, ge=1, le=100),
+        db: AsyncSession = Depends(get_async_db),
+):
+    """
+    Ranks jobs by how well their required skills overlap the resume's extracted skills.
+    """
+    try:
+        ranked = await matching_engine.matches_for_resume(db, resume_id, k)
+        if ranked is None:
+            logger.warning(f"[GET /Resumes/{resume_id}/matches] Resume not found in database.")
+            raise HTTPException(status_code=404, detail="Resume not found")
 
-            # Log the query duration
-            duration = time.time() - start_time
-            logger.info(f"[GET /Resumes/filter] Query executed in {duration:.3f} seconds")
+        # Load the k matched jobs in one query
+        ids = [job_id for job_id, _, _ in ranked]
+        jobs = {job.id: job for job in (await db.execute(select(Job).where(Job.id.in_(ids)))).scalars()}
 
-            # Optionally cache the result
-            await cache.set(cache_key, Resumes)
+        results = []
+        for job_id, score, matched_skills in ranked:
+            job = jobs.get(job_id)
+            if job is None:
+                # Deleted since it was indexed
+                matching_engine.jobs.remove(job_id)
+                continue
+            results.append({"score": score, "matched_skills": matched_skills, "job": job})
 
-            return Resumes
+        logger.info(f"[GET /Resumes/{resume_id}/matches] {len(results)} matches")
+        return results
 
+    except HTTPException:
+        raise
     except Exception as e:
-        logger.exception(f"Failed to fetch filtered Resumes. Error: {str(e)}")
-        raise HTTPException(status_code=500, detail="Could not fetch filtered Resumes")
+        logger.exception(f"Failed to match jobs for Resume {resume_id}. Error: {str(e)}")
+        raise HTTPException(status_code=500, detail="Could not match jobs")
+
+
+def _resume_loader(resume_id: int) -> Loader:
+    """Rebuilds the cached body of one resume; shared by the by-id and batch endpoints."""
+    async def load_resume(session: AsyncSession):
+        resume = await get_resume_by_id(session, resume_id)
+        if resume is None:
+            return None
+        return to_json_bytes(RESUME_ADAPTER, resume), {ETAG_HEADER: item_etag(CACHE_NAMESPACE, resume.id, resume.version)}
+    return load_resume
 
 
 @router.get("/resumes/{resume_id}", response_model=ResumesData)
-async def read_resume(resume_id: int, db: Session = Depends(get_db)) -> ResumesData:
+async def read_resume(resume_id: int, if_none_match: Optional[str] = Header(None)) -> ResumesData:
     """
-    Fetches a single Resume by their ID from the database or cache.
+    Fetches a single Resume by their ID from the cache or the database.
+    Concurrent misses share one query, and an expired entry is served while it is refreshed.
+    Answers 304 when the Resume's current version matches If-None-Match.
     """
-    start_time = time.time()
 
     cache_key = f"Resume_{resume_id}"
-    logger.info(cache_key)
-    cached_result = await cache.get(cache_key)
+    tags = [CACHE_NAMESPACE, entity_tag(CACHE_NAMESPACE, resume_id)]
 
-    if cached_result:
-        # Cache hit: log the cache hit
-        logger.info(f"[GET /Resume/{resume_id}] Cache hit for Resume {resume_id}. Returning from cache.")
-        return cached_result  # Returning cached result
+    load_resume = _resume_loader(resume_id)
 
-    # If data is not found in cache, query the database
     try:
-        user = db.query(Resume).filter(Resume.id == resume_id).first()
+        # Conditional GET: checked against the stored version, not the (possibly stale) cached copy
+        if if_none_match:
+            etag = await current_item_etag(Resume, CACHE_NAMESPACE, resume_id)
+            if etag_matches(if_none_match, etag):
+                return not_modified(etag)
+
+        lookup = await cached_lookup(cache_key, load_resume, ttl=300, tags=tags)  # Cache the resume for 5 minutes
 
-        if not user:
-            # If user not found in the database
+        if lookup.value is None:
+            # If resume not found in the database
             logger.warning(f"[GET /Resume/{resume_id}] Resume not found in database.")
             raise HTTPException(status_code=404, detail="Resume not found")
 
-        # Log that the data was fetched from the database
-        logger.info(f"[GET /Resume/{resume_id}] Resume fetched from database. Caching result for future requests.")
-
-        # Cache the result for future requests
-        await cache.set(cache_key, user, ttl=300)  # Cache the user for 5 minutes
-
-        # Log the query execution time
-        duration = time.time() - start_time
-        logger.info(f"[GET /Resume/{resume_id}] Query executed in {duration:.3f} seconds. User returned from database.")
+        if lookup.source == "loaded":
+            logger.info(f"[GET /Resume/{resume_id}] Resume fetched from database. Caching result for future requests.")
+            cache_warmer.track(cache_key, load_resume, ttl=300, tags=tags, stale_ttl=settings.CACHE_STALE_SECONDS)
+        else:
+            # Cache hit (or a stale copy while it is being refreshed)
+            logger.debug(f"[GET /Resume/{resume_id}] Cache {lookup.source} for Resume {resume_id}. Returning from cache.")
+            cache_warmer.hit(cache_key)
 
-        return user
+        return lookup.value.to_response()
 
+    except HTTPException:
+        raise
     except Exception as e:
         # Log the error and raise an HTTPException with a status code of 500 (Internal Server Error)
         logger.error(f"[GET /Resume/{resume_id}] An error occurred: {str(e)}")
         raise HTTPException(status_code=500, detail="Internal Server Error")
+
+
+@router.get("/batch", response_model=List[ResumeBatchItem], summary="Get several Resumes by id")
+async def batch_resumes(
+        ids: str = Query(..., description=f"Comma-separated resume ids, at most {BATCH_MAX_IDS}"),
+        db: AsyncSession = Depends(get_async_db),
+):
+    """
+    Fetches several resumes by id in one request, in the requested order; ids that do not
+    exist come back as {"id": ..., "found": false, "data": null}.
+    """
+    try:
+        resume_ids = parse_ids(ids)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    try:
+        body = await batch_get(db, resume_ids, CACHE_NAMESPACE, "Resume_", get_resumes_by_ids, RESUME_ADAPTER,
+                               _resume_loader)
+        logger.info(f"[GET /Resumes/batch] Returned {len(resume_ids)} Resumes")
+        return json_bytes_response(body)
+    except Exception as e:
+        logger.exception(f"Failed to fetch Resumes {ids}. Error: {str(e)}")
+        raise HTTPException(status_code=500, detail="Could not fetch Resumes")
+
+
+##################   resume directory ingest   ###########################
+"""
+  Parses a directory of resume files into the resumes table in the background.
+
+  Args:
+      directory: Directory to walk, relative to (and confined to) RESUME_ROOT.
+      reindex: Re-parse already loaded files whose content hash changed.
+      user_id: Owner of files without a user id in their path.
+  Returns:
+      The run, with 202 Accepted; poll GET /Resumes/ingest/{run_id} for progress. Runs are
+      tracked in the process that started them, so with several workers the poll only
+      finds the run on that worker (404 on the others).
+
+  Raises:
+      HTTPException: If the directory is outside RESUME_ROOT or missing, or a run is in progress.
+  """
+@router.post("/ingest", response_model=ResumeIngestRun, status_code=202, summary="Parse a directory of Resumes")
+async def start_resume_ingest(
+        directory: str = Query(".", description="Directory below RESUME_ROOT"),
+        reindex: bool = Query(False),
+        user_id: Optional[int] = Query(None),
+):
+    base = os.path.realpath(settings.RESUME_ROOT)
+    root = os.path.realpath(os.path.join(base, directory))
+    if os.path.commonpath([base, root]) != base:
+        raise HTTPException(status_code=400, detail="Directory must be inside RESUME_ROOT")
+    if not os.path.isdir(root):
+        raise HTTPException(status_code=404, detail="Directory not found")
+    if any(run.status == "running" for run in ingest_runs.values()):
+        raise HTTPException(status_code=409, detail="A resume ingest is already running")
+
+    run = IngestRun(root, reindex)
+    ingest_runs[run.id] = run
+
+    async def ingest():
+        # The request's session is closed once the response is sent, so the run opens its own
+        async with AsyncSessionLocal() as db:
+            await ingest_directory(db, root, reindex=reindex, default_user_id=user_id, run=run)
+        if run.counts["written"]:
+            await response_cache.invalidate(CACHE_NAMESPACE)
+
+    run.task = asyncio.create_task(ingest())
+    logger.info(f"[POST /Resumes/ingest] Started run {run.id} for {root}, reindex={reindex}")
+    return run.to_dict()
+
+
+@router.get("/ingest/{run_id}", response_model=ResumeIngestRun, summary="Progress of a Resume ingest")
+async def get_resume_ingest(run_id: str):
+    run = ingest_runs.get(run_id)
+    if run is None:
+        # Runs live in the worker process that started them
+        raise HTTPException(status_code=404, detail="Ingest run not found on this worker")
+    return run.to_dict()
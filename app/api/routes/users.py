@@ -4,47 +4,80 @@ created_date:05-05-2025
 modified_date:06-05-2025
 Description:Getting the users and user  by id from data base
 """
-from pydantic import BaseModel
-from sqlalchemy import select
-import gzip
-import io
+from pydantic import BaseModel, TypeAdapter
+from sqlalchemy import select, func
 from sqlalchemy.ext.asyncio import AsyncSession
 from typing import AsyncGenerator
-from typing import Optional, List, Dict
-from fastapi import APIRouter, Depends, Query, HTTPException
-from sqlalchemy.orm import Session
-import time,asyncio
+from typing import Optional, List, Dict, Literal
+from fastapi import APIRouter, Depends, Header, Query, HTTPException, Response
+import asyncio
 from app.db.models.user import User
-from app.schemas.user import UserOut
-from app.db.session import get_db
+from app.schemas.user import UserOut, UserBatchItem
+from app.db.session import get_async_db
+from app.crud.user import get_user_by_id, get_users_by_ids
 import json
-from aiocache import Cache
+from app.core.cache import response_cache, to_json_bytes, list_tag, entity_tag
+from app.core.warmer import Loader, cache_warmer
+from app.core.coalesce import cached_lookup
+from app.core.batch import BATCH_MAX_IDS, batch_get, parse_ids
+from app.core.config import settings
 from app.core.logger import get_logger
+from app.core.pagination import apply_page, next_cursor, NEXT_CURSOR_HEADER
+from app.core.streaming import ndjson_response
+from app.core.counting import count_rows, count_headers, CountMode
+from app.core.etag import (ETAG_HEADER, VERSION_COLUMN, current_item_etag, etag_matches, item_etag,
+                           not_modified, page_etag, rows_etag)
+from app.core.serialization import columns_of, encode_rows, json_bytes_response, project
+from fastapi.responses import StreamingResponse
 
 
 user_stream_cache = {}
 router = APIRouter()
 
-# Configure cache
-# TTLCache with a max size of 100 and TTL of 300 seconds (5 minutes)
-# cache = TTLCache(maxsize=100, ttl=800)
-cache = Cache.from_url("memory://")  # In-memory cache
 logger = get_logger("users")
 
+# Cache namespace of this router in the shared response cache
+CACHE_NAMESPACE = "users"
+USER_ADAPTER = TypeAdapter(UserOut)
+
+# Columns selected by the list and stream endpoints (plain rows, encoded without ORM objects)
+USER_COLUMNS = columns_of(User, exclude=("version",))
+
+# Sort orders accepted by the filter endpoint; every key ends with the id so it is unique
+USER_SORTS = {
+    "id": (User.id,),
+    "name": (User.name, User.id),
+    "email": (User.email, User.id),
+    "role": (User.role, User.id),
+}
+
 
 class UserListResponse(BaseModel):
     total: int
     users: List[UserOut]
 
+
+def _page_headers(users: list, sort: str, limit: int) -> Dict[str, str]:
+    """Returns the X-Next-Cursor header when another page may follow."""
+    cursor = next_cursor(users, sort, USER_SORTS[sort], limit)
+    return {NEXT_CURSOR_HEADER: cursor} if cursor else {}
+
 # --- 1. Standard Paginated Fetch ---
 @router.get("/", response_model=List[UserOut], summary="Get all users (paginated)")
 async def fetch_all_users(
-        skip: int = Query(0),
-        limit: int = Query(10000),
-        db: Session = Depends(get_db),
+        skip: int = Query(0, ge=0),
+        limit: int = Query(10000, ge=1),
+        after_id: Optional[int] = Query(None, description="Return users with an id greater than this (keyset mode)"),
+        cursor: Optional[str] = Query(None, description=f"Opaque cursor from the {NEXT_CURSOR_HEADER} header"),
+        fields: Optional[str] = Query(None, description="Comma-separated columns to return (id is always included)"),
+        if_none_match: Optional[str] = Header(None),
+        db: AsyncSession = Depends(get_async_db),
 ):
     """
     Fetches all users from the database.
+    Pages by `skip`/`limit`, or seeks on the id index when `after_id`/`cursor` is given;
+    the cursor of the next page is returned in the X-Next-Cursor header.
+    Answers 304 when the page's ETag matches If-None-Match.
 
     Returns:
         A UserOut model representing the fetched users.
@@ -52,36 +85,35 @@ async def fetch_all_users(
     Raises:
         HTTPException: If the users are not found or db connection will raise error.
     """
-    start_time = time.time()
     try:
-        logger.info(f"[GET /users] skip={skip}, limit={limit}")
+        logger.info(f"[GET /users] skip={skip}, limit={limit}, after_id={after_id}, cursor={cursor}, fields={fields}")
 
-        # Fetch users from DB
-        users = db.query(User).order_by(User.id).offset(skip).limit(limit).all()
+        # Fetch users from DB as plain column rows, only the requested columns
+        projection = project(USER_COLUMNS, fields)
+        stmt = apply_page(select(*projection.columns, User.version), "id", USER_SORTS["id"],
+                          cursor=cursor, after_id=after_id, skip=skip, limit=limit)
 
-        # Log the number of users retrieved
-        logger.info(f"[GET /users] Retrieved {len(users)} users from DB")
-
-        # users_data = [UserOut.from_orm(user).dict() for user in users]
-        users_data = [UserOut.model_validate(user).model_dump() for user in users]  # ✅ Correct for v2
+        # With If-None-Match, validate the client's copy from the (id, version) index before reading the page
+        page_key = f"users_{skip}_{limit}_{after_id}_{cursor}_{projection.key}"
+        if if_none_match:
+            etag = await page_etag(db, stmt, User, page_key)
+            if etag_matches(if_none_match, etag):
+                return not_modified(etag)
 
-        # Serialize to JSON
-        json_data = json.dumps(users_data, indent=2)
+        users = (await db.execute(stmt)).all()
 
-        # Compress the data with Gzip in memory
-        gzip_buffer = io.BytesIO()
-        with gzip.GzipFile(fileobj=gzip_buffer, mode='wb') as gz:
-            gz.write(json_data.encode('utf-8'))
-
-        # Rewind the buffer to the beginning
-        gzip_buffer.seek(0)
+        # Log the number of users retrieved
+        logger.info(f"[GET /users] Retrieved {len(users)} users from DB")
 
-        duration = time.time() - start_time  # End timing the request
-        logger.info(f"[GET /users] Retrieved {len(users)} users in {duration:.3f} seconds")
+        # Encode the rows straight to JSON bytes; compression is left to GZipMiddleware
+        body = encode_rows(users, without=(VERSION_COLUMN,))
 
-        # Return the users (You may choose to stream compressed data if needed)
-        return users  # Or StreamingResponse(gzip_buffer, media_type="application/gzip", headers={...})
+        # Return the encoded page, skipping the response_model pass
+        return json_bytes_response(body, {**_page_headers(users, "id", limit),
+                                          ETAG_HEADER: rows_etag(users, page_key)})
 
+    except HTTPException:
+        raise
     except Exception as e:
         logger.exception(f"Failed to fetch users. Error: {str(e)}")
         raise HTTPException(status_code=500, detail="Could not fetch users")
@@ -92,98 +124,179 @@ async def fetch_users_with_filters(
         name: Optional[str] = Query(None),  # Optional filter for name
         email: Optional[str] = Query(None),  # Optional filter for email
         role: Optional[str] = Query(None),  # Optional filter for role
-        skip: int = Query(...),  # Pagination is mandatory, no default value
-        limit: int = Query(...),  # Pagination is mandatory, no default value
-        db: Session = Depends(get_db),  # Dependency for DB session
+        skip: int = Query(0, ge=0),  # Offset mode, ignored when a cursor is given
+        limit: int = Query(..., ge=1),  # Page size is mandatory, no default value
+        sort: Literal["id", "name", "email", "role"] = Query("id"),  # Sort key, ties broken by id
+        after_id: Optional[int] = Query(None),  # Keyset mode for sort=id
+        cursor: Optional[str] = Query(None),  # Keyset mode, taken from the X-Next-Cursor header
+        count: CountMode = Query("none"),  # X-Total-Count: exact, estimate (planner/cached) or none
+        fields: Optional[str] = Query(None),  # Columns to return, e.g. id,name (id is always included)
+        if_none_match: Optional[str] = Header(None),  # ETag of the page the client has; 304 when unchanged
+        db: AsyncSession = Depends(get_async_db),  # Dependency for DB session
 ):
     """
         Fetches a Users with filter and pagination  from the database or cache.
         """
     try:
-        start_time = time.time()
-        logger.info(f"[GET /users/filter] Filters: name={name}, email={email}, role={role}, skip={skip}, limit={limit}")
-
-        # Create a cache key based on the filters and pagination
-        cache_key = f"users_{name}_{email}_{role}_{skip}_{limit}"
-
-        # Check if the result is already cached
-        cached_result = await cache.get(cache_key)
-        if cached_result:
-            logger.info(f"[GET /users/filter] Cache hit for filters: {cache_key}")
-            return cached_result
+        logger.info(f"[GET /users/filter] Filters: name={name}, email={email}, role={role}, skip={skip}, limit={limit}, sort={sort}, cursor={cursor}, count={count}, fields={fields}")
+
+        # Start the base query on the requested columns; the sort key is always read, for the cursor
+        projection = project(USER_COLUMNS, fields, always=("id", *(column.key for column in USER_SORTS[sort])))
+        query = select(*projection.columns)
+
+        # Apply filters if provided
+        if name:
+            query = query.filter(User.name.like(f"%{name}%"))
+        if email:
+            query = query.filter(User.email.like(f"%{email}%"))
+        if role:
+            query = query.filter(User.role.like(f"%{role}%"))
+
+        # Create cache keys based on the filters (for the total) and the pagination (for the page)
+        filter_key = f"users_{name}_{email}_{role}"
+        cache_key = f"{filter_key}_{skip}_{limit}_{sort}_{after_id}_{cursor}_{projection.key}"
+
+        # Apply pagination (mandatory), seeking on the sort key when a cursor is given
+        page = apply_page(query.add_columns(User.version), sort, USER_SORTS[sort],
+                          cursor=cursor, after_id=after_id, skip=skip, limit=limit)
+
+        async def load_page(session: AsyncSession):
+            # The ETag comes from the rows read, so it always matches the body
+            users = (await session.execute(page)).all()
+            logger.info(f"[GET /users/filter] Retrieved {len(users)} filtered users")
+            return (encode_rows(users, without=(VERSION_COLUMN,)),
+                    {**_page_headers(users, sort, limit), ETAG_HEADER: rows_etag(users, cache_key)})
+
+        # An unchanged page costs one index lookup: 304 before the count, the cache, the read and the encoding
+        if if_none_match:
+            etag = await page_etag(db, page, User, cache_key)
+            if etag_matches(if_none_match, etag):
+                return not_modified(etag)
+
+        # Total matching the filters, only as precise as the client asked for
+        total = await count_rows(db, query, count, f"count_{filter_key}", CACHE_NAMESPACE)
+        logger.info(f"[GET /users/filter] Total ({count}): {total}")
+
+        # Check if the serialized page is already cached
+        cached_result = await response_cache.get(cache_key)
+        if cached_result is not None:
+            logger.debug(f"[GET /users/filter] Cache hit for filters: {cache_key}")
+            cache_warmer.hit(cache_key)
+            body, headers = cached_result.body, dict(cached_result.headers)
         else:
-            logger.info(f"[GET /users/filter] Cache miss for filters: {cache_key}")
-
-            # Start the base query
-            query = db.query(User).order_by(User.id)
-
-            # Apply filters if provided
-            if name:
-                query = query.filter(User.name.like(f"%{name}%"))
-            if email:
-                query = query.filter(User.email.like(f"%{email}%"))
-            if role:
-                query = query.filter(User.role.like(f"%{role}%"))
+            logger.debug(f"[GET /users/filter] Cache miss for filters: {cache_key}")
+            body, headers = await load_page(db)
 
-            # Get the total count of users matching the filters (useful for pagination)
-            total = query.count()
+            # Cache the serialized page so a hit skips the ORM, validation and JSON encoding,
+            # and let the warmer refresh it while it stays popular
+            tags = [CACHE_NAMESPACE, list_tag(CACHE_NAMESPACE)]
+            await response_cache.set(cache_key, body, tags=tags, headers=headers)
+            cache_warmer.track(cache_key, load_page, tags=tags)
 
-            # Apply pagination (mandatory)
-            users = query.offset(skip).limit(limit).all()
+        headers.update(count_headers(total))
+        return json_bytes_response(body, headers)
 
-            logger.info(f"[GET /users/filter] Retrieved {len(users)} filtered users, total matching: {total}")
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.exception(f"Failed to fetch filtered users. Error: {str(e)}")
+        raise HTTPException(status_code=500, detail="Could not fetch filtered users")
 
-            # Log the query duration
-            duration = time.time() - start_time
-            logger.info(f"[GET /users/filter] Query executed in {duration:.3f} seconds")
+# --- 3. NDJSON export stream ---
+@router.get("/stream", response_class=StreamingResponse, summary="Export all users as NDJSON")
+async def stream_users(
+        batch_size: int = Query(1000, ge=1, le=10000),  # Rows fetched from the cursor and written per chunk
+        after_id: Optional[int] = Query(None),  # Resume an interrupted export after this id
+        compress: bool = Query(False, alias="gzip"),  # gzip-frame the stream (Content-Encoding: gzip)
+        fields: Optional[str] = Query(None),  # Columns to export (plus id); all of them by default
+) -> StreamingResponse:
+    """
+    Streams every user with all fields (or those in `fields`) as newline-delimited JSON,
+    in id order, from a server-side cursor with bounded memory.
+    """
+    logger.info(f"[GET /users/stream] batch_size={batch_size}, after_id={after_id}, gzip={compress}, fields={fields}")
+    stmt = select(*project(USER_COLUMNS, fields).columns).order_by(User.id)
+    if after_id is not None:
+        stmt = stmt.where(User.id > after_id)
+    return ndjson_response(stmt, "/users/stream", batch_size=batch_size, compress=compress)
 
-            # Optionally cache the result
-            await cache.set(cache_key, users)
 
-            return users
+def _user_loader(user_id: int) -> Loader:
+    """Rebuilds the cached body of one user; shared by the by-id and batch endpoints."""
+    async def load_user(session: AsyncSession):
+        user = await get_user_by_id(session, user_id)
+        if user is None:
+            return None
+        return to_json_bytes(USER_ADAPTER, user), {ETAG_HEADER: item_etag(CACHE_NAMESPACE, user.id, user.version)}
+    return load_user
 
-    except Exception as e:
-        logger.exception(f"Failed to fetch filtered users. Error: {str(e)}")
-        raise HTTPException(status_code=500, detail="Could not fetch filtered users")
 
-# --- 3. get by  User Id  Endpoint ---
+# --- 4. get by  User Id  Endpoint ---
 @router.get("/users/{user_id}", response_model=UserOut)
-async def read_user(user_id: int, db: Session = Depends(get_db)) -> UserOut:
+async def read_user(user_id: int, if_none_match: Optional[str] = Header(None)) -> UserOut:
     """
-    Fetches a single user by their ID from the database or cache.
+    Fetches a single user by their ID from the cache or the database.
+    Concurrent misses share one query, and an expired entry is served while it is refreshed.
+    Answers 304 when the user's current version matches If-None-Match.
     """
-    start_time = time.time()
 
     cache_key = f"users_{user_id}"
-    cached_result = await cache.get(cache_key)
+    tags = [CACHE_NAMESPACE, entity_tag(CACHE_NAMESPACE, user_id)]
 
-    if cached_result:
-        # Cache hit: log the cache hit
-        logger.info(f"[GET /users/{user_id}] Cache hit for user {user_id}. Returning from cache.")
-        return cached_result  # Returning cached result
+    load_user = _user_loader(user_id)
 
-    # If data is not found in cache, query the database
     try:
-        user = db.query(User).filter(User.id == user_id).first()
+        # Conditional GET: checked against the stored version, not the (possibly stale) cached copy
+        if if_none_match:
+            etag = await current_item_etag(User, CACHE_NAMESPACE, user_id)
+            if etag_matches(if_none_match, etag):
+                return not_modified(etag)
+
+        lookup = await cached_lookup(cache_key, load_user, ttl=300, tags=tags)  # Cache the user for 5 minutes
 
-        if not user:
+        if lookup.value is None:
             # If user not found in the database
             logger.warning(f"[GET /users/{user_id}] User not found in database.")
             raise HTTPException(status_code=404, detail="User not found")
 
-        # Log that the data was fetched from the database
-        logger.info(f"[GET /users/{user_id}] User fetched from database. Caching result for future requests.")
-
-        # Cache the result for future requests
-        await cache.set(cache_key, user, ttl=300)  # Cache the user for 5 minutes
-
-        # Log the query execution time
-        duration = time.time() - start_time
-        logger.info(f"[GET /users/{user_id}] Query executed in {duration:.3f} seconds. User returned from database.")
+        if lookup.source == "loaded":
+            logger.info(f"[GET /users/{user_id}] User fetched from database. Caching result for future requests.")
+            cache_warmer.track(cache_key, load_user, ttl=300, tags=tags, stale_ttl=settings.CACHE_STALE_SECONDS)
+        else:
+            # Cache hit (or a stale copy while it is being refreshed)
+            logger.debug(f"[GET /users/{user_id}] Cache {lookup.source} for user {user_id}. Returning from cache.")
+            cache_warmer.hit(cache_key)
 
-        return user
+        return lookup.value.to_response()
 
+    except HTTPException:
+        raise
     except Exception as e:
         # Log the error and raise an HTTPException with a status code of 500 (Internal Server Error)
         logger.error(f"[GET /users/{user_id}] An error occurred: {str(e)}")
         raise HTTPException(status_code=500, detail="Internal Server Error")
+
+
+# --- 5. Batch multi-get ---
+@router.get("/batch", response_model=List[UserBatchItem], summary="Get several users by id")
+async def batch_users(
+        ids: str = Query(..., description=f"Comma-separated user ids, at most {BATCH_MAX_IDS}"),
+        db: AsyncSession = Depends(get_async_db),
+):
+    """
+    Fetches several users by id in one request, in the requested order; ids that do not
+    exist come back as {"id": ..., "found": false, "data": null}.
+    """
+    try:
+        user_ids = parse_ids(ids)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    try:
+        body = await batch_get(db, user_ids, CACHE_NAMESPACE, "users_", get_users_by_ids, USER_ADAPTER,
+                               _user_loader)
+        logger.info(f"[GET /users/batch] Returned {len(user_ids)} users")
+        return json_bytes_response(body)
+    except Exception as e:
+        logger.error(f"[GET /users/batch] An error occurred: {str(e)}")
+        raise HTTPException(status_code=500, detail="Internal Server Error")
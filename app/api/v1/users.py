@@ -6,25 +6,27 @@ modified_date:06-05-2025
 
 from typing import Optional, List
 from fastapi import APIRouter, Depends, Query, HTTPException
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 import time
 from app.db.models.user import User
 from app.schemas.user import UserOut
-from app.db.session import get_db
+from app.db.session import get_async_db, AsyncSessionLocal
 from app.crud.user import get_users, get_user_by_id
-from app.core.logger import logger
+from app.core.logger import get_logger
 from fastapi.responses import StreamingResponse
 import json
 from starlette.middleware.base import BaseHTTPMiddleware
 
 router = APIRouter()
+logger = get_logger("users")
 
 
 @router.get("/", response_model=list[UserOut])  # The endpoint returns a list of UserOut schema objects
-def list_users(
+async def list_users(
         skip: int = Query(0),  # Query parameter: how many records to skip (for pagination)
         limit: int = Query(10000),  # Query parameter: max number of records to return
-        db: Session = Depends(get_db)  # Dependency injection: get a database session
+        after_id: Optional[int] = Query(None),  # Query parameter: keyset pagination, id of the last user seen
+        db: AsyncSession = Depends(get_async_db)  # Dependency injection: get a database session
 ):
     start_time = time.time()  # Start timer
 
@@ -42,7 +44,7 @@ def list_users(
 
     try:
         logger.info(f"Fetching users with skip={skip}, limit={limit}")  # Log the fetch request
-        users = get_users(db, skip=skip, limit=limit)  # Fetch users
+        users = await get_users(db, skip=skip, limit=limit, after_id=after_id)  # Fetch users
         duration = time.time() - start_time  # End timer
         logger.info(f"Fetched {len(users)} users in {duration:.3f} seconds.")
         return users
@@ -53,13 +55,13 @@ def list_users(
 
 
 @router.get("/stream", response_class=StreamingResponse)
-def stream_users(limit: int = Query(10000), db: Session = Depends(get_db)) -> StreamingResponse:
+async def stream_users(limit: int = Query(10000)) -> StreamingResponse:
     """
     Streams user data in JSON format, with logging of the streaming duration.
+    The generator opens its own session, since the request scope ends before the body is sent.
 
     Args:
         limit: The maximum number of users to fetch per batch.
-        db: The database session dependency.
 
     Returns:
         A StreamingResponse containing user data in JSON format.
@@ -68,29 +70,35 @@ def stream_users(limit: int = Query(10000), db: Session = Depends(get_db)) -> St
     start_time = time.time()
     logger.info("Starting to stream users in JSON format.")
 
-    def generate():
-        skip = 0
+    async def generate():
+        last_id = None
+        streamed = 0
         first_batch_time = None
 
-        while True:
-            # Fetch the next batch of users
-            users = db.query(User).order_by(User.id).offset(skip).limit(limit).all()
+        async with AsyncSessionLocal() as db:
+            while True:
+                # Fetch the next batch of users by seeking past the last id (no OFFSET re-scan)
+                users = await get_users(db, limit=limit, after_id=last_id)
+
+                # If no users are found, break the loop
+                if not users:
+                    break
 
-            # If no users are found, break the loop
-            if not users:
-                break
+                # For the first batch, start the streaming timer
+                if first_batch_time is None:
+                    first_batch_time = time.time()
 
-            # For the first batch, start the streaming timer
-            if first_batch_time is None:
-                first_batch_time = time.time()
+                # Yield each user record as a JSON string
+                for user in users:
+                    yield json.dumps({"id": user.id, "name": user.name}) + "\n"
 
-            # Yield each user record as a JSON string
-            for user in users:
-                yield json.dumps({"id": user.id, "name": user.name}) + "\n"
+                # Remember where this batch ended to fetch the next one
+                last_id = users[-1].id
+                streamed += len(users)
+                logger.info(f"Streaming batch with {len(users)} users. Total streamed: {streamed}")
 
-            # Increment the skip by the limit to fetch the next batch
-            skip += limit
-            logger.info(f"Streaming batch with {len(users)} users. Total streamed: {skip}")
+                # Drop the streamed rows from the identity map so memory stays flat
+                db.expunge_all()
 
         # If streaming has finished, calculate the total duration
         if first_batch_time:
@@ -104,7 +112,7 @@ def stream_users(limit: int = Query(10000), db: Session = Depends(get_db)) -> St
 
 
 @router.get("/users/{user_id}", response_model=UserOut)
-def read_user(user_id: int, db: Session = Depends(get_db)) -> UserOut:
+async def read_user(user_id: int, db: AsyncSession = Depends(get_async_db)) -> UserOut:
     """
     Fetches a single user by their ID from the database.
 
@@ -118,7 +126,7 @@ def read_user(user_id: int, db: Session = Depends(get_db)) -> UserOut:
     Raises:
         HTTPException: If the user with the specified ID is not found.
     """
-    user = get_user_by_id(db, user_id)
+    user = await get_user_by_id(db, user_id)
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
     return user
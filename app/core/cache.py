@@ -0,0 +1,394 @@
+"""
+core/cache.py
+
+Shared response cache for the users, jobs and resumes routers.
+
+Entries hold the already-serialized JSON body (plus the few response headers that go
+with it, such as X-Next-Cursor), so a hit is written straight to the socket without
+touching the ORM, Pydantic or the JSON encoder. The cache is bounded both by TTL and
+by a byte budget (CACHE_MAX_BYTES), evicting least recently used entries first, and
+every entry is tagged so one entity, or a whole namespace, can be invalidated.
+
+With CACHE_L2_URL set, this per-process cache becomes the L1 in front of a store shared
+by all workers (TieredCache, stores in app/core/shared_cache.py): a local miss is
+looked up there before going to the database, writes go to both tiers, and
+invalidations are applied to the shared store and published to every other worker,
+which polls for them every CACHE_L2_POLL_SECONDS.
+"""
+
+import asyncio
+import time
+import uuid
+from collections import OrderedDict
+from typing import Dict, Iterable, NamedTuple, Optional, Set, Tuple
+
+from fastapi import Response
+from pydantic import TypeAdapter
+
+from app.core.config import settings
+from app.core.logger import get_logger
+from app.core.shared_cache import SharedCache, shared_cache_from_url
+
+logger = get_logger("cache")
+
+# Rough per-entry bookkeeping cost (key, entry tuple, tag sets) added to the body size
+ENTRY_OVERHEAD_BYTES = 200
+
+
+class CachedResponse(NamedTuple):
+    """A serialized JSON body and the headers that belong to it."""
+    body: bytes
+    headers: Dict[str, str]
+
+    def to_response(self) -> Response:
+        return Response(content=self.body, media_type="application/json", headers=self.headers)
+
+
+class _Entry(NamedTuple):
+    value: CachedResponse
+    expires_at: float
+    stale_until: float  # kept (for get_stale) until then; equal to expires_at unless set with stale_ttl
+    tags: tuple
+    size: int
+
+
+def to_json_bytes(adapter: TypeAdapter, data) -> bytes:
+    """Validates ORM objects (or dicts) against a response schema and encodes them to JSON bytes."""
+    return adapter.dump_json(adapter.validate_python(data, from_attributes=True))
+
+
+def list_tag(namespace: str) -> str:
+    """Tag carried by every list/filter/search page of a namespace."""
+    return f"{namespace}:list"
+
+
+def entity_tag(namespace: str, entity_id) -> str:
+    """Tag carried by the by-id entry of one entity."""
+    return f"{namespace}:{entity_id}"
+
+
+class ResponseCache:
+    """In-process LRU + TTL cache of serialized responses with a byte budget and tag invalidation."""
+
+    def __init__(self, max_bytes: int, default_ttl: int, max_entry_bytes: Optional[int] = None):
+        self.max_bytes = max_bytes
+        self.default_ttl = default_ttl
+        self.max_entry_bytes = max_entry_bytes or max_bytes // 8
+        self._entries: "OrderedDict[str, _Entry]" = OrderedDict()
+        self._tags: Dict[str, Set[str]] = {}
+        self._bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+        self.rejections = 0
+        self.stale_hits = 0
+        # Bumped by every invalidation, so a background recompute can tell its result may be stale
+        self.generation = 0
+
+    def _entry(self, key: str) -> Optional[_Entry]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if entry.stale_until <= time.monotonic():
+            self._drop(key)
+            self.expirations += 1
+            return None
+        self._entries.move_to_end(key)
+        return entry
+
+    def _lookup(self, key: str) -> Optional[CachedResponse]:
+        entry = self._entry(key)
+        if entry is None or entry.expires_at <= time.monotonic():
+            return None
+        return entry.value
+
+    async def get(self, key: str) -> Optional[CachedResponse]:
+        value = self._lookup(key)
+        if value is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return value
+
+    async def get_many(self, keys: Iterable[str]) -> Dict[str, CachedResponse]:
+        """The fresh entries among `keys`, by key; missing keys are left out."""
+        found = {}
+        for key in keys:
+            value = await self.get(key)
+            if value is not None:
+                found[key] = value
+        return found
+
+    async def get_stale(self, key: str) -> Optional[Tuple[CachedResponse, bool]]:
+        """
+        Like `get`, but also returns entries past their TTL that are still within the
+        `stale_ttl` they were stored with, as (value, is_fresh).
+        """
+        entry = self._entry(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        fresh = entry.expires_at > time.monotonic()
+        if fresh:
+            self.hits += 1
+        else:
+            self.stale_hits += 1
+        return entry.value, fresh
+
+    async def set(
+            self,
+            key: str,
+            body: bytes,
+            ttl: Optional[int] = None,
+            tags: Iterable[str] = (),
+            headers: Optional[Dict[str, str]] = None,
+            stale_ttl: float = 0,
+    ) -> None:
+        """Stores `body` for `ttl` seconds, and for `stale_ttl` more for `get_stale`."""
+        size = len(body) + len(key) + ENTRY_OVERHEAD_BYTES
+        if size > self.max_entry_bytes:
+            # One oversized page would flush most of the cache; serve it uncached instead
+            self.rejections += 1
+            return
+
+        if key in self._entries:
+            self._drop(key)
+        tags = tuple(tags)
+        expires_at = time.monotonic() + (ttl if ttl is not None else self.default_ttl)
+        self._entries[key] = _Entry(CachedResponse(body, dict(headers or {})), expires_at, expires_at + stale_ttl,
+                                    tags, size)
+        self._bytes += size
+        for tag in tags:
+            self._tags.setdefault(tag, set()).add(key)
+
+        while self._bytes > self.max_bytes:
+            oldest = next(iter(self._entries))
+            self._drop(oldest)
+            self.evictions += 1
+
+    def expires_in(self, key: str) -> Optional[float]:
+        """Seconds until `key` expires, or None if it is not cached."""
+        entry = self._entries.get(key)
+        return entry.expires_at - time.monotonic() if entry is not None else None
+
+    async def refresh_local(self, key: str, stale_ttl: float = 0) -> bool:
+        """Picks up a fresher copy of `key` written by another worker; nothing to pick up without an L2."""
+        return False
+
+    async def delete(self, key: str) -> None:
+        if key in self._entries:
+            self._drop(key)
+
+    async def invalidate(self, *tags: str) -> int:
+        """Drops every entry carrying any of `tags`; returns how many were dropped."""
+        self.generation += 1
+        dropped = 0
+        for tag in tags:
+            for key in list(self._tags.get(tag, ())):
+                self._drop(key)
+                dropped += 1
+        self.invalidations += dropped
+        return dropped
+
+    async def invalidate_entity(self, namespace: str, entity_id) -> int:
+        """Drops one entity's by-id entry and the namespace's list pages, which may contain it."""
+        return await self.invalidate(entity_tag(namespace, entity_id), list_tag(namespace))
+
+    async def clear(self) -> None:
+        self.generation += 1
+        self._entries.clear()
+        self._tags.clear()
+        self._bytes = 0
+
+    def _drop(self, key: str) -> None:
+        entry = self._entries.pop(key)
+        self._bytes -= entry.size
+        for tag in entry.tags:
+            keys = self._tags.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._tags[tag]
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "bytes": self._bytes,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "invalidations": self.invalidations,
+            "rejections": self.rejections,
+            "stale_hits": self.stale_hits,
+        }
+
+
+class TieredCache(ResponseCache):
+    """The per-process cache (L1) in front of a store shared by all workers (L2)."""
+
+    def __init__(self, shared: SharedCache, max_bytes: int, default_ttl: int, max_entry_bytes: Optional[int] = None):
+        super().__init__(max_bytes, default_ttl, max_entry_bytes)
+        self.shared = shared
+        self.origin = uuid.uuid4().hex  # tells our own invalidation events apart
+        self._cursor = None
+        self.l2_hits = 0
+        self.l2_errors = 0
+        self.remote_invalidations = 0
+
+    async def _shared(self, operation: str, *args):
+        # The shared store is an optimisation: if it is unreachable, carry on with L1 only
+        try:
+            return await getattr(self.shared, operation)(*args)
+        except Exception as e:
+            self.l2_errors += 1
+            logger.warning(f"[cache] Shared cache {operation} failed: {e}")
+            return None
+
+    async def get(self, key: str) -> Optional[CachedResponse]:
+        value = self._lookup(key)
+        if value is not None:
+            self.hits += 1
+            return value
+        entry = await self._shared("get", key)
+        if entry is None:
+            self.misses += 1
+            return None
+        # Keep it locally for the rest of its lifetime
+        await super().set(key, entry.body, ttl=entry.expires_at - time.time(), tags=entry.tags, headers=entry.headers)
+        self.hits += 1
+        self.l2_hits += 1
+        return CachedResponse(entry.body, entry.headers)
+
+    async def get_many(self, keys: Iterable[str]) -> Dict[str, CachedResponse]:
+        found, missing = {}, []
+        for key in keys:
+            value = self._lookup(key)
+            if value is not None:
+                found[key] = value
+            else:
+                missing.append(key)
+        self.hits += len(found)
+        # One round trip to the shared tier for everything L1 lacks
+        shared = await self._shared("get_many", missing) if missing else None
+        for key, entry in (shared or {}).items():
+            await super().set(key, entry.body, ttl=entry.expires_at - time.time(), tags=entry.tags,
+                              headers=entry.headers)
+            found[key] = CachedResponse(entry.body, entry.headers)
+            self.hits += 1
+            self.l2_hits += 1
+        self.misses += len(missing) - len(shared or {})
+        return found
+
+    async def get_stale(self, key: str) -> Optional[Tuple[CachedResponse, bool]]:
+        if self._entry(key) is not None:
+            return await super().get_stale(key)
+        value = await self.get(key)
+        return (value, True) if value is not None else None
+
+    async def set(
+            self,
+            key: str,
+            body: bytes,
+            ttl: Optional[int] = None,
+            tags: Iterable[str] = (),
+            headers: Optional[Dict[str, str]] = None,
+            stale_ttl: float = 0,
+    ) -> None:
+        if len(body) + len(key) + ENTRY_OVERHEAD_BYTES > self.max_entry_bytes:
+            self.rejections += 1
+            return
+        tags, headers = tuple(tags), dict(headers or {})
+        ttl = ttl if ttl is not None else self.default_ttl
+        # Stale copies are only kept locally; the shared tier holds fresh entries
+        await super().set(key, body, ttl=ttl, tags=tags, headers=headers, stale_ttl=stale_ttl)
+        await self._shared("set", key, body, headers, tags, ttl)
+
+    async def refresh_local(self, key: str, stale_ttl: float = 0) -> bool:
+        entry = await self._shared("get", key)
+        local_expires_in = self.expires_in(key) or 0
+        if entry is None or entry.expires_at - time.time() <= local_expires_in + 1:
+            return False
+        await super().set(key, entry.body, ttl=entry.expires_at - time.time(), tags=entry.tags, headers=entry.headers,
+                          stale_ttl=stale_ttl)
+        return True
+
+    async def delete(self, key: str) -> None:
+        await super().delete(key)
+        await self._shared("delete", key)
+        await self._shared("publish", {"origin": self.origin, "keys": [key]})
+
+    async def invalidate(self, *tags: str) -> int:
+        dropped = await super().invalidate(*tags)
+        await self._shared("invalidate", tags)
+        await self._shared("publish", {"origin": self.origin, "tags": list(tags)})
+        return dropped
+
+    async def clear(self) -> None:
+        await super().clear()
+        await self._shared("clear")
+        await self._shared("publish", {"origin": self.origin, "clear": True})
+
+    async def sync(self) -> int:
+        """Applies the other workers' invalidations to L1; returns how many events were applied."""
+        if self._cursor is None:
+            self._cursor = await self.shared.last_event()
+            return 0
+        self._cursor, events = await self.shared.events(self._cursor)
+        applied = 0
+        for event in events:
+            if event.get("origin") == self.origin:
+                continue
+            if event.get("clear"):
+                await ResponseCache.clear(self)
+            for key in event.get("keys", ()):
+                await ResponseCache.delete(self, key)
+            if event.get("tags"):
+                await ResponseCache.invalidate(self, *event["tags"])
+            applied += 1
+        self.remote_invalidations += applied
+        return applied
+
+    async def run(self) -> None:
+        """Background loop started from the app lifespan: polls for invalidations."""
+        try:
+            while True:
+                try:
+                    await self.sync()
+                except Exception as e:
+                    self.l2_errors += 1
+                    logger.warning(f"[cache] Could not poll shared cache invalidations: {e}")
+                await asyncio.sleep(settings.CACHE_L2_POLL_SECONDS)
+        finally:
+            await self.shared.close()
+
+    def stats(self) -> dict:
+        return {
+            **super().stats(),
+            "l2_backend": self.shared.name,
+            "l2_hits": self.l2_hits,
+            "l2_errors": self.l2_errors,
+            "remote_invalidations": self.remote_invalidations,
+        }
+
+
+def build_response_cache() -> ResponseCache:
+    options = dict(
+        max_bytes=settings.CACHE_MAX_BYTES,
+        default_ttl=settings.CACHE_DEFAULT_TTL,
+        max_entry_bytes=settings.CACHE_MAX_ENTRY_BYTES,
+    )
+    if not settings.CACHE_L2_URL:
+        return ResponseCache(**options)
+    shared = shared_cache_from_url(settings.CACHE_L2_URL, max_bytes=settings.CACHE_L2_MAX_BYTES,
+                                   prefix=settings.CACHE_L2_PREFIX)
+    return TieredCache(shared, **options)
+
+
+# Process-wide cache shared by all routers
+response_cache = build_response_cache()
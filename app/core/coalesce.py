@@ -0,0 +1,113 @@
+"""
+core/coalesce.py
+
+Stampede protection for the by-id lookups (jobs, users and resumes).
+
+- Single flight: concurrent cache misses on one key share a single load. The first
+  request starts it as its own task, with its own DB session, and every other request
+  awaits that task, so a client disconnecting does not fail the others.
+- Stale-while-revalidate: entries are stored with CACHE_STALE_SECONDS of grace after
+  their TTL. A request for an entry in its grace period gets the stale copy straight
+  away and starts a background reload (one per key, through the same single flight).
+  Latency therefore stays flat when a hot key expires. Invalidation still drops the
+  entry outright, so a write is never followed by a stale read.
+"""
+
+import asyncio
+from typing import Awaitable, Callable, Dict, NamedTuple, Optional
+
+from app.core.cache import CachedResponse, ResponseCache, response_cache
+from app.core.config import settings
+from app.core.logger import get_logger
+from app.core.warmer import Loader
+
+logger = get_logger("coalesce")
+
+
+class SingleFlight:
+    """Runs at most one call per key at a time; concurrent callers share its result."""
+
+    def __init__(self):
+        self._flights: Dict[str, asyncio.Task] = {}
+        self.flights = 0
+        self.coalesced = 0
+
+    def start(self, key: str, call: Callable[[], Awaitable]) -> asyncio.Task:
+        """The running call for `key`, or a new one started as a task."""
+        task = self._flights.get(key)
+        if task is not None:
+            self.coalesced += 1
+            return task
+        task = asyncio.ensure_future(call())
+        self._flights[key] = task
+        self.flights += 1
+
+        def done(finished: asyncio.Task) -> None:
+            if self._flights.get(key) is finished:
+                del self._flights[key]
+            if not finished.cancelled() and finished.exception() is not None:
+                logger.debug(f"[coalesce] Load of {key} failed: {finished.exception()}")
+
+        task.add_done_callback(done)
+        return task
+
+    async def do(self, key: str, call: Callable[[], Awaitable]):
+        # shield: a cancelled caller must not cancel the load the other callers wait for
+        return await asyncio.shield(self.start(key, call))
+
+    def stats(self) -> dict:
+        return {"in_flight": len(self._flights), "flights": self.flights, "coalesced": self.coalesced}
+
+
+# Process-wide flights of the by-id lookups
+flights = SingleFlight()
+
+
+class Lookup(NamedTuple):
+    value: Optional[CachedResponse]  # None: the loader found nothing
+    source: str  # "hit", "stale" (served while refreshing) or "loaded"
+
+
+async def cached_lookup(
+        key: str,
+        loader: Loader,
+        ttl: int,
+        tags,
+        cache: ResponseCache = response_cache,
+        session_factory=None,
+) -> Lookup:
+    """
+    Cached by-id lookup with single-flight loading and stale-while-revalidate.
+    - loader: Builds (body, headers) from a session, or None when the entity does not exist
+    """
+    if session_factory is None:
+        from app.db.session import AsyncSessionLocal as session_factory
+
+    tags = tuple(tags)
+    stale_ttl = settings.CACHE_STALE_SECONDS
+
+    async def load() -> Optional[CachedResponse]:
+        if await cache.refresh_local(key, stale_ttl=stale_ttl):
+            # Another worker already reloaded it into the shared cache
+            found = await cache.get_stale(key)
+            if found is not None and found[1]:
+                return found[0]
+        generation = cache.generation
+        async with session_factory() as db:
+            loaded = await loader(db)
+        if loaded is None:
+            await cache.delete(key)
+            return None
+        body, headers = loaded
+        # Invalidated while loading: hand the result to the waiting requests, but do not cache it
+        if cache.generation == generation:
+            await cache.set(key, body, ttl=ttl, tags=tags, headers=headers, stale_ttl=stale_ttl)
+        return CachedResponse(body, dict(headers))
+
+    found = await cache.get_stale(key)
+    if found is not None:
+        value, fresh = found
+        if not fresh:
+            flights.start(key, load)
+        return Lookup(value, "hit" if fresh else "stale")
+    return Lookup(await flights.do(key, load), "loaded")
@@ -0,0 +1,89 @@
+"""
+core/etag.py
+
+ETags and conditional GET (If-None-Match → 304) for users, jobs and resumes.
+
+ETags are derived from the row versions (app/db/versioning.py), not from the body, so
+checking one costs an index lookup instead of building the response:
+
+- A single item's ETag is `W/"<namespace>-<id>-<version>"`; checking it is a primary
+  key lookup of the version.
+- A page's ETag hashes the row count, highest version and first/last id of the page,
+  together with the request's cache key (filters, paging and fields). Any write to a
+  row of the page raises its highest version; rows leaving or joining the page change
+  the count or the ids. A page read selects `version` along with its columns, so its
+  ETag comes from the rows themselves (`rows_etag`). Only a request carrying
+  If-None-Match runs the validator (`page_etag`): the page query on `(id, version)`
+  only, which an `(id, version)` index answers on its own for id-ordered pages.
+
+ETags are weak: they stand for the content, and GZipMiddleware sends the same one
+with the compressed and the identity encoding of a body.
+
+A matching If-None-Match is answered with 304 before the page is counted, read,
+encoded or compressed. The ETag covers the body only; a 304 carries no X-Total-Count,
+the client keeps the one it has.
+"""
+
+import hashlib
+from typing import Dict, Optional, Sequence
+
+from fastapi import Response
+from sqlalchemy import Select, func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+ETAG_HEADER = "ETag"
+# Selected with every list page for its ETag, and left out of the encoded body
+VERSION_COLUMN = "version"
+
+
+def item_etag(namespace: str, item_id: int, version: int) -> str:
+    return f'W/"{namespace}-{item_id}-{version}"'
+
+
+def page_validator(page: Select, model) -> Select:
+    """Count, highest version and first/last id of the rows `page` returns (same filters, order and limit)."""
+    rows = page.with_only_columns(model.id, model.version).subquery()
+    return select(func.count(), func.max(rows.c.version), func.min(rows.c.id), func.max(rows.c.id))
+
+
+def _page_tag(key: str, count: int, version: Optional[int], first_id: Optional[int], last_id: Optional[int]) -> str:
+    digest = hashlib.blake2b(f"{key}|{count}|{version}|{first_id}|{last_id}".encode(), digest_size=12)
+    return f'W/"{digest.hexdigest()}"'
+
+
+async def page_etag(db: AsyncSession, page: Select, model, key: str) -> str:
+    """
+    ETag of a list page from its validator query, without reading the page.
+    - key: Identifies the request (filters, paging and fields), e.g. its cache key
+    """
+    return _page_tag(key, *(await db.execute(page_validator(page, model))).one())
+
+
+def rows_etag(rows: Sequence, key: str) -> str:
+    """ETag of a list page from its rows as read (with `version`); the one `page_etag` gives for them."""
+    if not rows:
+        return _page_tag(key, 0, None, None, None)
+    ids = [row.id for row in rows]
+    return _page_tag(key, len(rows), max(row.version for row in rows), min(ids), max(ids))
+
+
+async def current_item_etag(model, namespace: str, item_id: int) -> Optional[str]:
+    """ETag of the stored item, read in a short session of its own; None if it does not exist."""
+    from app.db.session import AsyncSessionLocal
+
+    async with AsyncSessionLocal() as db:
+        version = await db.scalar(select(model.version).where(model.id == item_id))
+    return None if version is None else item_etag(namespace, item_id, version)
+
+
+def etag_matches(if_none_match: Optional[str], etag: Optional[str]) -> bool:
+    """If-None-Match comparison (weak, as RFC 9110 specifies for it): `*` or any listed tag."""
+    if not if_none_match or etag is None:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    return etag.removeprefix("W/") in {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+
+
+def not_modified(etag: str, headers: Optional[Dict[str, str]] = None) -> Response:
+    return Response(status_code=304, headers={**(headers or {}), ETAG_HEADER: etag})
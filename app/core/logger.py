@@ -1,22 +1,217 @@
+"""
+core/logger.py
+
+Non-blocking, structured logging.
+
+`get_logger` loggers do not write to disk themselves: they hand records to a bounded
+in-memory queue (`QueueHandler`), and a single `QueueListener` thread formats them as
+JSON lines and writes them to rotating files under LOG_DIR, one file per logger name
+as before (log/users.log, log/jobs.log, ...). Logging from a request therefore costs a
+queue put; when the queue is full the record is dropped and counted instead of
+blocking the event loop.
+
+Success-path records (below WARNING) emitted while serving a request are sampled per
+route: the decision is made once per request, so a request is logged completely or
+not at all. Rates come from LOG_SUCCESS_SAMPLE_RATE and LOG_ROUTE_SAMPLE_RATES.
+"""
+
+import atexit
+import copy
 import logging
 import os
+import queue
+import random
+import threading
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+from typing import Dict, Optional
+
+import orjson
+
+from app.core.config import settings
+
+# Attributes every LogRecord has; anything else was passed through `extra=` and is emitted as a field
+_RECORD_ATTRS = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime", "taskName", "force"}
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line: timestamp, level, logger, message, request route and extras."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, tz=timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for key, value in record.__dict__.items():
+            if key not in _RECORD_ATTRS and not key.startswith("_"):
+                entry[key] = value
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry["exc_info"] = record.exc_text
+        return orjson.dumps(entry, default=str).decode()
+
+
+# --- Per-request sampling ---
+
+class RequestLogContext:
+    """Route of the request being served and whether its success logs are sampled in."""
+    __slots__ = ("scope", "_sampled")
+
+    def __init__(self, scope: dict):
+        self.scope = scope
+        self._sampled: Optional[bool] = None
+
+    @property
+    def route(self) -> Optional[str]:
+        route = self.scope.get("route")
+        return getattr(route, "path", None)
+
+    @property
+    def sampled(self) -> bool:
+        if self._sampled is None:
+            # Decided on first use, once routing has resolved the route template
+            rate = settings.LOG_ROUTE_SAMPLE_RATES.get(self.route or "", settings.LOG_SUCCESS_SAMPLE_RATE)
+            self._sampled = rate >= 1.0 or random.random() < rate
+        return self._sampled
+
+
+_request_log_context: ContextVar[Optional[RequestLogContext]] = ContextVar("request_log_context", default=None)
+
+
+def bind_request(scope: dict):
+    """Marks the current context as serving `scope`; returns a token for `unbind_request`."""
+    return _request_log_context.set(RequestLogContext(scope))
+
+
+def unbind_request(token) -> None:
+    _request_log_context.reset(token)
+
+
+class _SamplingFilter(logging.Filter):
+    def filter(self, record: logging.LogRecord) -> bool:
+        context = _request_log_context.get()
+        if context is None:
+            return True
+        if record.levelno < logging.WARNING and not getattr(record, "force", False) and not context.sampled:
+            return False
+        route = context.route
+        if route is not None:
+            record.route = route
+            record.method = context.scope.get("method")
+        return True
+
+
+# --- Queue plumbing ---
+
+_traceback_formatter = logging.Formatter()
+
+
+class _NonBlockingQueueHandler(QueueHandler):
+    """Enqueues without waiting; a full queue drops the record rather than stalling the caller."""
+
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Merge args and render any traceback here; formatting to JSON happens on the listener thread
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = _traceback_formatter.formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class _FilePerLoggerHandler(logging.Handler):
+    """Listener-side handler writing each logger's records to its own rotating file."""
+
+    def __init__(self):
+        super().__init__()
+        self.files: Dict[str, logging.Handler] = {}
+        self.setFormatter(JsonFormatter())
+
+    def add_file(self, logger_name: str, log_file: str) -> None:
+        if logger_name in self.files:
+            return
+        os.makedirs(os.path.dirname(log_file) or ".", exist_ok=True)
+        handler = RotatingFileHandler(log_file, mode="a", maxBytes=settings.LOG_MAX_BYTES,
+                                      backupCount=settings.LOG_BACKUP_COUNT, encoding="utf-8", delay=True)
+        handler.setFormatter(self.formatter)
+        self.files[logger_name] = handler
+
+    def emit(self, record: logging.LogRecord) -> None:
+        handler = self.files.get(record.name)
+        if handler is not None:
+            handler.handle(record)
+
+    def close(self) -> None:
+        for handler in self.files.values():
+            handler.close()
+        super().close()
+
+
+_lock = threading.Lock()
+_queue_handler: Optional[_NonBlockingQueueHandler] = None
+_file_handler: Optional[_FilePerLoggerHandler] = None
+_listener: Optional[QueueListener] = None
+
+
+def _ensure_listener() -> None:
+    global _queue_handler, _file_handler, _listener
+    if _queue_handler is None:
+        _queue_handler = _NonBlockingQueueHandler(queue.Queue(maxsize=settings.LOG_QUEUE_SIZE))
+        _queue_handler.addFilter(_SamplingFilter())
+        _file_handler = _FilePerLoggerHandler()
+        atexit.register(stop_logging)
+    if _listener is None:
+        _listener = QueueListener(_queue_handler.queue, _file_handler, respect_handler_level=False)
+        _listener.start()
+
+
+def stop_logging() -> None:
+    """Writes out everything queued so far and stops the writer thread; `get_logger` restarts it."""
+    global _listener
+    with _lock:
+        if _listener is not None:
+            _listener.stop()
+            _listener = None
+            for handler in _file_handler.files.values():
+                handler.flush()
+
+
+def dropped_records() -> int:
+    """Records dropped because the queue was full."""
+    return _queue_handler.dropped if _queue_handler is not None else 0
+
 
 def get_logger(module_name: str, log_file: str = None):
-    # Create log directory if it doesn't exist
-    log_dir = "log"
-    os.makedirs(log_dir, exist_ok=True)
-
-    # Initialize logger
-    logger = logging.getLogger(module_name)
-    logger.setLevel(logging.DEBUG)
-
-    # Avoid adding multiple handlers to the logger (i.e., duplicate logs)
-    if not logger.handlers:
-        # Default to "app.log" if no log file is provided
-        log_file = log_file or f"{log_dir}/{module_name}.log"
-        file_handler = logging.FileHandler(log_file, mode='a')
-        formatter = logging.Formatter("%(asctime)s - %(levelname)s - %(message)s")
-        file_handler.setFormatter(formatter)
-        logger.addHandler(file_handler)
+    """
+    Returns a queue-backed logger writing JSON lines to `log_file`
+    (default "<LOG_DIR>/<module_name>.log"), at the LOG_LEVEL from settings.
+    """
+    with _lock:
+        _ensure_listener()
+        _file_handler.add_file(module_name, log_file or os.path.join(settings.LOG_DIR, f"{module_name}.log"))
+
+        # Initialize logger
+        logger = logging.getLogger(module_name)
+        logger.setLevel(settings.LOG_LEVEL.upper())
+        logger.propagate = False
+
+        # Avoid adding multiple handlers to the logger (i.e., duplicate logs)
+        if _queue_handler not in logger.handlers:
+            logger.addHandler(_queue_handler)
 
     return logger
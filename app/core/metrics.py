@@ -0,0 +1,240 @@
+"""
+core/metrics.py
+
+Request and database metrics, exposed in the Prometheus text format on /metrics.
+
+- `MetricsMiddleware` times every request (until the last body chunk, so streams are
+  measured in full) and labels it by route template, method and status.
+- SQLAlchemy `before/after_cursor_execute` hooks count the queries and DB time of the
+  request they run in (tracked in a context variable), which is what exposes N+1s.
+- `InstrumentedAsyncQueuePool` records how long each connection checkout waited.
+- Response cache counters are read from `response_cache.stats()` at scrape time.
+
+Metrics are process-local and kept in memory; there is no client library dependency.
+"""
+
+import bisect
+import time
+from contextvars import ContextVar
+from threading import Lock
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+from app.core.logger import get_logger, bind_request, unbind_request, dropped_records
+
+logger = get_logger("metrics")
+
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Latency buckets in seconds, from cache hits to slow exports
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+# Requests issuing more queries than this are logged as likely N+1s
+QUERY_COUNT_WARNING = 20
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class Counter:
+    def __init__(self, name: str, help_text: str, labelnames: Sequence[str] = ()):
+        self.name, self.help, self.labelnames = name, help_text, tuple(labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._lock = Lock()
+
+    def inc(self, *labels: str, amount: float = 1.0) -> None:
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0.0) + amount
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        for labels, value in sorted(self._values.items()):
+            lines.append(f"{self.name}{_format_labels(self.labelnames, labels)} {value:g}")
+        return lines
+
+
+class Histogram:
+    def __init__(self, name: str, help_text: str, buckets: Sequence[float], labelnames: Sequence[str] = ()):
+        self.name, self.help, self.labelnames = name, help_text, tuple(labelnames)
+        self.buckets = tuple(buckets)
+        # labels -> (per-bucket counts incl. +Inf, sum, count)
+        self._series: Dict[Tuple[str, ...], List] = {}
+        self._lock = Lock()
+
+    def observe(self, value: float, *labels: str) -> None:
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][bisect.bisect_left(self.buckets, value)] += 1
+            series[1] += value
+            series[2] += 1
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        for labels, (counts, total, count) in sorted(self._series.items()):
+            cumulative = 0
+            for bound, n in zip(self.buckets + (float("inf"),), counts):
+                cumulative += n
+                le = 'le="+Inf"' if bound == float("inf") else f'le="{bound:g}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, labels, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labelnames, labels)} {total:.6f}")
+            lines.append(f"{self.name}_count{_format_labels(self.labelnames, labels)} {count}")
+        return lines
+
+
+REQUESTS = Counter("http_requests_total", "HTTP requests by route, method and status.",
+                   ("method", "route", "status"))
+REQUEST_LATENCY = Histogram("http_request_duration_seconds", "Time from request to last body byte.",
+                            LATENCY_BUCKETS, ("method", "route"))
+REQUEST_QUERIES = Histogram("http_request_db_queries", "SQL statements executed per request.",
+                            QUERY_COUNT_BUCKETS, ("method", "route"))
+REQUEST_DB_TIME = Histogram("http_request_db_seconds", "Time spent in SQL statements per request.",
+                            LATENCY_BUCKETS, ("method", "route"))
+QUERY_LATENCY = Histogram("db_query_duration_seconds", "Duration of individual SQL statements.",
+                          LATENCY_BUCKETS)
+POOL_WAIT = Histogram("db_pool_checkout_wait_seconds", "Time spent waiting for a pooled connection.",
+                      LATENCY_BUCKETS)
+
+METRICS = [REQUESTS, REQUEST_LATENCY, REQUEST_QUERIES, REQUEST_DB_TIME, QUERY_LATENCY, POOL_WAIT]
+
+
+class RequestStats:
+    """Per-request query counters, shared with the SQLAlchemy hooks through a context variable."""
+    __slots__ = ("queries", "db_time")
+
+    def __init__(self):
+        self.queries = 0
+        self.db_time = 0.0
+
+
+_request_stats: ContextVar[Optional[RequestStats]] = ContextVar("request_stats", default=None)
+
+
+# --- SQLAlchemy instrumentation ---
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_start_time", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - conn.info["query_start_time"].pop()
+    QUERY_LATENCY.observe(elapsed)
+    stats = _request_stats.get()
+    if stats is not None:
+        stats.queries += 1
+        stats.db_time += elapsed
+
+
+def instrument_engine(sync_engine) -> None:
+    """Attaches the query hooks to a (sync) Engine; for an AsyncEngine pass `.sync_engine`."""
+    if not event.contains(sync_engine, "before_cursor_execute", _before_cursor_execute):
+        event.listen(sync_engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(sync_engine, "after_cursor_execute", _after_cursor_execute)
+
+
+class InstrumentedAsyncQueuePool(AsyncAdaptedQueuePool):
+    """The async engine's queue pool, timing how long each checkout waits for a connection."""
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            POOL_WAIT.observe(time.perf_counter() - start)
+
+
+# --- ASGI middleware ---
+
+class MetricsMiddleware:
+    """Records latency, status and DB usage of every HTTP request under its route template."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = RequestStats()
+        token = _request_stats.set(stats)
+        log_token = bind_request(scope)
+        start = time.perf_counter()
+        status = "500"
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = str(message["status"])
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            duration = time.perf_counter() - start
+            route = scope.get("route")
+            # Label by template (/users/users/{user_id}), never by raw path, to bound cardinality
+            path = getattr(route, "path", None) or "unmatched"
+            method = scope["method"]
+            REQUESTS.inc(method, path, status)
+            REQUEST_LATENCY.observe(duration, method, path)
+            REQUEST_QUERIES.observe(stats.queries, method, path)
+            REQUEST_DB_TIME.observe(stats.db_time, method, path)
+            # Success lines are sampled per route; errors are always written
+            logger.info(f"[{method} {path}] {status} in {duration:.3f} seconds, "
+                        f"{stats.queries} queries, {stats.db_time:.3f} seconds in DB",
+                        extra={"status": int(status), "duration_ms": round(duration * 1000, 3),
+                               "queries": stats.queries, "db_ms": round(stats.db_time * 1000, 3),
+                               "force": not status.startswith(("2", "3"))})
+            if stats.queries > QUERY_COUNT_WARNING:
+                logger.warning(f"[{method} {path}] {stats.queries} queries in one request, possible N+1")
+            unbind_request(log_token)
+            _request_stats.reset(token)
+
+
+# --- Exposition ---
+
+def _gauge(name: str, help_text: str, value: float) -> List[str]:
+    return [f"# HELP {name} {help_text}", f"# TYPE {name} gauge", f"{name} {value:g}"]
+
+
+def render_metrics(pool=None, cache_stats: Optional[dict] = None, warmer_stats: Optional[dict] = None) -> str:
+    """Prometheus text exposition of every metric, plus pool and cache gauges read now."""
+    lines: List[str] = []
+    for metric in METRICS:
+        lines.extend(metric.render())
+    if pool is not None and hasattr(pool, "checkedout"):
+        lines.extend(_gauge("db_pool_checked_out", "Connections currently checked out.", pool.checkedout()))
+        lines.extend(_gauge("db_pool_size", "Configured pool size.", pool.size()))
+        lines.extend(_gauge("db_pool_overflow", "Connections open beyond the pool size.", max(pool.overflow(), 0)))
+    lines.append("# TYPE log_records_dropped_total counter")
+    lines.append(f"log_records_dropped_total {dropped_records()}")
+    if cache_stats is not None:
+        for key in ("hits", "misses", "evictions", "expirations", "invalidations", "rejections"):
+            lines.append(f"# TYPE cache_{key}_total counter")
+            lines.append(f"cache_{key}_total {cache_stats[key]}")
+        lines.extend(_gauge("cache_hit_ratio", "Response cache hits over lookups.", cache_stats["hit_ratio"]))
+        lines.extend(_gauge("cache_entries", "Entries in the response cache.", cache_stats["entries"]))
+        lines.extend(_gauge("cache_bytes", "Bytes held by the response cache.", cache_stats["bytes"]))
+        for key in ("l2_hits", "l2_errors", "remote_invalidations"):
+            if key in cache_stats:
+                lines.append(f"# TYPE cache_{key}_total counter")
+                lines.append(f"cache_{key}_total {cache_stats[key]}")
+    if warmer_stats is not None:
+        for key in ("warmed", "adopted", "discarded", "skipped_rounds"):
+            lines.append(f"# TYPE cache_warmer_{key}_total counter")
+            lines.append(f"cache_warmer_{key}_total {warmer_stats[key]}")
+        lines.extend(_gauge("cache_warmer_tracked", "Cache keys the warmer can rebuild.", warmer_stats["tracked"]))
+    return "\n".join(lines) + "\n"
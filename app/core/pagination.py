@@ -0,0 +1,107 @@
+"""
+core/pagination.py
+
+Keyset (cursor) pagination helpers shared by the list and filter endpoints.
+
+Instead of `OFFSET n`, which makes Postgres scan and discard every skipped row,
+a page is fetched by seeking past the sort key of the last row already seen
+(`WHERE (sort_col, id) > (:last_sort, :last_id)`), so every page costs the same
+index range scan no matter how deep it is. The position is handed back to the
+client as an opaque `next_cursor`.
+"""
+
+import base64
+import binascii
+import json
+from typing import Any, List, Optional, Sequence
+
+from fastapi import HTTPException
+from sqlalchemy import tuple_
+
+# Response header carrying the cursor for the next page
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+def encode_cursor(sort: str, values: Sequence[Any]) -> str:
+    """
+    Encodes the sort key of the last row of a page into an opaque cursor.
+    - sort: Name of the sort order the cursor belongs to
+    - values: Sort column values of the last row, ending with its id
+    """
+    payload = json.dumps({"s": sort, "v": list(values)}, separators=(",", ":"), default=str)
+    return base64.urlsafe_b64encode(payload.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str, sort: str) -> List[Any]:
+    """
+    Decodes a cursor produced by `encode_cursor`.
+
+    Raises:
+        HTTPException: 400 if the cursor is malformed or was issued for another sort order.
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        values = payload["v"]
+        cursor_sort = payload["s"]
+    except (binascii.Error, ValueError, KeyError, TypeError, UnicodeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+    if cursor_sort != sort or not isinstance(values, list):
+        raise HTTPException(status_code=400, detail="Cursor does not match the requested sort order")
+    return values
+
+
+def seek(query, columns: Sequence, values: Sequence[Any], descending: bool = False):
+    """
+    Restricts a query to the rows strictly after `values` in `columns` order.
+    Works for both ORM `Query` and `select()` statements.
+    """
+    if len(columns) != len(values):
+        raise HTTPException(status_code=400, detail="Cursor does not match the requested sort order")
+
+    if len(columns) == 1:
+        key, value = columns[0], values[0]
+    else:
+        key, value = tuple_(*columns), tuple_(*values)
+    return query.filter(key < value if descending else key > value)
+
+
+def apply_page(
+        query,
+        sort: str,
+        columns: Sequence,
+        *,
+        cursor: Optional[str] = None,
+        after_id: Optional[int] = None,
+        skip: int = 0,
+        limit: int = 100,
+        descending: bool = False,
+):
+    """
+    Orders and pages a query.
+
+    `cursor` (or `after_id` for the plain id order) switches to keyset mode; without
+    either the legacy `skip`/`limit` offset mode is used so existing clients keep working.
+    """
+    if cursor:
+        query = seek(query, columns, decode_cursor(cursor, sort), descending)
+    elif after_id is not None:
+        if len(columns) != 1:
+            raise HTTPException(status_code=400, detail="after_id can only be used with sort=id")
+        query = seek(query, columns, [after_id], descending)
+    elif skip:
+        query = query.offset(skip)
+
+    order = [column.desc() for column in columns] if descending else list(columns)
+    return query.order_by(*order).limit(limit)
+
+
+def next_cursor(rows: Sequence, sort: str, columns: Sequence, limit: int) -> Optional[str]:
+    """
+    Returns the cursor for the page after `rows`, or None when this was the last page.
+    """
+    if not rows or len(rows) < limit:
+        return None
+    last = rows[-1]
+    return encode_cursor(sort, [getattr(last, column.key) for column in columns])
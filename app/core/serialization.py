@@ -0,0 +1,81 @@
+"""
+core/serialization.py
+
+Fast JSON encoding for list endpoints.
+
+List handlers select plain columns (row tuples, no ORM instances) and encode them
+straight to bytes with orjson. The result is returned as a ready `Response`, so
+FastAPI does not run the rows through the `response_model` a second time; the
+response models stay on the routes for the OpenAPI schema only.
+
+Lists, filters and streams take a `fields=` projection (`project`), so only the
+requested columns are read from the database and encoded. List pages leave heavy text
+columns (a job's `description`) out unless they are asked for.
+"""
+
+from typing import Dict, Iterable, NamedTuple, Optional, Sequence, Tuple
+
+import orjson
+from fastapi import HTTPException, Response
+
+# `fields=*` selects every column, deferred ones included
+ALL_FIELDS = "*"
+
+
+class Projection(NamedTuple):
+    columns: tuple
+    key: str  # names the selection in cache keys
+
+
+def columns_of(model, exclude: Iterable[str] = ()) -> tuple:
+    """The mapped table columns of a model, for `select(*columns_of(Model))`, minus `exclude`."""
+    exclude = set(exclude)
+    return tuple(column for column in model.__table__.columns if column.key not in exclude)
+
+
+def project(
+        columns: Sequence,
+        fields: Optional[str],
+        deferred: Iterable[str] = (),
+        always: Iterable[str] = ("id",),
+) -> Projection:
+    """
+    The columns selected for a `fields=` parameter, in their usual order.
+    - columns: Every column the endpoint can return
+    - fields: Comma-separated column names; `*` for all; None for all but `deferred`
+    - always: Selected whatever `fields` says (the id, and the sort key the cursor is built from)
+    Raises a 400 HTTPException for a name that is not one of `columns`.
+    """
+    available = {column.key for column in columns}
+    if fields is None:
+        wanted = available - set(deferred)
+    elif fields.strip() == ALL_FIELDS:
+        wanted = available
+    else:
+        wanted = {name.strip() for name in fields.split(",") if name.strip()}
+        unknown = sorted(wanted - available)
+        if unknown:
+            raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(unknown)}")
+    wanted |= set(always)
+    selected = tuple(column for column in columns if column.key in wanted)
+    return Projection(selected, ",".join(column.key for column in selected))
+
+
+def encode_rows(rows: Iterable, without: Tuple[str, ...] = ()) -> bytes:
+    """Encodes result rows (selected columns) as a JSON array of objects, leaving out the `without` columns."""
+    items = [row._asdict() for row in rows]
+    if without:
+        for item in items:
+            for column in without:
+                item.pop(column, None)
+    return orjson.dumps(items)
+
+
+def encode_row_line(row) -> bytes:
+    """Encodes one result row as an NDJSON line."""
+    return orjson.dumps(row._asdict(), option=orjson.OPT_APPEND_NEWLINE)
+
+
+def json_bytes_response(body: bytes, headers: Optional[Dict[str, str]] = None) -> Response:
+    """Returns already-encoded JSON bytes without any further validation or encoding."""
+    return Response(content=body, media_type="application/json", headers=headers)
@@ -0,0 +1,394 @@
+"""
+core/shared_cache.py
+
+Shared (L2) stores behind the per-process response cache (see TieredCache in
+app/core/cache.py), selected by CACHE_L2_URL:
+- `sqlite:////path/to/cache.db`: an embedded store in one file, shared by every worker
+  on the host. WAL mode lets readers run alongside the single writer and reads go
+  through a memory map of the file, so a hit costs no socket round trip.
+- `redis://host:6379/0`: any Redis-compatible server, shared across hosts (needs the
+  `redis` package).
+- `memory://`: an in-process fake with the same behaviour, for tests and local runs.
+
+Besides entries (body, headers, tags, wall-clock expiry), every store keeps a short
+event log that workers poll to apply each other's invalidations to their local tier.
+"""
+
+import asyncio
+import sqlite3
+from abc import ABC, abstractmethod
+import threading
+import time
+from typing import Dict, List, NamedTuple, Optional, Set, Tuple
+
+import orjson
+
+# Invalidation events are only needed until every worker has polled them
+EVENT_RETENTION_SECONDS = 300
+# SQLite store: expired entries and old events are pruned every this many writes
+PRUNE_EVERY_WRITES = 200
+
+
+class SharedEntry(NamedTuple):
+    body: bytes
+    headers: Dict[str, str]
+    tags: Tuple[str, ...]
+    expires_at: float  # time.time() based, comparable across processes
+
+
+class SharedCache(ABC):
+    """Interface of an L2 store; every method may raise on a connection problem."""
+
+    name = "shared"
+
+    @abstractmethod
+    async def get(self, key: str) -> Optional[SharedEntry]:
+        ...
+
+    async def get_many(self, keys: List[str]) -> Dict[str, SharedEntry]:
+        """The live entries among `keys`, by key."""
+        found = {}
+        for key in keys:
+            entry = await self.get(key)
+            if entry is not None:
+                found[key] = entry
+        return found
+
+    @abstractmethod
+    async def set(self, key: str, body: bytes, headers: Dict[str, str], tags: Tuple[str, ...], ttl: float) -> None:
+        ...
+
+    @abstractmethod
+    async def delete(self, key: str) -> None:
+        ...
+
+    @abstractmethod
+    async def invalidate(self, tags: Tuple[str, ...]) -> None:
+        ...
+
+    @abstractmethod
+    async def clear(self) -> None:
+        ...
+
+    @abstractmethod
+    async def publish(self, event: dict) -> None:
+        """Appends an invalidation event for the other workers."""
+
+    @abstractmethod
+    async def last_event(self):
+        """Cursor positioned after the newest event."""
+
+    @abstractmethod
+    async def events(self, cursor) -> Tuple[object, List[dict]]:
+        """Events published after `cursor`, and the cursor to continue from."""
+
+    async def close(self) -> None:
+        pass
+
+
+class MemorySharedCache(SharedCache):
+    """In-process stand-in for a shared store: several caches built on one instance behave like workers."""
+
+    name = "memory"
+
+    def __init__(self):
+        self._entries: Dict[str, SharedEntry] = {}
+        self._tags: Dict[str, Set[str]] = {}
+        self._events: List[Tuple[int, float, dict]] = []
+        self._seq = 0
+
+    async def get(self, key: str) -> Optional[SharedEntry]:
+        entry = self._entries.get(key)
+        if entry is None or entry.expires_at <= time.time():
+            return None
+        return entry
+
+    def _drop(self, key: str) -> None:
+        # Removes the entry and its key from every tag set, so the sets only hold live keys
+        entry = self._entries.pop(key, None)
+        for tag in entry.tags if entry is not None else ():
+            keys = self._tags.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._tags[tag]
+
+    async def set(self, key: str, body: bytes, headers: Dict[str, str], tags: Tuple[str, ...], ttl: float) -> None:
+        self._drop(key)
+        self._entries[key] = SharedEntry(body, dict(headers), tuple(tags), time.time() + ttl)
+        for tag in tags:
+            self._tags.setdefault(tag, set()).add(key)
+
+    async def delete(self, key: str) -> None:
+        self._drop(key)
+
+    async def invalidate(self, tags: Tuple[str, ...]) -> None:
+        for tag in tags:
+            for key in list(self._tags.get(tag, ())):
+                self._drop(key)
+
+    async def clear(self) -> None:
+        self._entries.clear()
+        self._tags.clear()
+
+    async def publish(self, event: dict) -> None:
+        self._seq += 1
+        now = time.time()
+        self._events.append((self._seq, now, event))
+        self._events = [item for item in self._events if item[1] > now - EVENT_RETENTION_SECONDS]
+
+    async def last_event(self) -> int:
+        return self._seq
+
+    async def events(self, cursor: int) -> Tuple[int, List[dict]]:
+        new = [(seq, event) for seq, _, event in self._events if seq > cursor]
+        return (new[-1][0] if new else cursor), [event for _, event in new]
+
+
+class SqliteSharedCache(SharedCache):
+    """Embedded L2 store in one SQLite file, for the workers of one host."""
+
+    name = "sqlite"
+
+    SCHEMA = [
+        "CREATE TABLE IF NOT EXISTS entries (key TEXT PRIMARY KEY, body BLOB NOT NULL, headers BLOB NOT NULL,"
+        " tags BLOB NOT NULL, expires_at REAL NOT NULL, size INTEGER NOT NULL)",
+        "CREATE INDEX IF NOT EXISTS ix_entries_expires_at ON entries (expires_at)",
+        "CREATE TABLE IF NOT EXISTS entry_tags (tag TEXT NOT NULL, key TEXT NOT NULL, PRIMARY KEY (tag, key))"
+        " WITHOUT ROWID",
+        "CREATE INDEX IF NOT EXISTS ix_entry_tags_key ON entry_tags (key)",
+        "CREATE TABLE IF NOT EXISTS events (seq INTEGER PRIMARY KEY AUTOINCREMENT, created_at REAL NOT NULL,"
+        " payload BLOB NOT NULL)",
+    ]
+
+    def __init__(self, path: str, max_bytes: int):
+        self.path = path
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._writes = 0
+        self._conn = sqlite3.connect(path, timeout=5, isolation_level=None, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")  # a cache may lose its last writes on power loss
+        self._conn.execute(f"PRAGMA mmap_size={int(max_bytes)}")
+        for statement in self.SCHEMA:
+            self._conn.execute(statement)
+
+    async def _run(self, work, *args):
+        # sqlite3 blocks: run it off the event loop, one statement batch at a time per process
+        def locked():
+            with self._lock:
+                return work(*args)
+        return await asyncio.to_thread(locked)
+
+    def _drop_keys(self, keys: List[str]) -> None:
+        rows = [(key,) for key in keys]
+        self._conn.executemany("DELETE FROM entries WHERE key = ?", rows)
+        self._conn.executemany("DELETE FROM entry_tags WHERE key = ?", rows)
+
+    async def get(self, key: str) -> Optional[SharedEntry]:
+        def work():
+            return self._conn.execute(
+                "SELECT body, headers, tags, expires_at FROM entries WHERE key = ? AND expires_at > ?",
+                (key, time.time()),
+            ).fetchone()
+
+        row = await self._run(work)
+        if row is None:
+            return None
+        body, headers, tags, expires_at = row
+        return SharedEntry(bytes(body), orjson.loads(headers), tuple(orjson.loads(tags)), expires_at)
+
+    async def get_many(self, keys: List[str]) -> Dict[str, SharedEntry]:
+        def work():
+            placeholders = ", ".join("?" * len(keys))
+            return self._conn.execute(
+                f"SELECT key, body, headers, tags, expires_at FROM entries"
+                f" WHERE key IN ({placeholders}) AND expires_at > ?",
+                (*keys, time.time()),
+            ).fetchall()
+
+        if not keys:
+            return {}
+        return {key: SharedEntry(bytes(body), orjson.loads(headers), tuple(orjson.loads(tags)), expires_at)
+                for key, body, headers, tags, expires_at in await self._run(work)}
+
+    async def set(self, key: str, body: bytes, headers: Dict[str, str], tags: Tuple[str, ...], ttl: float) -> None:
+        def work():
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._conn.execute("DELETE FROM entry_tags WHERE key = ?", (key,))
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO entries (key, body, headers, tags, expires_at, size)"
+                    " VALUES (?, ?, ?, ?, ?, ?)",
+                    (key, body, orjson.dumps(headers), orjson.dumps(list(tags)), time.time() + ttl,
+                     len(body) + len(key)),
+                )
+                self._conn.executemany("INSERT OR IGNORE INTO entry_tags (tag, key) VALUES (?, ?)",
+                                       [(tag, key) for tag in tags])
+                self._writes += 1
+                if self._writes % PRUNE_EVERY_WRITES == 0:
+                    self._prune()
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+
+        await self._run(work)
+
+    def _prune(self) -> None:
+        """Drops expired entries, then the soonest-expiring ones while over the byte budget."""
+        now = time.time()
+        expired = [row[0] for row in self._conn.execute("SELECT key FROM entries WHERE expires_at <= ?", (now,))]
+        self._drop_keys(expired)
+        total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+        if total > self.max_bytes:
+            victims, freed = [], 0
+            for key, size in self._conn.execute("SELECT key, size FROM entries ORDER BY expires_at"):
+                if total - freed <= self.max_bytes:
+                    break
+                victims.append(key)
+                freed += size
+            self._drop_keys(victims)
+        self._conn.execute("DELETE FROM events WHERE created_at < ?", (now - EVENT_RETENTION_SECONDS,))
+
+    async def delete(self, key: str) -> None:
+        await self._run(self._drop_keys, [key])
+
+    async def invalidate(self, tags: Tuple[str, ...]) -> None:
+        def work():
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                keys = {row[0] for tag in tags
+                        for row in self._conn.execute("SELECT key FROM entry_tags WHERE tag = ?", (tag,))}
+                self._drop_keys(list(keys))
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+
+        await self._run(work)
+
+    async def clear(self) -> None:
+        def work():
+            self._conn.execute("DELETE FROM entries")
+            self._conn.execute("DELETE FROM entry_tags")
+
+        await self._run(work)
+
+    async def publish(self, event: dict) -> None:
+        await self._run(lambda: self._conn.execute("INSERT INTO events (created_at, payload) VALUES (?, ?)",
+                                                   (time.time(), orjson.dumps(event))))
+
+    async def last_event(self) -> int:
+        return await self._run(lambda: self._conn.execute("SELECT COALESCE(MAX(seq), 0) FROM events").fetchone()[0])
+
+    async def events(self, cursor: int) -> Tuple[int, List[dict]]:
+        rows = await self._run(lambda: self._conn.execute(
+            "SELECT seq, payload FROM events WHERE seq > ? ORDER BY seq", (cursor,)).fetchall())
+        return (rows[-1][0] if rows else cursor), [orjson.loads(payload) for _, payload in rows]
+
+    async def close(self) -> None:
+        await self._run(self._conn.close)
+
+
+class RedisSharedCache(SharedCache):
+    """L2 store on a Redis-compatible server, shared across hosts."""
+
+    name = "redis"
+    STREAM_MAX_LENGTH = 10000
+    # Tag sets outlive their members; a stale member only costs a no-op DEL
+    TAG_TTL_SECONDS = 86400
+
+    def __init__(self, url: str, prefix: str):
+        try:
+            from redis import asyncio as redis
+        except ImportError as e:
+            raise RuntimeError("CACHE_L2_URL=redis://... needs the 'redis' package") from e
+        self.client = redis.Redis.from_url(url)
+        self.prefix = prefix
+        self.stream = f"{prefix}events"
+
+    def _key(self, key: str) -> str:
+        return f"{self.prefix}e:{key}"
+
+    def _tag(self, tag: str) -> str:
+        return f"{self.prefix}t:{tag}"
+
+    @staticmethod
+    def _entry(value: Optional[bytes], ttl_ms: int) -> Optional[SharedEntry]:
+        if value is None or ttl_ms <= 0:
+            return None
+        # One value per entry: the JSON metadata line, then the body
+        meta, body = value.split(b"\n", 1)
+        meta = orjson.loads(meta)
+        return SharedEntry(body, meta["headers"], tuple(meta["tags"]), time.time() + ttl_ms / 1000)
+
+    async def get(self, key: str) -> Optional[SharedEntry]:
+        return self._entry(*await self.client.pipeline(transaction=False)
+                           .get(self._key(key)).pttl(self._key(key)).execute())
+
+    async def get_many(self, keys: List[str]) -> Dict[str, SharedEntry]:
+        pipe = self.client.pipeline(transaction=False)
+        for key in keys:
+            pipe.get(self._key(key)).pttl(self._key(key))
+        replies = await pipe.execute()
+        entries = {key: self._entry(replies[2 * i], replies[2 * i + 1]) for i, key in enumerate(keys)}
+        return {key: entry for key, entry in entries.items() if entry is not None}
+
+    async def set(self, key: str, body: bytes, headers: Dict[str, str], tags: Tuple[str, ...], ttl: float) -> None:
+        value = orjson.dumps({"headers": headers, "tags": list(tags)}) + b"\n" + body
+        pipe = self.client.pipeline(transaction=False).set(self._key(key), value, px=max(int(ttl * 1000), 1))
+        for tag in tags:
+            pipe.sadd(self._tag(tag), key).expire(self._tag(tag), max(int(ttl), self.TAG_TTL_SECONDS))
+        await pipe.execute()
+
+    async def delete(self, key: str) -> None:
+        await self.client.delete(self._key(key))
+
+    async def invalidate(self, tags: Tuple[str, ...]) -> None:
+        for tag in tags:
+            keys = await self.client.smembers(self._tag(tag))
+            await self.client.delete(self._tag(tag), *(self._key(key.decode()) for key in keys))
+
+    async def clear(self) -> None:
+        async for keys in self._scan_batches(f"{self.prefix}[et]:*"):
+            await self.client.delete(*keys)
+
+    async def _scan_batches(self, pattern: str, count: int = 500):
+        batch = []
+        async for key in self.client.scan_iter(match=pattern, count=count):
+            batch.append(key)
+            if len(batch) >= count:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+
+    async def publish(self, event: dict) -> None:
+        await self.client.xadd(self.stream, {"event": orjson.dumps(event)},
+                               maxlen=self.STREAM_MAX_LENGTH, approximate=True)
+
+    async def last_event(self) -> str:
+        newest = await self.client.xrevrange(self.stream, count=1)
+        return newest[0][0] if newest else "0-0"
+
+    async def events(self, cursor) -> Tuple[object, List[dict]]:
+        found = await self.client.xread({self.stream: cursor}, count=1000)
+        if not found:
+            return cursor, []
+        messages = found[0][1]
+        return messages[-1][0], [orjson.loads(fields[b"event"]) for _, fields in messages]
+
+    async def close(self) -> None:
+        await self.client.aclose()
+
+
+def shared_cache_from_url(url: str, max_bytes: int, prefix: str) -> SharedCache:
+    """Builds the L2 store named by CACHE_L2_URL."""
+    if url.startswith("memory://"):
+        return MemorySharedCache()
+    if url.startswith("sqlite:///"):
+        return SqliteSharedCache(url[len("sqlite:///"):], max_bytes=max_bytes)
+    if url.startswith(("redis://", "rediss://", "unix://")):
+        return RedisSharedCache(url, prefix=prefix)
+    raise ValueError(f"Unsupported CACHE_L2_URL scheme: {url}")
@@ -0,0 +1,160 @@
+"""
+core/warmer.py
+
+In-process cache warmer.
+
+Handlers that cache a response register how to rebuild it (`track`: the cache key, an
+async loader running the same query-layer code as the miss path, its TTL and tags) and
+report cache hits (`hit`). A background task (`run`, started from the app lifespan)
+wakes every WARM_INTERVAL_SECONDS and recomputes the hottest tracked entries that are
+about to expire, each with its own DB session, so popular pages and items never fall
+out of the cache in front of a client.
+
+Warming stays out of the way of live traffic:
+- at most WARM_MAX_PER_SECOND recomputations, spaced out evenly;
+- a round is skipped, and an in-progress one stopped, while more than
+  WARM_MAX_POOL_USAGE of the connection pool is checked out by requests;
+- only keys hit at least WARM_MIN_HITS times since the last round qualify (counts
+  decay every round, so "hot" means recently hot), and at most WARM_MAX_TRACKED keys
+  are remembered, least recently used dropped first.
+
+A result is discarded if the cache was invalidated while it was being computed, so
+warming never writes back data older than an invalidation. With a shared L2 cache, an
+entry another worker has already refreshed is copied from there instead of recomputed.
+"""
+
+import asyncio
+import time
+from collections import OrderedDict
+from typing import Awaitable, Callable, Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.cache import ResponseCache, response_cache
+from app.core.config import settings
+from app.core.logger import get_logger
+
+logger = get_logger("warmer")
+
+# Rebuilds one cache entry: (body, headers), or None when there is nothing to cache any more
+Loader = Callable[[AsyncSession], Awaitable[Optional[Tuple[bytes, Dict[str, str]]]]]
+
+
+class _Recipe(NamedTuple):
+    loader: Loader
+    ttl: Optional[int]
+    tags: tuple
+    stale_ttl: float
+
+
+class CacheWarmer:
+    """Remembers how to rebuild hot cache entries and refreshes them before they expire."""
+
+    def __init__(self, cache: ResponseCache):
+        self.cache = cache
+        self._recipes: "OrderedDict[str, _Recipe]" = OrderedDict()
+        self._hits: Dict[str, float] = {}
+        self.warmed = 0
+        self.adopted = 0
+        self.discarded = 0
+        self.skipped_rounds = 0
+
+    def track(self, key: str, loader: Loader, ttl: Optional[int] = None, tags: Iterable[str] = (),
+              stale_ttl: float = 0) -> None:
+        """Registers how to rebuild `key`, stored with `ttl`, `tags` and `stale_ttl`, after a cache miss."""
+        self._recipes[key] = _Recipe(loader, ttl, tuple(tags), stale_ttl)
+        self._recipes.move_to_end(key)
+        self._hits.setdefault(key, 0.0)
+        while len(self._recipes) > settings.WARM_MAX_TRACKED:
+            oldest, _ = self._recipes.popitem(last=False)
+            self._hits.pop(oldest, None)
+
+    def hit(self, key: str) -> None:
+        """Counts a cache hit on a tracked key."""
+        if key in self._recipes:
+            self._hits[key] += 1
+            self._recipes.move_to_end(key)
+
+    def due(self) -> List[str]:
+        """Hot tracked keys expiring within WARM_LEAD_SECONDS, hottest first."""
+        due = []
+        for key in self._recipes:
+            expires_in = self.cache.expires_in(key)
+            if expires_in is not None and expires_in <= settings.WARM_LEAD_SECONDS \
+                    and self._hits.get(key, 0) >= settings.WARM_MIN_HITS:
+                due.append(key)
+        return sorted(due, key=lambda key: -self._hits[key])
+
+    async def warm(self, key: str, session_factory) -> bool:
+        """Recomputes one entry; returns whether it was written back."""
+        recipe = self._recipes.get(key)
+        if recipe is None:
+            return False
+        if await self.cache.refresh_local(key, stale_ttl=recipe.stale_ttl):
+            # Another worker already refreshed it in the shared cache
+            self.adopted += 1
+            return True
+        generation = self.cache.generation
+        async with session_factory() as db:
+            result = await recipe.loader(db)
+        if result is None or self.cache.generation != generation:
+            # Gone, or invalidated while we were computing it: let the next request rebuild it
+            self.discarded += 1
+            return False
+        body, headers = result
+        await self.cache.set(key, body, ttl=recipe.ttl, tags=recipe.tags, headers=headers, stale_ttl=recipe.stale_ttl)
+        self.warmed += 1
+        return True
+
+    async def run_round(self, session_factory, pool_busy: Callable[[], bool]) -> int:
+        """One warming pass; returns the number of entries refreshed."""
+        if pool_busy():
+            self.skipped_rounds += 1
+            return 0
+        warmed = 0
+        interval = 1.0 / settings.WARM_MAX_PER_SECOND
+        for key in self.due():
+            if pool_busy():
+                break
+            started = time.monotonic()
+            try:
+                warmed += await self.warm(key, session_factory)
+            except Exception as e:
+                logger.warning(f"[warmer] Could not refresh {key}: {e}")
+            await asyncio.sleep(max(0.0, interval - (time.monotonic() - started)))
+        # Decay the counts so only recently hot keys keep qualifying
+        for key in self._hits:
+            self._hits[key] /= 2
+        if warmed:
+            logger.info(f"[warmer] Refreshed {warmed} cache entries")
+        return warmed
+
+    async def run(self) -> None:
+        """Background loop started from the app lifespan."""
+        from app.db.session import AsyncSessionLocal, async_engine
+
+        pool = async_engine.sync_engine.pool
+
+        def pool_busy() -> bool:
+            size = getattr(pool, "size", lambda: 0)()
+            return size > 0 and pool.checkedout() > size * settings.WARM_MAX_POOL_USAGE
+
+        while True:
+            await asyncio.sleep(settings.WARM_INTERVAL_SECONDS)
+            try:
+                await self.run_round(AsyncSessionLocal, pool_busy)
+            except Exception as e:
+                logger.error(f"[warmer] Warming round failed: {e}")
+
+    def stats(self) -> dict:
+        return {
+            "tracked": len(self._recipes),
+            "warmed": self.warmed,
+            "adopted": self.adopted,
+            "discarded": self.discarded,
+            "skipped_rounds": self.skipped_rounds,
+        }
+
+
+# Process-wide warmer of the shared response cache
+cache_warmer = CacheWarmer(response_cache)
@@ -1,20 +1,136 @@
-from sqlalchemy.orm import Session
+import re
+from sqlalchemy import and_, or_, select, text, column, Float, String
+from sqlalchemy.ext.asyncio import AsyncSession
 from app.db.models.job import Job
+from app.db.search import TS_CONFIG
 from app.core.logger import get_logger
-from typing import Optional
+from typing import Optional, List
 
-def get_jobs(db: Session, skip: int = 0, limit: int = 10000):
+async def get_jobs(db: AsyncSession, skip: int = 0, limit: int = 10000, after_id: Optional[int] = None):
     """
           Fetch a jobs from the database .
-          - db: SQLAlchemy Session
+          - db: SQLAlchemy AsyncSession
           - users: The list  of the user to fetch
+          - after_id: When given, seek past this id on the primary key instead of using skip
           """
-    return db.query(Job).order_by(Job.id).offset(skip).limit(limit).all()
+    stmt = select(Job)
+    if after_id is not None:
+        stmt = stmt.where(Job.id > after_id).order_by(Job.id).limit(limit)
+    else:
+        stmt = stmt.order_by(Job.id).offset(skip).limit(limit)
+    result = await db.execute(stmt)
+    return result.scalars().all()
 
-def get_job_by_id(db: Session, user_id: int) -> Optional[Job]:
+async def get_job_by_id(db: AsyncSession, user_id: int) -> Optional[Job]:
     """
        Fetch a jobs from the database by their ID.
-       - db: SQLAlchemy Session
+       - db: SQLAlchemy AsyncSession
        - id: The ID of the job to fetch
        """
-    return db.query(Job).filter(Job.id == user_id).first()
\ No newline at end of file
+    return await db.get(Job, user_id)
+
+async def get_jobs_by_ids(db: AsyncSession, ids: List[int]) -> List[Job]:
+    """
+       Fetch several jobs by their IDs in one query (in no particular order).
+       - db: SQLAlchemy AsyncSession
+       - ids: The IDs of the jobs to fetch; ids that do not exist are left out
+       """
+    if not ids:
+        return []
+    result = await db.execute(select(Job).where(Job.id.in_(ids)))
+    return list(result.scalars().all())
+
+# Columns returned by the search query, in model order; typed so JSON columns are decoded
+JOB_COLUMNS = [job_column.name for job_column in Job.__table__.columns]
+SEARCH_RESULT_COLUMNS = [
+    *Job.__table__.columns,
+    column("rank", Float),
+    column("title_highlight", String),
+    column("snippet", String),
+]
+
+POSTGRES_SEARCH_SQL = """
+WITH q AS (SELECT websearch_to_tsquery('{config}', :q) AS query),
+hits AS (
+    SELECT jobs.id, ts_rank_cd(jobs.search_vector, q.query) AS rank
+    FROM jobs, q
+    WHERE jobs.search_vector @@ q.query
+    ORDER BY rank DESC, jobs.id
+    LIMIT :limit OFFSET :skip
+)
+SELECT {columns}, hits.rank AS rank,
+       ts_headline('{config}', jobs.title, q.query, 'HighlightAll=true') AS title_highlight,
+       ts_headline('{config}', jobs.description, q.query, 'MaxFragments=2, MinWords=5, MaxWords=20') AS snippet
+FROM hits JOIN jobs ON jobs.id = hits.id, q
+ORDER BY hits.rank DESC, jobs.id
+"""
+
+# bm25() weights follow the column order of jobs_fts: title, description, company, location.
+# FTS5 ranks ascending (better matches are more negative), so the score is negated.
+SQLITE_SEARCH_SQL = """
+SELECT {columns}, -bm25(jobs_fts, 4.0, 1.0, 2.0, 2.0) AS rank,
+       highlight(jobs_fts, 0, '<b>', '</b>') AS title_highlight,
+       snippet(jobs_fts, 1, '<b>', '</b>', '...', 20) AS snippet
+FROM jobs_fts JOIN jobs ON jobs.id = jobs_fts.rowid
+WHERE jobs_fts MATCH :q
+ORDER BY bm25(jobs_fts, 4.0, 1.0, 2.0, 2.0), jobs.id
+LIMIT :limit OFFSET :skip
+"""
+
+
+# Other databases: every word must appear (case-insensitively) in one of the searched columns
+LIKE_SEARCH_COLUMNS = (Job.title, Job.description, Job.company, Job.location)
+LIKE_SNIPPET_CHARS = 160
+
+
+async def _like_search(db: AsyncSession, q: str, skip: int, limit: int) -> List[dict]:
+    """Unranked fallback without a full-text index: a substring match per word, in id order."""
+    words = re.findall(r"\w+", q)
+    if not words:
+        return []
+    stmt = (
+        select(*Job.__table__.columns)
+        .where(and_(*(or_(*(c.icontains(word, autoescape=True) for c in LIKE_SEARCH_COLUMNS)) for word in words)))
+        .order_by(Job.id)
+        .offset(skip)
+        .limit(limit)
+    )
+    return [
+        {**row, "rank": 0.0, "title_highlight": row["title"], "snippet": (row["description"] or "")[:LIKE_SNIPPET_CHARS]}
+        for row in (await db.execute(stmt)).mappings()
+    ]
+
+
+def _fts5_query(q: str) -> str:
+    """
+    Turns free text into a safe FTS5 query: every word is quoted, so operators and
+    punctuation in user input cannot cause syntax errors, and words are AND-ed.
+    """
+    words = re.findall(r"\w+", q)
+    return " ".join('"' + word.replace('"', '""') + '"' for word in words)
+
+
+async def search_jobs(db: AsyncSession, q: str, skip: int = 0, limit: int = 20) -> List[dict]:
+    """
+       Full-text search over title, description, company and location, best match first.
+       - db: SQLAlchemy AsyncSession
+       - q: Free-text query
+       - skip / limit: Pagination over the ranked results
+       Returns the job fields plus `rank`, `title_highlight` and `snippet` (matches wrapped in <b>).
+       Databases without a full-text index get an unranked substring search (rank 0, no highlights).
+       """
+    columns = ", ".join(f"jobs.{name}" for name in JOB_COLUMNS)
+    dialect = db.get_bind().dialect.name
+    if dialect == "postgresql":
+        sql = POSTGRES_SEARCH_SQL.format(config=TS_CONFIG, columns=columns)
+    elif dialect == "sqlite":
+        sql = SQLITE_SEARCH_SQL.format(columns=columns)
+        q = _fts5_query(q)
+        if not q:
+            return []
+    else:
+        return await _like_search(db, q, skip, limit)
+
+    stmt = text(sql).columns(*SEARCH_RESULT_COLUMNS)
+    result = await db.execute(stmt, {"q": q, "skip": skip, "limit": limit})
+    return [dict(row) for row in result.mappings()]
@@ -0,0 +1,45 @@
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import joinedload
+from app.db.models.resume import Resume
+from app.services.resume_texts import attach_legacy_texts
+from typing import List, Optional
+
+async def get_resumes(db: AsyncSession, skip: int = 0, limit: int = 10000, after_id: Optional[int] = None):
+    """
+          Fetch a resumes from the database .
+          - db: SQLAlchemy AsyncSession
+          - after_id: When given, seek past this id on the primary key instead of using skip
+          """
+    stmt = select(Resume)
+    if after_id is not None:
+        stmt = stmt.where(Resume.id > after_id).order_by(Resume.id).limit(limit)
+    else:
+        stmt = stmt.order_by(Resume.id).offset(skip).limit(limit)
+    result = await db.execute(stmt)
+    return result.scalars().all()
+
+async def get_resume_by_id(db: AsyncSession, resume_id: int) -> Optional[Resume]:
+    """
+       Fetch a resume from the database by its ID.
+       - db: SQLAlchemy AsyncSession
+       - resume_id: The ID of the resume to fetch
+       The compressed parsed text is loaded with it (and decompressed when read).
+       """
+    resume = await db.get(Resume, resume_id, options=[joinedload(Resume.stored_text)])
+    if resume is not None:
+        await attach_legacy_texts(db, [resume])
+    return resume
+
+async def get_resumes_by_ids(db: AsyncSession, ids: List[int]) -> List[Resume]:
+    """
+       Fetch several resumes by their IDs in one query (in no particular order).
+       - db: SQLAlchemy AsyncSession
+       - ids: The IDs of the resumes to fetch; ids that do not exist are left out
+       """
+    if not ids:
+        return []
+    result = await db.execute(select(Resume).options(joinedload(Resume.stored_text)).where(Resume.id.in_(ids)))
+    resumes = list(result.scalars().all())
+    await attach_legacy_texts(db, resumes)
+    return resumes
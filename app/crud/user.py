@@ -1,23 +1,42 @@
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from app.db.models.user import User
 from app.core.logger import get_logger
-from typing import Optional
+from typing import List, Optional
 
-def get_users(db: Session, skip: int = 0, limit: int = 10000):
+async def get_users(db: AsyncSession, skip: int = 0, limit: int = 10000, after_id: Optional[int] = None):
     """
           Fetch a users from the database .
-          - db: SQLAlchemy Session
+          - db: SQLAlchemy AsyncSession
           - users: The ID of the user to fetch
+          - after_id: When given, seek past this id on the primary key instead of using skip
           """
-    return db.query(User).order_by(User.id).offset(skip).limit(limit).all()
+    stmt = select(User)
+    if after_id is not None:
+        stmt = stmt.where(User.id > after_id).order_by(User.id).limit(limit)
+    else:
+        stmt = stmt.order_by(User.id).offset(skip).limit(limit)
+    result = await db.execute(stmt)
+    return result.scalars().all()
 
-def get_user_by_id(db: Session, user_id: int) -> Optional[User]:
+async def get_user_by_id(db: AsyncSession, user_id: int) -> Optional[User]:
     """
        Fetch a user from the database by their ID.
-       - db: SQLAlchemy Session
+       - db: SQLAlchemy AsyncSession
        - user_id: The ID of the user to fetch
        """
-    return db.query(User).filter(User.id == user_id).first()
+    return await db.get(User, user_id)
+
+async def get_users_by_ids(db: AsyncSession, ids: List[int]) -> List[User]:
+    """
+       Fetch several users by their IDs in one query (in no particular order).
+       - db: SQLAlchemy AsyncSession
+       - ids: The IDs of the users to fetch; ids that do not exist are left out
+       """
+    if not ids:
+        return []
+    result = await db.execute(select(User).where(User.id.in_(ids)))
+    return list(result.scalars().all())
 
 
 
@@ -0,0 +1,39 @@
+"""
+db/compression.py
+
+Compression of large texts stored out of row (see `ResumeText`).
+
+Texts are compressed with zstd when the optional `zstandard` package is installed and
+with zlib otherwise. Every row records its codec, so rows written either way stay
+readable; a zstd row needs `zstandard` to be read back.
+"""
+
+import zlib
+from typing import Tuple
+
+try:
+    import zstandard
+except ImportError:  # optional dependency, zlib is used instead
+    zstandard = None
+
+ZLIB_LEVEL = 6
+ZSTD_LEVEL = 9
+
+
+def compress_text(text: str) -> Tuple[str, bytes]:
+    """Returns (codec, compressed UTF-8 bytes) of `text`, using the best available codec."""
+    raw = text.encode("utf-8")
+    if zstandard is not None:
+        return "zstd", zstandard.ZstdCompressor(level=ZSTD_LEVEL).compress(raw)
+    return "zlib", zlib.compress(raw, ZLIB_LEVEL)
+
+
+def decompress_text(codec: str, data: bytes) -> str:
+    """Inverse of `compress_text`; raises ValueError for an unknown or unavailable codec."""
+    if codec == "zlib":
+        return zlib.decompress(data).decode("utf-8")
+    if codec == "zstd":
+        if zstandard is None:
+            raise ValueError("zstd-compressed text needs the zstandard package")
+        return zstandard.ZstdDecompressor().decompress(data).decode("utf-8")
+    raise ValueError(f"Unknown text codec: {codec}")
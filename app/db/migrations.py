@@ -0,0 +1,150 @@
+"""
+db/migrations.py
+
+Idempotent schema upgrades applied at startup.
+
+The project creates its tables with `metadata.create_all`, which never alters an
+existing table. Columns and indexes added to the models after a database was created
+are listed here and added if missing, so an existing database catches up on the next
+start. Every step checks the live schema first and is safe to run repeatedly.
+
+Added columns start out NULL; derived data is filled in separately by the matching
+backfill (e.g. `python -m app.services.salary_backfill` for the salary columns).
+"""
+
+import logging
+from typing import Dict, List, Tuple
+
+from sqlalchemy import inspect, text
+from sqlalchemy.ext.asyncio import AsyncConnection
+
+from app.db.models.canonical import Company, CompanyAlias, Location, LocationAlias
+from app.db.models.resume import ResumeText
+from app.db.models.scheduler_run import ScheduledRun
+
+# (table, column, column DDL) added after the initial schema
+ADDED_COLUMNS: List[Tuple[str, str, str]] = [
+    ("resumes", "content_hash", "VARCHAR(64)"),
+    ("jobs", "salary_min", "BIGINT"),
+    ("jobs", "salary_max", "BIGINT"),
+    ("jobs", "salary_currency", "VARCHAR(3)"),
+    ("jobs", "location_id", "INTEGER"),
+    ("jobs", "company_id", "INTEGER"),
+    ("users", "version", "BIGINT NOT NULL DEFAULT 0"),
+    ("jobs", "version", "BIGINT NOT NULL DEFAULT 0"),
+    ("resumes", "version", "BIGINT NOT NULL DEFAULT 0"),
+]
+
+# (table, CREATE INDEX IF NOT EXISTS statement) for indexes on added columns
+ADDED_INDEXES: List[Tuple[str, str]] = [
+    ("resumes", "CREATE INDEX IF NOT EXISTS ix_resumes_content_hash ON resumes (content_hash)"),
+    ("jobs", "CREATE INDEX IF NOT EXISTS ix_jobs_salary_min_id ON jobs (salary_min, id)"),
+    ("jobs", "CREATE INDEX IF NOT EXISTS ix_jobs_salary_max_id ON jobs (salary_max, id)"),
+    ("jobs", "CREATE INDEX IF NOT EXISTS ix_jobs_salary_currency ON jobs (salary_currency)"),
+    ("jobs", "CREATE INDEX IF NOT EXISTS ix_jobs_canonical_location_id ON jobs (location_id, id)"),
+    ("jobs", "CREATE INDEX IF NOT EXISTS ix_jobs_canonical_company_id ON jobs (company_id, id)"),
+    ("users", "CREATE INDEX IF NOT EXISTS ix_users_id_version ON users (id, version)"),
+    ("jobs", "CREATE INDEX IF NOT EXISTS ix_jobs_id_version ON jobs (id, version)"),
+    ("resumes", "CREATE INDEX IF NOT EXISTS ix_resumes_id_version ON resumes (id, version)"),
+]
+
+# Models whose tables were added after the initial schema; created if missing
+ADDED_TABLES = [Location, LocationAlias, Company, CompanyAlias, ScheduledRun, ResumeText]
+
+# Indexes removed from the models. A B-tree on free text is never used for lookups, and
+# on Postgres it rejects rows whose value exceeds ~2.7kB, i.e. most real resumes.
+DROPPED_INDEXES: List[str] = [
+    "ix_resumes_parsed_text",
+    # B-trees on the skill arrays, superseded by the GIN indexes below
+    "ix_jobs_required_skills",
+    "ix_resumes_extracted_skills",
+    # B-tree on the raw salary strings, superseded by the numeric salary columns
+    "ix_jobs_salary_range",
+]
+
+# Postgres only: (table, column) JSON columns now stored as JSONB for containment queries
+JSONB_COLUMNS: List[Tuple[str, str]] = [
+    ("jobs", "required_skills"),
+    ("resumes", "extracted_skills"),
+]
+
+# Postgres only: (table, column) columns whose data is being moved to another table in the
+# background (see app.services.resume_texts). Rows written meanwhile no longer set them.
+MOVED_COLUMNS: List[Tuple[str, str]] = [
+    ("resumes", "parsed_text"),
+]
+
+# Postgres only: (table, CREATE INDEX IF NOT EXISTS statement)
+POSTGRES_INDEXES: List[Tuple[str, str]] = [
+    ("jobs", "CREATE INDEX IF NOT EXISTS ix_jobs_required_skills_gin "
+             "ON jobs USING gin (required_skills jsonb_path_ops)"),
+    ("resumes", "CREATE INDEX IF NOT EXISTS ix_resumes_extracted_skills_gin "
+                "ON resumes USING gin (extracted_skills jsonb_path_ops)"),
+    ("jobs", "CREATE INDEX IF NOT EXISTS ix_jobs_salary_range_gist "
+             "ON jobs USING gist (int8range(salary_min, salary_max, '[]'))"),
+]
+
+# Postgres only, when the pg_trgm extension is available: typo-tolerant alias lookup
+TRIGRAM_INDEXES: List[str] = [
+    "CREATE INDEX IF NOT EXISTS ix_location_aliases_trgm ON location_aliases USING gin (alias gin_trgm_ops)",
+    "CREATE INDEX IF NOT EXISTS ix_company_aliases_trgm ON company_aliases USING gin (alias gin_trgm_ops)",
+]
+
+
+def _create_added_tables(sync_conn) -> None:
+    for model in ADDED_TABLES:
+        model.metadata.create_all(sync_conn, tables=[model.__table__])
+
+
+def _existing_schema(sync_conn) -> Dict[str, set]:
+    inspector = inspect(sync_conn)
+    return {table: {column["name"] for column in inspector.get_columns(table)}
+            for table in inspector.get_table_names()}
+
+
+async def apply_migrations(conn: AsyncConnection) -> None:
+    """
+    Creates added tables and adds missing columns and indexes to existing ones (and, on
+    Postgres, moves the skill arrays to JSONB with GIN indexes and adds trigram indexes).
+    - conn: An async connection inside a transaction (e.g. `engine.begin()`)
+    """
+    await conn.run_sync(_create_added_tables)
+    schema = await conn.run_sync(_existing_schema)
+    for table, column, ddl in ADDED_COLUMNS:
+        if table in schema and column not in schema[table]:
+            await conn.execute(text(f"ALTER TABLE {table} ADD COLUMN {column} {ddl}"))
+            schema[table].add(column)
+            logging.info(f"Added column {table}.{column}")
+    for table, statement in ADDED_INDEXES:
+        if table in schema:
+            await conn.execute(text(statement))
+    for name in DROPPED_INDEXES:
+        await conn.execute(text(f"DROP INDEX IF EXISTS {name}"))
+
+    if conn.dialect.name != "postgresql":
+        return
+    for table, column in JSONB_COLUMNS:
+        data_type = await conn.scalar(
+            text("SELECT data_type FROM information_schema.columns "
+                 "WHERE table_schema = current_schema() AND table_name = :table AND column_name = :column"),
+            {"table": table, "column": column},
+        )
+        if data_type == "json":
+            await conn.execute(text(f"ALTER TABLE {table} ALTER COLUMN {column} TYPE jsonb USING {column}::jsonb"))
+            logging.info(f"Converted {table}.{column} to jsonb")
+    for table, column in MOVED_COLUMNS:
+        if column in schema.get(table, ()):
+            await conn.execute(text(f"ALTER TABLE {table} ALTER COLUMN {column} DROP NOT NULL"))
+    for table, statement in POSTGRES_INDEXES:
+        if table in schema:
+            await conn.execute(text(statement))
+
+    # Creating an extension needs privileges the app user may not have; lookups then fall back to difflib
+    try:
+        async with conn.begin_nested():
+            await conn.execute(text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
+    except Exception as e:
+        logging.warning(f"pg_trgm is not available, fuzzy alias lookup will not use an index: {e}")
+        return
+    for statement in TRIGRAM_INDEXES:
+        await conn.execute(text(statement))
@@ -0,0 +1,44 @@
+"""
+models/canonical.py
+
+Canonical locations and companies, and the spellings that map to them.
+
+A job's free-text `location` / `company` is resolved through the alias tables to one
+canonical row, whose id is stored on the job (`jobs.location_id`, `jobs.company_id`),
+so "Bengaluru" and "Bangalore", or "Acme Inc." and "ACME", filter as the same value.
+Aliases are stored normalized (see app/services/entities.py); on Postgres they carry a
+trigram index for typo-tolerant lookup.
+"""
+
+from sqlalchemy import Column, ForeignKey, Integer, String
+from sqlalchemy.orm import declarative_base
+
+Base = declarative_base()
+
+
+class Location(Base):
+    __tablename__ = "locations"
+
+    id = Column(Integer, primary_key=True, index=True)
+    name = Column(String, unique=True, nullable=False)  # display name, e.g. "Bangalore"
+
+
+class LocationAlias(Base):
+    __tablename__ = "location_aliases"
+
+    alias = Column(String, primary_key=True)  # normalized spelling, e.g. "bengaluru"
+    location_id = Column(Integer, ForeignKey("locations.id", ondelete="CASCADE"), index=True, nullable=False)
+
+
+class Company(Base):
+    __tablename__ = "companies"
+
+    id = Column(Integer, primary_key=True, index=True)
+    name = Column(String, unique=True, nullable=False)  # display name, e.g. "Acme Labs"
+
+
+class CompanyAlias(Base):
+    __tablename__ = "company_aliases"
+
+    alias = Column(String, primary_key=True)  # normalized spelling, legal suffixes removed, e.g. "acme"
+    company_id = Column(Integer, ForeignKey("companies.id", ondelete="CASCADE"), index=True, nullable=False)
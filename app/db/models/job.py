@@ -8,9 +8,13 @@ when performing database operations.
 SQLAlchemy's ORM allows easy interaction with relational databases using Python classes.
 """
 
-from sqlalchemy import Column, Integer, String, JSON
+from sqlalchemy import BigInteger, Column, Integer, String, JSON, Index
+from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.orm import declarative_base
 
+from app.db.salary import salary_range_expr
+from app.db.versioning import version_column
+
 Base = declarative_base()
 
 class Job(Base):
@@ -21,6 +25,35 @@ class Job(Base):
     description = Column(String, unique=True, index=True, nullable=False)
     company = Column(String, index=True, nullable=False)
     location = Column(String, index=True, nullable=False)
-    salary_range = Column(JSON, index=True)  # stored as list
-    required_skills = Column(JSON, index=True)  # stored as list
+    salary_range = Column(JSON)  # stored as list, as sent by the client
+    required_skills = Column(JSON().with_variant(JSONB, "postgresql"))  # stored as list; GIN-indexed on Postgres
     posted_by = Column(Integer, index=True)
+    # Parsed from salary_range (app/db/salary.py): yearly amounts in salary_currency units
+    salary_min = Column(BigInteger)
+    salary_max = Column(BigInteger)
+    salary_currency = Column(String(3), index=True)
+    # Canonical ids of location / company (app/services/entities.py), what the filters match on
+    location_id = Column(Integer)
+    company_id = Column(Integer)
+    version = version_column()  # time of the last write, for ETags (app/db/versioning.py)
+
+    # Composite (sort key, id) indexes backing keyset pagination on /jobs/filter
+    __table_args__ = (
+        Index("ix_jobs_title_id", "title", "id"),
+        Index("ix_jobs_company_id", "company", "id"),
+        Index("ix_jobs_location_id", "location", "id"),
+        Index("ix_jobs_salary_min_id", "salary_min", "id"),
+        Index("ix_jobs_salary_max_id", "salary_max", "id"),
+        Index("ix_jobs_canonical_location_id", "location_id", "id"),
+        Index("ix_jobs_canonical_company_id", "company_id", "id"),
+        # Lets the ETag of an id-ordered page be computed from the index alone
+        Index("ix_jobs_id_version", "id", "version"),
+        # Containment (`@>`) index for the skills filter; jsonb_path_ops only supports @> but is smaller
+        Index("ix_jobs_required_skills_gin", "required_skills", postgresql_using="gin",
+              postgresql_ops={"required_skills": "jsonb_path_ops"}).ddl_if(dialect="postgresql"),
+    )
+
+
+# Range index for the salary filter: `int8range(salary_min, salary_max) && int8range(:min, :max)`
+Index("ix_jobs_salary_range_gist", salary_range_expr(Job.salary_min, Job.salary_max),
+      postgresql_using="gist").ddl_if(dialect="postgresql")
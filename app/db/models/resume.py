@@ -1,5 +1,11 @@
-from sqlalchemy import Column, Integer, String, JSON
-from sqlalchemy.orm import declarative_base
+from typing import Optional
+
+from sqlalchemy import Column, ForeignKey, Integer, LargeBinary, String, JSON, Index
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.orm import declarative_base, relationship
+
+from app.db.compression import compress_text, decompress_text
+from app.db.versioning import version_column
 
 Base = declarative_base()
 
@@ -9,8 +15,51 @@ class Resume(Base):
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, index=True, nullable=False)
     original_file_path = Column(String, unique=True, index=True, nullable=False)
-    parsed_text = Column(String, index=True, nullable=False)
-    extracted_skills = Column(JSON, index=True, nullable=False)
+    extracted_skills = Column(JSON().with_variant(JSONB, "postgresql"), nullable=False)  # GIN-indexed on Postgres
     experience = Column(JSON, index=True)  # stored as list
     education = Column(JSON, index=True)  # stored as list
+    content_hash = Column(String(64), index=True)  # sha256 of the source file, set by the resume parser
+    version = version_column()  # time of the last write, for ETags (app/db/versioning.py)
+
+    # Full text, compressed in its own table; only loaded on request (e.g. `joinedload(Resume.stored_text)`)
+    stored_text = relationship("ResumeText", uselist=False, lazy="raise", passive_deletes=True)
+
+    # Composite (sort key, id) index backing keyset pagination on /Resumes/filter
+    __table_args__ = (
+        Index("ix_resumes_user_id_id", "user_id", "id"),
+        # Lets the ETag of an id-ordered page be computed from the index alone
+        Index("ix_resumes_id_version", "id", "version"),
+        # Containment (`@>`) index for the skills filter
+        Index("ix_resumes_extracted_skills_gin", "extracted_skills", postgresql_using="gin",
+              postgresql_ops={"extracted_skills": "jsonb_path_ops"}).ddl_if(dialect="postgresql"),
+    )
+
+    @property
+    def parsed_text(self) -> Optional[str]:
+        """
+        The decompressed text when `stored_text` was loaded, otherwise None; for a resume
+        whose text is not moved yet, the text read from the old column (`legacy_text`, set
+        by app.services.resume_texts.attach_legacy_texts).
+        """
+        stored = self.__dict__.get("stored_text")
+        return stored.text if stored is not None else self.__dict__.get("legacy_text")
+
+
+class ResumeText(Base):
+    """Parsed text of a resume, compressed and kept out of the `resumes` rows."""
+    __tablename__ = "resume_texts"
+
+    resume_id = Column(Integer, ForeignKey("resumes.id", ondelete="CASCADE"), primary_key=True)
+    codec = Column(String(8), nullable=False)  # see app.db.compression
+    data = Column(LargeBinary, nullable=False)
+    size = Column(Integer, nullable=False)  # length of the uncompressed text, in characters
+
+    @property
+    def text(self) -> str:
+        return decompress_text(self.codec, self.data)
 
+    @staticmethod
+    def values(resume_id: int, text: str) -> dict:
+        """Column values of the row storing `text` for a resume."""
+        codec, data = compress_text(text)
+        return {"resume_id": resume_id, "codec": codec, "data": data, "size": len(text)}
@@ -0,0 +1,30 @@
+"""
+models/scheduler_run.py
+
+Run history of the scheduled jobs (scheduler.py).
+
+One row per job and schedule slot; the unique (job_id, scheduled_for) pair is what
+makes a slot run once across the cluster, even if leadership changes hands mid-slot.
+"""
+
+from sqlalchemy import Column, DateTime, Integer, String, UniqueConstraint
+from sqlalchemy.orm import declarative_base
+
+Base = declarative_base()
+
+
+class ScheduledRun(Base):
+    __tablename__ = "scheduler_runs"
+
+    id = Column(Integer, primary_key=True, index=True)
+    job_id = Column(String, nullable=False)
+    scheduled_for = Column(DateTime(timezone=True), nullable=False)  # start of the slot, UTC
+    started_at = Column(DateTime(timezone=True), nullable=False)
+    finished_at = Column(DateTime(timezone=True))
+    status = Column(String, nullable=False)  # running, succeeded or failed
+    error = Column(String)
+    host = Column(String)  # hostname:pid of the leader that ran it
+
+    __table_args__ = (
+        UniqueConstraint("job_id", "scheduled_for", name="uq_scheduler_runs_job_slot"),
+    )
@@ -8,9 +8,11 @@ when performing database operations.
 SQLAlchemy's ORM allows easy interaction with relational databases using Python classes.
 """
 
-from sqlalchemy import Column, Integer, String
+from sqlalchemy import Column, Integer, String, Index
 from sqlalchemy.orm import declarative_base
 
+from app.db.versioning import version_column
+
 Base = declarative_base()
 
 class User(Base):
@@ -19,4 +21,13 @@ class User(Base):
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String, index=True, nullable=False)
     email = Column(String, unique=True, index=True, nullable=False)
-    role = Column(String, index=True, nullable=False)
\ No newline at end of file
+    role = Column(String, index=True, nullable=False)
+    version = version_column()  # time of the last write, for ETags (app/db/versioning.py)
+
+    # Composite (sort key, id) indexes backing keyset pagination on /users/filter
+    __table_args__ = (
+        Index("ix_users_name_id", "name", "id"),
+        Index("ix_users_role_id", "role", "id"),
+        # Lets the ETag of an id-ordered page be computed from the index alone
+        Index("ix_users_id_version", "id", "version"),
+    )
\ No newline at end of file
@@ -0,0 +1,97 @@
+"""
+db/salary.py
+
+Numeric salaries for jobs.
+
+`jobs.salary_range` is free text kept as the client sent it (["1200000", "1800000"],
+["12 LPA", "18 LPA"], ["$90k", "$120k"], ...). `salary_columns` parses it into the
+`salary_min` / `salary_max` amounts (whole currency units per year) and the ISO
+`salary_currency` stored next to it, which the filter and sort work on.
+
+On Postgres the pair is indexed as a range, `int8range(salary_min, salary_max, '[]')`,
+with GiST, and the filter is an overlap test (`&&`) on that same expression so the
+planner can use the index. Other databases compare the two columns directly.
+"""
+
+import re
+from typing import Dict, Iterable, Optional, Tuple
+
+from sqlalchemy import and_, func, literal_column, or_
+
+# Amounts without a currency marker; the existing data is in rupees
+DEFAULT_SALARY_CURRENCY = "INR"
+
+SALARY_COLUMNS = ("salary_min", "salary_max", "salary_currency")
+
+_CURRENCIES = (
+    (re.compile(r"₹|\binr\b|\brs\.?(?=\s|\d|$)", re.I), "INR"),
+    (re.compile(r"\$|\busd\b", re.I), "USD"),
+    (re.compile(r"€|\beur\b", re.I), "EUR"),
+    (re.compile(r"£|\bgbp\b", re.I), "GBP"),
+)
+
+_MULTIPLIERS = {"k": 1_000, "l": 100_000, "lac": 100_000, "lacs": 100_000, "lakh": 100_000, "lakhs": 100_000,
+                "lpa": 100_000, "cr": 10_000_000, "crore": 10_000_000, "crores": 10_000_000,
+                "m": 1_000_000, "mn": 1_000_000, "million": 1_000_000}
+
+# A number ("12,00,000", "12.5") with an optional unit ("k", "LPA", "lakh", "cr", "m")
+_AMOUNT = re.compile(r"(\d[\d,]*(?:\.\d+)?)\s*(crores?|cr|lakhs?|lacs?|lpa|l|million|mn|m|k)?(?![a-z])", re.I)
+
+
+def _amounts(text: str) -> Iterable[float]:
+    matches = [(float(number.replace(",", "")), (unit or "").lower()) for number, unit in _AMOUNT.findall(text)]
+    # A unit written once applies to the whole range: "10-15 LPA", "$60-80k"
+    trailing = matches[-1][1] if matches else ""
+    for amount, unit in matches:
+        yield amount * _MULTIPLIERS.get(unit or trailing, 1)
+
+
+def parse_salary_range(salary_range) -> Tuple[Optional[int], Optional[int], Optional[str]]:
+    """
+    Parses a `salary_range` value into (minimum, maximum, currency).
+    All three are None when it holds no amount.
+    """
+    if not salary_range:
+        return None, None, None
+    parts = [salary_range] if isinstance(salary_range, str) else [str(part) for part in salary_range]
+
+    amounts, currency = [], None
+    for part in parts:
+        amounts.extend(_amounts(part))
+        if currency is None:
+            currency = next((code for pattern, code in _CURRENCIES if pattern.search(part)), None)
+    if not amounts:
+        return None, None, None
+    return round(min(amounts)), round(max(amounts)), currency or DEFAULT_SALARY_CURRENCY
+
+
+def salary_columns(salary_range) -> Dict[str, Optional[object]]:
+    """The SALARY_COLUMNS values derived from `salary_range`, for inserts and updates."""
+    return dict(zip(SALARY_COLUMNS, parse_salary_range(salary_range)))
+
+
+def salary_range_expr(min_column, max_column):
+    """`int8range(min, max, '[]')`: the expression the GiST index is built on (bounds inlined to match it)."""
+    return func.int8range(min_column, max_column, literal_column("'[]'"))
+
+
+def salary_filter(min_column, max_column, salary_min: Optional[int], salary_max: Optional[int], dialect: str):
+    """
+    Keeps jobs whose range reaches into [salary_min, salary_max]: paying at least
+    `salary_min` at the top of their range, and at most `salary_max` at the bottom.
+    Jobs without a parsed salary never match, on either dialect.
+    """
+    if dialect == "postgresql":
+        # NULL bounds make int8range unbounded, so jobs without a salary would overlap everything
+        return and_(
+            or_(min_column.isnot(None), max_column.isnot(None)),
+            salary_range_expr(min_column, max_column).op("&&")(
+                func.int8range(salary_min, salary_max, literal_column("'[]'"))
+            ),
+        )
+    conditions = []
+    if salary_min is not None:
+        conditions.append(max_column >= salary_min)
+    if salary_max is not None:
+        conditions.append(min_column <= salary_max)
+    return and_(*conditions)
@@ -0,0 +1,83 @@
+"""
+db/search.py
+
+Full-text search index for job postings.
+
+On Postgres the `jobs` table gets a stored, generated `search_vector` tsvector column
+(title weighted highest, then company/location, then description) with a GIN index,
+so Postgres keeps it up to date on every insert and update.
+On SQLite an external-content FTS5 table `jobs_fts` mirrors the same columns and is
+kept in sync by triggers; it backs local development and tests.
+
+Both are created idempotently by `ensure_job_search_index`, which runs at startup.
+"""
+
+import logging
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncConnection
+
+# Text search configuration used for both the stored vector and the query
+TS_CONFIG = "english"
+
+POSTGRES_DDL = [
+    f"""
+    ALTER TABLE jobs ADD COLUMN IF NOT EXISTS search_vector tsvector
+    GENERATED ALWAYS AS (
+        setweight(to_tsvector('{TS_CONFIG}', coalesce(title, '')), 'A') ||
+        setweight(to_tsvector('{TS_CONFIG}', coalesce(company, '')), 'B') ||
+        setweight(to_tsvector('{TS_CONFIG}', coalesce(location, '')), 'B') ||
+        setweight(to_tsvector('{TS_CONFIG}', coalesce(description, '')), 'C')
+    ) STORED
+    """,
+    "CREATE INDEX IF NOT EXISTS ix_jobs_search_vector ON jobs USING GIN (search_vector)",
+]
+
+SQLITE_DDL = [
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS jobs_fts USING fts5(
+        title, description, company, location,
+        content='jobs', content_rowid='id', tokenize='porter unicode61'
+    )
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS jobs_fts_ai AFTER INSERT ON jobs BEGIN
+        INSERT INTO jobs_fts(rowid, title, description, company, location)
+        VALUES (new.id, new.title, new.description, new.company, new.location);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS jobs_fts_ad AFTER DELETE ON jobs BEGIN
+        INSERT INTO jobs_fts(jobs_fts, rowid, title, description, company, location)
+        VALUES ('delete', old.id, old.title, old.description, old.company, old.location);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS jobs_fts_au AFTER UPDATE ON jobs BEGIN
+        INSERT INTO jobs_fts(jobs_fts, rowid, title, description, company, location)
+        VALUES ('delete', old.id, old.title, old.description, old.company, old.location);
+        INSERT INTO jobs_fts(rowid, title, description, company, location)
+        VALUES (new.id, new.title, new.description, new.company, new.location);
+    END
+    """,
+]
+
+
+async def ensure_job_search_index(conn: AsyncConnection) -> None:
+    """
+    Creates the full-text index for the current dialect if it does not exist yet.
+    - conn: An async connection inside a transaction (e.g. `engine.begin()`)
+    """
+    dialect = conn.dialect.name
+    if dialect == "postgresql":
+        for statement in POSTGRES_DDL:
+            await conn.execute(text(statement))
+    elif dialect == "sqlite":
+        exists = await conn.scalar(text("SELECT 1 FROM sqlite_master WHERE name = 'jobs_fts'"))
+        for statement in SQLITE_DDL:
+            await conn.execute(text(statement))
+        if not exists:
+            # Index the rows that were inserted before the FTS table existed
+            await conn.execute(text("INSERT INTO jobs_fts(jobs_fts) VALUES ('rebuild')"))
+    else:
+        logging.warning(f"Full-text job search is not supported on dialect '{dialect}'")
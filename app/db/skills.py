@@ -0,0 +1,60 @@
+"""
+db/skills.py
+
+Skill filters over JSON array columns (`jobs.required_skills`, `resumes.extracted_skills`).
+
+On Postgres the columns are JSONB with a `jsonb_path_ops` GIN index, and a filter is a
+containment test: `required_skills @> '["python"]'`. `match=all` contains every skill in
+one array; `match=any` ORs one containment per skill, which the planner answers with a
+BitmapOr over the same index. Both run on the index instead of scanning every row.
+SQLite has no containment operator, so the portable fallback tests membership with
+`EXISTS (SELECT 1 FROM json_each(column) WHERE value = ...)`.
+
+Skills are compared lower-cased with collapsed whitespace (see `normalize_skill`), the
+form the bulk loader and the resume parser store them in.
+"""
+
+from typing import List, Literal, Optional
+
+import orjson
+from sqlalchemy import and_, cast, exists, func, literal, or_, select
+from sqlalchemy.dialects.postgresql import JSONB
+
+from app.services.matching import normalize_skill
+
+SkillMatch = Literal["all", "any"]
+
+
+def parse_skills(skills: Optional[str]) -> List[str]:
+    """Splits a comma-separated `skills` parameter into distinct normalized skills, in order."""
+    if not skills:
+        return []
+    parsed = []
+    for skill in skills.split(","):
+        skill = normalize_skill(skill)
+        if skill and skill not in parsed:
+            parsed.append(skill)
+    return parsed
+
+
+def _jsonb(value) -> object:
+    # A literal cast rather than a typed bind parameter, so the statement can also be rendered
+    # with literal binds (EXPLAIN-based count estimates)
+    return cast(literal(orjson.dumps(value).decode()), JSONB)
+
+
+def skills_filter(column, skills: List[str], match: SkillMatch, dialect: str):
+    """A WHERE clause keeping rows whose `column` array holds all (or any) of `skills`."""
+    if dialect == "postgresql":
+        if match == "all":
+            return column.op("@>")(_jsonb(skills))
+        return or_(*(column.op("@>")(_jsonb([skill])) for skill in skills))
+
+    def member(*values):
+        elements = func.json_each(column).table_valued("value").alias()
+        condition = elements.c.value == values[0] if len(values) == 1 else elements.c.value.in_(values)
+        return exists(select(1).select_from(elements).where(condition))
+
+    if match == "all":
+        return and_(*(member(skill) for skill in skills))
+    return member(*skills)
@@ -0,0 +1,33 @@
+"""
+db/versioning.py
+
+Row versions of users, jobs and resumes, the basis of their ETags (app/core/etag.py).
+
+`version` is the time of a row's last write in microseconds since the epoch, set on
+insert and on every update (`default` / `onupdate`). It doubles as an updated_at
+column. Upserts (`ON CONFLICT DO UPDATE`) do not run `onupdate`, so they set
+`version` explicitly. Rows written before the column existed have version 0 until
+their next write.
+
+Versions come from the writing process's clock, strictly increasing within the
+process. Workers on different hosts rely on their clocks being synchronised, as a
+page's ETag only moves forward with its highest version.
+"""
+
+import time
+
+from sqlalchemy import BigInteger, Column
+
+_last_version = 0
+
+
+def row_version() -> int:
+    """A new row version: now in microseconds, and greater than any this process issued before."""
+    global _last_version
+    _last_version = max(time.time_ns() // 1000, _last_version + 1)
+    return _last_version
+
+
+def version_column() -> Column:
+    """The `version` column of a versioned model."""
+    return Column(BigInteger, nullable=False, default=row_version, onupdate=row_version, server_default="0")
@@ -1,13 +1,65 @@
+import asyncio
+from contextlib import asynccontextmanager
 
 from fastapi import FastAPI, Request
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, PlainTextResponse
 from pydantic import BaseModel
 from starlette.middleware.gzip import GZipMiddleware
 from app.api.routes import users,jobs,resumes
 import logging
 from fastapi.middleware.cors import CORSMiddleware
-from scheduler import start_scheduler
-app = FastAPI(title="Job Board API")
+from scheduler import run_scheduler
+from app.db.session import async_engine
+from app.core.metrics import MetricsMiddleware, PROMETHEUS_CONTENT_TYPE, render_metrics
+from app.db.search import ensure_job_search_index
+from app.db.migrations import apply_migrations
+from app.services.matching import warm_matching_index
+from app.services.entities import prepare_entities
+from app.services.resume_texts import prepare_resume_texts
+from app.core.cache import TieredCache, response_cache
+from app.core.config import settings
+from app.core.warmer import cache_warmer
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Bring existing tables up to the models' schema; the API still starts if the DB is unreachable
+    try:
+        async with async_engine.begin() as conn:
+            await apply_migrations(conn)
+    except Exception as e:
+        logging.error(f"Could not apply schema migrations: {e}")
+    # Make sure the full-text search index exists
+    try:
+        async with async_engine.begin() as conn:
+            await ensure_job_search_index(conn)
+    except Exception as e:
+        logging.error(f"Could not prepare the job search index: {e}")
+    # Build the skill matching indexes without delaying startup
+    matching_warmup = asyncio.create_task(warm_matching_index())
+    # Seed the location aliases and link older jobs to canonical locations/companies, in the background
+    entities_backfill = asyncio.create_task(prepare_entities())
+    # Move resume texts stored inline to the compressed table. On SQLite before serving, as resumes
+    # cannot be written there until the old NOT NULL column is gone; on Postgres the scheduler
+    # leader does it in the background (SCHEDULED_JOBS)
+    if async_engine.dialect.name == "sqlite":
+        await prepare_resume_texts()
+    tasks = [matching_warmup, entities_backfill]
+    # Apply the other workers' cache invalidations to this one's local tier
+    if isinstance(response_cache, TieredCache):
+        tasks.append(asyncio.create_task(response_cache.run()))
+    # Keep hot cache entries fresh from inside the process
+    if settings.WARM_ENABLED:
+        tasks.append(asyncio.create_task(cache_warmer.run()))
+    # Maintenance jobs, run by whichever worker wins the leader election
+    if settings.SCHEDULER_ENABLED:
+        tasks.append(asyncio.create_task(run_scheduler()))
+    yield
+    for task in tasks:
+        task.cancel()
+
+
+app = FastAPI(title="Job Board API", lifespan=lifespan)
 # ✅ Add CORS middleware right after app initialization
 app.add_middleware(
     CORSMiddleware,
@@ -15,10 +67,12 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],  # Allows all HTTP methods (GET, POST, etc.)
     allow_headers=["*"],  # Allows all headers
+    expose_headers=["X-Next-Cursor", "X-Total-Count"],  # Lets browsers read the pagination headers
 )
 # Add GZIP compression
 app.add_middleware(GZipMiddleware, minimum_size=500)  # Only compress responses larger than 500 bytes
-start_scheduler()
+# Per-route latency, status and DB usage; added last so it wraps (and times) everything else
+app.add_middleware(MetricsMiddleware)
 # Optional global error handler
 @app.exception_handler(Exception)
 async def general_exception_handler(request: Request, exc: Exception):
@@ -30,6 +84,18 @@ async def general_exception_handler(request: Request, exc: Exception):
 
 
 
+@app.get("/cache/stats", tags=["Cache"], summary="Response cache counters")
+def cache_stats():
+    return {**response_cache.stats(), "warmer": cache_warmer.stats()}
+
+
+@app.get("/metrics", tags=["Metrics"], summary="Prometheus metrics", response_class=PlainTextResponse)
+def metrics():
+    body = render_metrics(pool=async_engine.sync_engine.pool, cache_stats=response_cache.stats(),
+                          warmer_stats=cache_warmer.stats())
+    return PlainTextResponse(body, media_type=PROMETHEUS_CONTENT_TYPE)
+
+
 class Item(BaseModel):
     name: str
     price: float
@@ -10,20 +10,106 @@ Using Pydantic's BaseModel enables automatic data parsing and validation,
 which is especially useful in FastAPI and other Python web frameworks.
 """
 
-from pydantic import BaseModel, ConfigDict
-from typing import List
+from pydantic import BaseModel, ConfigDict, field_validator
+from typing import List, Optional
+
+from app.services.matching import normalize_skill
 
 class JobsData(BaseModel):
     id: int
     title: str
-    description: str
+    description: Optional[str] = None  # left out of list pages unless requested with fields=
     company: str
     location: str
     salary_range: List[str]
     required_skills: List[str]
     posted_by: int
+    # Parsed from salary_range; None when it holds no amount
+    salary_min: Optional[int] = None
+    salary_max: Optional[int] = None
+    salary_currency: Optional[str] = None
+    # Canonical location / company ids; equal for every spelling of the same place or company
+    location_id: Optional[int] = None
+    company_id: Optional[int] = None
 
     # Correct approach in Pydantic v2: using ConfigDict directly
     model_config = ConfigDict(
         from_attributes=True,  # Allows attribute names to be used as aliases
     )
+
+
+class JobMatch(BaseModel):
+    """A job scored against a resume by skill overlap."""
+    score: float
+    matched_skills: List[str]
+    job: JobsData
+
+
+class JobSearchResult(JobsData):
+    """A job matched by full-text search, with its relevance and highlighted fragments."""
+    rank: float
+    title_highlight: str
+    snippet: str
+
+
+class JobsCreate(BaseModel):
+    """One row of a bulk ingest: a job without its id; `description` identifies it for upserts."""
+    title: str
+    description: str
+    company: str
+    location: str
+    salary_range: List[str] = []
+    required_skills: List[str] = []
+    posted_by: int
+
+    @field_validator("required_skills")
+    @classmethod
+    def _normalize_skills(cls, skills: List[str]) -> List[str]:
+        # Stored normalized so the skills filter can match them by containment
+        return list(dict.fromkeys(s for s in map(normalize_skill, skills) if s))
+
+
+class BulkRowError(BaseModel):
+    """A rejected ingest row (or batch of rows): its line in the upload and why it was rejected."""
+    line: int
+    last_line: Optional[int] = None  # last line of a batch the database rejected as a whole
+    error: str
+
+
+class BulkIngestReport(BaseModel):
+    """Outcome of POST /jobs/bulk."""
+    received: int
+    inserted: int
+    updated: int
+    failed: int
+    errors: List[BulkRowError]  # the first BULK_MAX_REPORTED_ERRORS rejected rows
+    errors_truncated: bool
+
+
+class FacetValue(BaseModel):
+    """One value of a facet and how many of the filtered jobs have it."""
+    value: str
+    count: int
+    id: Optional[int] = None  # canonical company / location id
+    # Salary buckets: the edges of the bucket, which holds the jobs whose salary_min is in
+    # [salary_min, salary_max) (salary_max is None for the top bucket). Passed to /jobs/filter,
+    # which matches overlapping ranges, they select these jobs and those whose range reaches into it.
+    currency: Optional[str] = None
+    salary_min: Optional[int] = None
+    salary_max: Optional[int] = None
+
+
+class JobFacets(BaseModel):
+    """Response of GET /jobs/facets: the top values per facet for the current filters."""
+    total: int
+    company: List[FacetValue]
+    location: List[FacetValue]
+    skill: List[FacetValue]
+    salary: List[FacetValue]
+
+
+class JobBatchItem(BaseModel):
+    """One entry of GET /jobs/batch, in the order the ids were requested."""
+    id: int
+    found: bool
+    data: Optional[JobsData] = None  # None when no job has this id
@@ -1,5 +1,5 @@
 from pydantic import BaseModel, ConfigDict
-from typing import List
+from typing import Dict, List, Optional
 
 class Education(BaseModel):
     year: int
@@ -14,7 +14,7 @@ class ResumesData(BaseModel):
     id: int
     user_id: int
     original_file_path: str
-    parsed_text: str
+    parsed_text: Optional[str] = None  # stored compressed; only returned by the by-id and batch endpoints
     extracted_skills: List[str]
     experience: Experience
     education: Education  # A list of Education objects
@@ -24,3 +24,34 @@ class ResumesData(BaseModel):
     model_config = ConfigDict(
         from_attributes=True,
     )
+
+
+class CandidateMatch(BaseModel):
+    """A resume scored against a job by skill overlap."""
+    score: float
+    matched_skills: List[str]
+    resume: ResumesData
+
+
+class ResumeIngestRun(BaseModel):
+    """Progress of a resume directory ingest started with POST /Resumes/ingest."""
+    id: str
+    root: str
+    reindex: bool
+    status: str  # running, finished or failed
+    elapsed_seconds: float
+    seen: int  # supported files found
+    skipped: int  # already loaded, not read
+    unchanged: int  # re-hashed, content unchanged
+    parsed: int
+    written: int
+    failed: int
+    errors: List[Dict[str, str]]  # the first 100 failures: path and reason
+    errors_truncated: bool  # more failures than listed in errors
+
+
+class ResumeBatchItem(BaseModel):
+    """One entry of GET /Resumes/batch, in the order the ids were requested."""
+    id: int
+    found: bool
+    data: Optional[ResumesData] = None  # None when no resume has this id
@@ -11,6 +11,7 @@ which is especially useful in FastAPI and other Python web frameworks.
 
 
 from pydantic import BaseModel, ConfigDict
+from typing import Optional
 
 class UserOut(BaseModel):
     id: int
@@ -20,4 +21,10 @@ class UserOut(BaseModel):
     model_config = ConfigDict(
         from_attributes=True,
     )
-    # model_config = ConfigDict(from_attributes=True)  # Use ConfigDict and from_attributes
\ No newline at end of file
+    # model_config = ConfigDict(from_attributes=True)  # Use ConfigDict and from_attributes
+
+class UserBatchItem(BaseModel):
+    """One entry of GET /users/batch, in the order the ids were requested."""
+    id: int
+    found: bool
+    data: Optional[UserOut] = None  # None when no user has this id
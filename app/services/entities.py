@@ -0,0 +1,277 @@
+"""
+services/entities.py
+
+Canonical locations and companies for job filtering.
+
+Free-text spellings are normalized into alias keys: accents, case and punctuation are
+folded away, a location keeps only the part before the first comma ("Pune, India" ->
+"pune"), and a company drops legal suffixes ("Acme Labs Pvt. Ltd." -> "acme labs").
+Each key maps to one canonical id through the alias tables (app/db/models/canonical.py),
+seeded with the well-known renames in LOCATION_ALIASES.
+
+`resolve` turns a filter value into an id: an exact alias lookup first, then a
+typo-tolerant one, using the pg_trgm trigram index on Postgres (`alias % :key`, best
+similarity first) and difflib over the alias list elsewhere. Writes go through
+`ids_for`, which only matches exactly and creates a canonical row for a new spelling,
+so a typo in one posting never merges two real companies.
+
+Jobs written before the columns existed are filled in by `backfill_job_entities`,
+which runs in the background at startup (and from the command line:
+`python -m app.services.entities [--batch-size 1000]`).
+"""
+
+import asyncio
+import difflib
+import re
+import time
+import unicodedata
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import func, or_, select, text, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.logger import get_logger
+from app.db.models.canonical import Company, CompanyAlias, Location, LocationAlias
+from app.db.models.job import Job
+
+logger = get_logger("entities")
+
+# Canonical location -> other names it is known by
+LOCATION_ALIASES: Dict[str, List[str]] = {
+    "Bangalore": ["Bengaluru", "Bangaluru", "BLR"],
+    "Mumbai": ["Bombay"],
+    "Chennai": ["Madras"],
+    "Kolkata": ["Calcutta"],
+    "Delhi": ["New Delhi", "Delhi NCR"],
+    "Gurgaon": ["Gurugram"],
+    "Kochi": ["Cochin"],
+    "Pune": ["Poona"],
+    "Mysore": ["Mysuru"],
+    "Thiruvananthapuram": ["Trivandrum"],
+    "Visakhapatnam": ["Vizag"],
+    "Hyderabad": ["Secunderabad"],
+    "New York": ["NYC", "New York City"],
+    "San Francisco": ["SF", "San Francisco Bay Area"],
+    "Remote": ["Work From Home", "WFH", "Anywhere"],
+}
+
+# Trailing words that do not tell companies apart
+COMPANY_SUFFIXES = {"inc", "incorporated", "ltd", "limited", "llc", "llp", "plc", "gmbh", "corp", "corporation",
+                    "co", "company", "pvt", "private"}
+
+# Minimum pg_trgm similarity / difflib ratio for a typo-tolerant match
+FUZZY_MIN_SIMILARITY = 0.45
+FUZZY_MIN_RATIO = 0.85
+
+# Resolved filter values remembered per process
+RESOLVE_CACHE_SIZE = 10000
+RESOLVE_CACHE_TTL = 300
+
+BACKFILL_BATCH_SIZE = 1000
+
+
+def _fold(name: str) -> str:
+    name = unicodedata.normalize("NFKD", str(name))
+    name = "".join(char for char in name if not unicodedata.combining(char)).lower().replace("&", " and ")
+    return " ".join(re.sub(r"[^a-z0-9]+", " ", name).split())
+
+
+def location_key(name: str) -> str:
+    """Alias key of a location: "Bengaluru, Karnataka" -> "bengaluru"."""
+    return _fold(str(name).split(",")[0])
+
+
+def company_key(name: str) -> str:
+    """Alias key of a company: "The Acme Labs Pvt. Ltd." -> "acme labs"."""
+    words = _fold(name).split()
+    if len(words) > 1 and words[0] == "the":
+        words = words[1:]
+    while len(words) > 1 and words[-1] in COMPANY_SUFFIXES:
+        words.pop()
+    return " ".join(words)
+
+
+def _insert(db: AsyncSession):
+    return postgresql.insert if db.get_bind().dialect.name == "postgresql" else sqlite.insert
+
+
+class EntityDirectory:
+    """Maps the spellings of one kind of entity (locations or companies) to canonical ids."""
+
+    def __init__(self, canonical, aliases, id_attr: str, key: Callable[[str], str],
+                 builtin: Optional[Dict[str, List[str]]] = None):
+        self.canonical = canonical
+        self.aliases = aliases
+        self.id_attr = id_attr
+        self.entity_id = getattr(aliases, id_attr)
+        self.key = key
+        self.builtin = builtin or {}
+        self._resolved: Dict[str, Tuple[Optional[int], float]] = {}
+        self._alias_ids: Optional[Dict[str, int]] = None  # difflib fallback: every alias key
+        self._trigram: Optional[bool] = None
+
+    def invalidate(self) -> None:
+        """Forgets resolved values after aliases were added."""
+        self._resolved.clear()
+        self._alias_ids = None
+
+    async def _has_trigram(self, db: AsyncSession) -> bool:
+        if self._trigram is None:
+            self._trigram = bool(await db.scalar(text("SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm'")))
+        return self._trigram
+
+    async def _fuzzy(self, db: AsyncSession, key: str) -> Optional[int]:
+        if db.get_bind().dialect.name == "postgresql" and await self._has_trigram(db):
+            # `%` narrows the candidates through the trigram index; similarity() ranks them
+            similarity = func.similarity(self.aliases.alias, key)
+            stmt = (select(self.entity_id)
+                    .where(self.aliases.alias.op("%")(key), similarity >= FUZZY_MIN_SIMILARITY)
+                    .order_by(similarity.desc())
+                    .limit(1))
+            return await db.scalar(stmt)
+
+        if self._alias_ids is None:
+            self._alias_ids = dict((await db.execute(select(self.aliases.alias, self.entity_id))).all())
+        close = difflib.get_close_matches(key, self._alias_ids, n=1, cutoff=FUZZY_MIN_RATIO)
+        return self._alias_ids[close[0]] if close else None
+
+    async def resolve(self, db: AsyncSession, name: str) -> Optional[int]:
+        """Canonical id for a filter value (tolerating typos), or None if nothing is close enough."""
+        key = self.key(name)
+        if not key:
+            return None
+        cached = self._resolved.get(key)
+        if cached is not None and cached[1] > time.monotonic():
+            return cached[0]
+
+        entity_id = await db.scalar(select(self.entity_id).where(self.aliases.alias == key))
+        if entity_id is None:
+            entity_id = await self._fuzzy(db, key)
+
+        if len(self._resolved) >= RESOLVE_CACHE_SIZE:
+            self._resolved.clear()
+        self._resolved[key] = (entity_id, time.monotonic() + RESOLVE_CACHE_TTL)
+        return entity_id
+
+    async def ids_for(self, db: AsyncSession, names: Iterable[str]) -> Dict[str, int]:
+        """
+        Canonical ids for stored spellings (exact alias match), creating a canonical
+        entry and alias for each spelling not seen before. Does not commit.
+        """
+        keys = {name: self.key(name) for name in set(names) if name}
+        keys = {name: key for name, key in keys.items() if key}
+        if not keys:
+            return {}
+        found = dict((await db.execute(
+            select(self.aliases.alias, self.entity_id).where(self.aliases.alias.in_(set(keys.values())))
+        )).all())
+
+        missing: Dict[str, str] = {}
+        for name, key in keys.items():
+            if key not in found:
+                missing.setdefault(key, name.strip())
+        if missing:
+            # ON CONFLICT DO NOTHING + re-select, so concurrent writers agree on the same ids
+            insert = _insert(db)
+            await db.execute(insert(self.canonical).on_conflict_do_nothing(index_elements=["name"]),
+                             [{"name": name} for name in missing.values()])
+            canonical_ids = dict((await db.execute(
+                select(self.canonical.name, self.canonical.id).where(self.canonical.name.in_(missing.values()))
+            )).all())
+            await db.execute(insert(self.aliases).on_conflict_do_nothing(index_elements=["alias"]),
+                             [{"alias": key, self.id_attr: canonical_ids[name]} for key, name in missing.items()])
+            found.update((await db.execute(
+                select(self.aliases.alias, self.entity_id).where(self.aliases.alias.in_(missing))
+            )).all())
+            self.invalidate()
+        return {name: found[key] for name, key in keys.items()}
+
+    async def seed_builtin(self, db: AsyncSession) -> None:
+        """Adds the built-in aliases (idempotent). Does not commit."""
+        if not self.builtin:
+            return
+        canonical_ids = await self.ids_for(db, self.builtin)
+        rows = [{"alias": self.key(alias), self.id_attr: canonical_ids[name]}
+                for name, aliases in self.builtin.items() for alias in aliases]
+        await db.execute(_insert(db)(self.aliases).on_conflict_do_nothing(index_elements=["alias"]), rows)
+        self.invalidate()
+
+
+locations = EntityDirectory(Location, LocationAlias, "location_id", location_key, LOCATION_ALIASES)
+companies = EntityDirectory(Company, CompanyAlias, "company_id", company_key)
+
+
+async def assign_entity_ids(db: AsyncSession, rows: List[dict]) -> None:
+    """Sets `location_id` / `company_id` on job rows from their `location` / `company`. Does not commit."""
+    location_ids = await locations.ids_for(db, (row["location"] for row in rows))
+    company_ids = await companies.ids_for(db, (row["company"] for row in rows))
+    for row in rows:
+        row["location_id"] = location_ids.get(row["location"])
+        row["company_id"] = company_ids.get(row["company"])
+
+
+async def backfill_job_entities(db: AsyncSession, batch_size: int = BACKFILL_BATCH_SIZE) -> int:
+    """
+    Fills `location_id` / `company_id` of jobs missing them, walking jobs in id order,
+    one short transaction per batch. Returns the number of jobs updated.
+    """
+    await locations.seed_builtin(db)
+    await db.commit()
+
+    last_id, updated = 0, 0
+    while True:
+        rows = (await db.execute(
+            select(Job.id, Job.location, Job.company)
+            .where(Job.id > last_id, or_(Job.location_id.is_(None), Job.company_id.is_(None)))
+            .order_by(Job.id)
+            .limit(batch_size)
+        )).all()
+        if not rows:
+            break
+        last_id = rows[-1].id
+
+        values = [row._asdict() for row in rows]
+        await assign_entity_ids(db, values)
+        # ORM bulk UPDATE by primary key: one executemany per batch
+        await db.execute(update(Job), [{"id": value["id"], "location_id": value["location_id"],
+                                        "company_id": value["company_id"]} for value in values])
+        await db.commit()
+        updated += len(values)
+
+    if updated:
+        logger.info(f"[entities] Linked {updated} jobs to canonical locations and companies")
+    return updated
+
+
+async def prepare_entities() -> None:
+    """Startup task: seeds the built-in aliases and links jobs written before the columns existed."""
+    from app.db.session import AsyncSessionLocal
+
+    try:
+        async with AsyncSessionLocal() as db:
+            await backfill_job_entities(db)
+    except Exception as e:
+        logger.error(f"[entities] Could not prepare canonical locations and companies: {e}")
+
+
+def _main(argv=None) -> int:
+    import argparse
+
+    from app.db.session import AsyncSessionLocal
+
+    parser = argparse.ArgumentParser(prog="python -m app.services.entities",
+                                     description="Link jobs to canonical locations and companies")
+    parser.add_argument("--batch-size", type=int, default=BACKFILL_BATCH_SIZE, help="Jobs per transaction")
+    args = parser.parse_args(argv)
+
+    async def main() -> int:
+        async with AsyncSessionLocal() as db:
+            return await backfill_job_entities(db, batch_size=args.batch_size)
+
+    print(f"{asyncio.run(main())} jobs updated")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(_main())
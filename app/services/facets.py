@@ -0,0 +1,131 @@
+"""
+services/facets.py
+
+Facet counts for GET /jobs/facets: how many jobs of the current filter set fall under
+each company, location, required skill and salary bucket.
+
+All facets come from one statement over one CTE of the filtered jobs:
+- Postgres: `GROUP BY GROUPING SETS ((company_id), (location_id), (salary_bucket), ())`
+  aggregates the scalar facets and the total in a single pass; the skill facet unnests
+  `required_skills` from the same CTE (materialized once, as it is referenced twice).
+- Other databases (SQLite) have no GROUPING SETS, so each facet is its own GROUP BY,
+  combined with UNION ALL.
+
+Companies and locations are counted by canonical id (see app/services/entities.py), so
+every spelling of a company lands in the same bucket, then named from the canonical
+tables. Salary buckets are per currency, by the bottom of the range (`salary_min`).
+"""
+
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import String, and_, case, cast, func, literal, null, select, true, tuple_, union_all
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.db.models.canonical import Company, Location
+from app.db.models.job import Job
+
+FACETS = ("company", "location", "skill", "salary")
+
+# Bucket edges per currency (yearly amounts); the last bucket is open-ended
+SALARY_BUCKETS: Dict[str, List[int]] = {
+    "INR": [0, 500_000, 1_000_000, 2_000_000, 3_000_000, 5_000_000],
+    "USD": [0, 50_000, 100_000, 150_000, 200_000],
+    "EUR": [0, 40_000, 70_000, 100_000, 150_000],
+    "GBP": [0, 30_000, 60_000, 90_000, 120_000],
+}
+
+
+def _bucket_bounds() -> List[Tuple[str, int, Optional[int]]]:
+    bounds = []
+    for currency, edges in SALARY_BUCKETS.items():
+        for low, high in zip(edges, edges[1:] + [None]):
+            bounds.append((currency, low, high))
+    return bounds
+
+
+SALARY_BUCKET_BOUNDS = {f"{currency}:{low}": (currency, low, high) for currency, low, high in _bucket_bounds()}
+
+
+def salary_bucket():
+    """`'<currency>:<lower edge>'` of the job's salary_min, NULL when it has none."""
+    whens = []
+    for key, (currency, low, high) in SALARY_BUCKET_BOUNDS.items():
+        condition = and_(Job.salary_currency == currency, Job.salary_min >= low)
+        if high is not None:
+            condition = and_(condition, Job.salary_min < high)
+        whens.append((condition, key))
+    return case(*whens, else_=null())
+
+
+def facet_base():
+    """The columns the facets are computed from; apply the same filters as /jobs/filter to it."""
+    return select(Job.id, Job.company_id, Job.location_id, Job.required_skills, salary_bucket().label("salary_bucket"))
+
+
+def _facet_statement(filtered, dialect: str):
+    f = filtered.cte("filtered")
+    if dialect == "postgresql":
+        facet = case(
+            (func.grouping(f.c.company_id) == 0, "company"),
+            (func.grouping(f.c.location_id) == 0, "location"),
+            (func.grouping(f.c.salary_bucket) == 0, "salary"),
+            else_="total",
+        )
+        key = func.coalesce(cast(f.c.company_id, String), cast(f.c.location_id, String), f.c.salary_bucket)
+        scalar = [
+            select(facet.label("facet"), key.label("key"), func.count().label("n"))
+            .select_from(f)
+            .group_by(func.grouping_sets(tuple_(f.c.company_id), tuple_(f.c.location_id),
+                                         tuple_(f.c.salary_bucket), tuple_()))
+        ]
+        elements = func.jsonb_array_elements_text(f.c.required_skills).table_valued("value").alias("skill")
+    else:
+        scalar = [
+            select(literal(name).label("facet"), cast(column, String).label("key"), func.count().label("n"))
+            .select_from(f).group_by(column)
+            for name, column in (("company", f.c.company_id), ("location", f.c.location_id),
+                                 ("salary", f.c.salary_bucket))
+        ]
+        scalar.append(select(literal("total"), null(), func.count()).select_from(f))
+        elements = func.json_each(f.c.required_skills).table_valued("value").alias("skill")
+
+    skills = (select(literal("skill"), cast(elements.c.value, String), func.count())
+              .select_from(f).join(elements, true()).group_by(elements.c.value))
+    return union_all(*scalar, skills)
+
+
+async def job_facets(db: AsyncSession, filtered, top: int) -> Dict:
+    """
+    Counts the jobs of `filtered` (a filtered `facet_base()`) per facet value.
+    Returns the total and the `top` most frequent values of each facet.
+    """
+    rows = (await db.execute(_facet_statement(filtered, db.get_bind().dialect.name))).all()
+
+    total = 0
+    counts: Dict[str, List[Tuple[str, int]]] = {facet: [] for facet in FACETS}
+    for facet, key, n in rows:
+        if facet == "total":
+            total = n
+        elif key is not None:
+            counts[facet].append((key, n))
+    for facet in FACETS:
+        counts[facet] = sorted(counts[facet], key=lambda item: (-item[1], item[0]))[:top]
+
+    # Name the canonical ids that made the cut
+    names = {}
+    for facet, model in (("company", Company), ("location", Location)):
+        ids = [int(key) for key, _ in counts[facet]]
+        names[facet] = dict((await db.execute(select(model.id, model.name).where(model.id.in_(ids)))).all()) if ids else {}
+
+    result: Dict = {"total": total}
+    for facet in ("company", "location"):
+        result[facet] = [{"value": names[facet].get(int(key), key), "id": int(key), "count": n}
+                         for key, n in counts[facet]]
+    result["skill"] = [{"value": key, "count": n} for key, n in counts["skill"]]
+    result["salary"] = []
+    for key, n in counts["salary"]:
+        currency, low, high = SALARY_BUCKET_BOUNDS[key]
+        label = f"{currency} {low}+" if high is None else f"{currency} {low}-{high}"
+        result["salary"].append({"value": label, "count": n, "currency": currency,
+                                 "salary_min": low, "salary_max": high})
+    return result
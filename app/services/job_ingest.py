@@ -0,0 +1,276 @@
+"""
+services/job_ingest.py
+
+Bulk job ingestion for POST /jobs/bulk.
+
+The upload (NDJSON or CSV) is read from the request stream line by line, validated
+against `JobsCreate` and written in batches of BULK_BATCH_SIZE rows, so memory stays
+bounded by one batch whatever the feed size. Each batch is its own transaction:
+
+- Postgres (asyncpg): rows are `COPY`-ed into a temporary staging table and merged
+  into `jobs` with `INSERT ... SELECT ... ON CONFLICT (description) DO UPDATE`.
+- Other databases (SQLite): the same upsert as an executemany.
+
+`description` is unique on `jobs`, so it is the key that decides insert vs update.
+Invalid rows are skipped and reported with their line number. A batch the database
+rejects is rolled back and reported with its line range; the other batches are still
+written, so the report always says what made it in.
+"""
+
+import codecs
+import csv
+from typing import AsyncIterator, Dict, List, Optional, Tuple
+
+import orjson
+from pydantic import TypeAdapter, ValidationError
+from sqlalchemy import select, text
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.logger import get_logger
+from app.db.models.job import Job
+from app.db.salary import SALARY_COLUMNS, salary_columns
+from app.db.versioning import row_version
+from app.schemas.job import JobsCreate
+from app.services.entities import assign_entity_ids
+from app.services.matching import matching_engine
+
+logger = get_logger("job_ingest")
+
+BULK_BATCH_SIZE = 5000
+BULK_MAX_REPORTED_ERRORS = 1000
+
+JOB_CREATE_ADAPTER = TypeAdapter(JobsCreate)
+# Uploaded fields plus the salary columns derived from salary_range, the canonical location/company ids
+# and the row version (set here: upserts do not run the column's onupdate)
+INGEST_COLUMNS = list(JobsCreate.model_fields) + list(SALARY_COLUMNS) + ["location_id", "company_id", "version"]
+
+STAGING_DDL = """
+CREATE TEMP TABLE IF NOT EXISTS jobs_staging (
+    title text NOT NULL,
+    description text NOT NULL,
+    company text NOT NULL,
+    location text NOT NULL,
+    salary_range json,
+    required_skills jsonb,
+    posted_by integer,
+    salary_min bigint,
+    salary_max bigint,
+    salary_currency varchar(3),
+    location_id integer,
+    company_id integer,
+    version bigint NOT NULL
+) ON COMMIT DELETE ROWS
+"""
+
+MERGE_SQL = """
+INSERT INTO jobs ({columns})
+SELECT {columns} FROM jobs_staging
+ON CONFLICT (description) DO UPDATE SET {updates}
+RETURNING id, description, (xmax = 0) AS inserted
+""".format(
+    columns=", ".join(INGEST_COLUMNS),
+    updates=", ".join(f"{c} = EXCLUDED.{c}" for c in INGEST_COLUMNS if c != "description"),
+)
+
+
+# --- Parsing ---
+
+async def _lines(chunks: AsyncIterator[bytes]) -> AsyncIterator[str]:
+    """Splits a byte stream into decoded lines (without the line break)."""
+    decoder = codecs.getincrementaldecoder("utf-8-sig")(errors="replace")
+    pending = ""
+    async for chunk in chunks:
+        pending += decoder.decode(chunk)
+        *complete, pending = pending.split("\n")
+        for line in complete:
+            yield line.rstrip("\r")
+    pending += decoder.decode(b"", final=True)
+    if pending:
+        yield pending.rstrip("\r")
+
+
+def _csv_list(value: Optional[str]):
+    # List columns are either JSON arrays or "|"-separated values
+    value = (value or "").strip()
+    if value.startswith("["):
+        return orjson.loads(value)
+    return [part.strip() for part in value.split("|") if part.strip()]
+
+
+async def parse_rows(chunks: AsyncIterator[bytes], fmt: str) -> AsyncIterator[Tuple[int, object]]:
+    """
+    Yields (line number, raw row) pairs: the JSON text of each NDJSON line, or a dict
+    per CSV record (header row first; quoted fields may span lines).
+    """
+    line_no = 0
+    if fmt == "ndjson":
+        async for line in _lines(chunks):
+            line_no += 1
+            if line.strip():
+                yield line_no, line
+        return
+
+    header: Optional[List[str]] = None
+    record, record_start = "", 0
+    async for line in _lines(chunks):
+        line_no += 1
+        if not record:
+            record_start = line_no
+        record = f"{record}\n{line}" if record else line
+        if record.count('"') % 2:
+            continue  # inside a quoted field that continues on the next line
+        values = next(csv.reader([record])) if record.strip() else []
+        record = ""
+        if not values:
+            continue
+        if header is None:
+            header = [name.strip() for name in values]
+            continue
+        row = dict(zip(header, values))
+        for field in ("salary_range", "required_skills"):
+            if field in row:
+                try:
+                    row[field] = _csv_list(row[field])
+                except orjson.JSONDecodeError:
+                    pass  # left as a string; validation reports it
+        yield record_start, row
+    if record:
+        yield record_start, None  # an unterminated quoted field swallowed the rest of the upload
+
+
+def validate_row(raw) -> dict:
+    if raw is None:
+        raise ValueError("unterminated quoted field")
+    if isinstance(raw, str):
+        row = JOB_CREATE_ADAPTER.validate_json(raw).model_dump()
+    else:
+        row = JOB_CREATE_ADAPTER.validate_python(raw).model_dump()
+    row.update(salary_columns(row["salary_range"]))
+    return row
+
+
+def format_validation_error(exc: ValidationError) -> str:
+    return "; ".join(
+        f"{'.'.join(str(part) for part in error['loc']) or 'row'}: {error['msg']}" for error in exc.errors()
+    )
+
+
+# --- Writing ---
+
+async def _copy_merge(db: AsyncSession, rows: List[dict]) -> Tuple[int, int, Dict[str, int]]:
+    """COPY the batch into the staging table, then upsert it into jobs in one statement."""
+    await db.execute(text(STAGING_DDL))
+    connection = await db.connection()
+    raw = await connection.get_raw_connection()
+    records = [
+        tuple(orjson.dumps(row[c]).decode() if c in ("salary_range", "required_skills") else row[c]
+              for c in INGEST_COLUMNS)
+        for row in rows
+    ]
+    await raw.driver_connection.copy_records_to_table("jobs_staging", records=records, columns=INGEST_COLUMNS)
+    merged = (await db.execute(text(MERGE_SQL))).all()
+    inserted = sum(1 for row in merged if row.inserted)
+    return inserted, len(merged) - inserted, {row.description: row.id for row in merged}
+
+
+async def _executemany_upsert(db: AsyncSession, rows: List[dict]) -> Tuple[int, int, Dict[str, int]]:
+    """Upsert through an executemany; inserted/updated split from the descriptions already present."""
+    descriptions = [row["description"] for row in rows]
+    existing = len((await db.execute(select(Job.description).where(Job.description.in_(descriptions)))).all())
+
+    insert = postgresql.insert if db.get_bind().dialect.name == "postgresql" else sqlite.insert
+    stmt = insert(Job)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[Job.description],
+        set_={c: stmt.excluded[c] for c in INGEST_COLUMNS if c != "description"},
+    )
+    await db.execute(stmt, rows)
+    ids = dict((await db.execute(select(Job.description, Job.id).where(Job.description.in_(descriptions)))).all())
+    return len(rows) - existing, existing, ids
+
+
+async def write_batch(db: AsyncSession, rows: List[dict]) -> Tuple[int, int, List[Tuple[int, list]]]:
+    """
+    Upserts one batch in its own transaction.
+    Returns (inserted, updated, (id, required_skills) of every job written).
+    """
+    # A description may repeat inside a batch; the last occurrence wins and the earlier ones
+    # count as updated, as they would row by row
+    received = len(rows)
+    rows = list({row["description"]: row for row in rows}.values())
+    await assign_entity_ids(db, rows)
+    for row in rows:
+        row["version"] = row_version()
+    bind = db.get_bind()
+    if bind.dialect.name == "postgresql" and bind.dialect.driver == "asyncpg":
+        inserted, updated, ids = await _copy_merge(db, rows)
+    else:
+        inserted, updated, ids = await _executemany_upsert(db, rows)
+    await db.commit()
+    written = [(ids[row["description"]], row["required_skills"]) for row in rows if row["description"] in ids]
+    return inserted, updated + received - len(rows), written
+
+
+async def ingest_jobs(db: AsyncSession, chunks: AsyncIterator[bytes], fmt: str) -> Dict:
+    """
+    Parses, validates and upserts an upload; returns the BulkIngestReport fields.
+    A batch the database rejects is rolled back and reported as failed (with its line
+    range); the batches before and after it are still written. Written jobs are upserted
+    into the skill matching index.
+    """
+    received = inserted = updated = failed = 0
+    errors: List[Dict] = []
+    batch: List[dict] = []
+    batch_lines: List[int] = []
+    truncated = False
+
+    def report_error(error: Dict) -> None:
+        nonlocal truncated
+        if len(errors) < BULK_MAX_REPORTED_ERRORS:
+            errors.append(error)
+        else:
+            truncated = True
+
+    async def flush():
+        nonlocal inserted, updated, failed
+        try:
+            batch_inserted, batch_updated, written = await write_batch(db, batch)
+        except Exception as e:
+            await db.rollback()
+            failed += len(batch)
+            logger.exception(f"[bulk] Batch of lines {batch_lines[0]}-{batch_lines[-1]} failed: {e}")
+            report_error({"line": batch_lines[0], "last_line": batch_lines[-1],
+                          "error": f"batch not written, the database rejected it ({type(e).__name__})"})
+        else:
+            inserted += batch_inserted
+            updated += batch_updated
+            for job_id, skills in written:
+                matching_engine.jobs.upsert(job_id, skills)
+        batch.clear()
+        batch_lines.clear()
+
+    async for line_no, raw in parse_rows(chunks, fmt):
+        received += 1
+        try:
+            batch.append(validate_row(raw))
+            batch_lines.append(line_no)
+        except (ValidationError, ValueError) as exc:
+            failed += 1
+            message = format_validation_error(exc) if isinstance(exc, ValidationError) else str(exc)
+            report_error({"line": line_no, "error": message})
+            continue
+        if len(batch) >= BULK_BATCH_SIZE:
+            await flush()
+    if batch:
+        await flush()
+
+    logger.info(f"[bulk] Ingested {received} rows ({fmt}): {inserted} inserted, {updated} updated, {failed} failed")
+    return {
+        "received": received,
+        "inserted": inserted,
+        "updated": updated,
+        "failed": failed,
+        "errors": errors,
+        "errors_truncated": truncated,
+    }
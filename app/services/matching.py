@@ -0,0 +1,241 @@
+"""
+services/matching.py
+
+Resume-to-job skill matching.
+
+Each side (jobs by `required_skills`, resumes by `extracted_skills`) is held in a
+`SkillIndex`: an in-memory inverted index from normalized skill to the slots of the
+documents that list it. Scoring a query is vectorized with NumPy: the posting lists
+of the query's skills are concatenated and `bincount` gives the overlap with every
+document at once, which is turned into a Jaccard score and cut to the top k with
+`argpartition`. Nothing is rescanned per request; the indexes load rows past their
+id high-water mark incrementally, at most once every MATCHING_REFRESH_SECONDS.
+"""
+
+import asyncio
+import re
+import time
+from array import array
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.core.logger import get_logger
+from app.db.models.job import Job
+from app.db.models.resume import Resume
+
+logger = get_logger("matching")
+
+# Rows loaded per query while (re)filling an index
+REFRESH_BATCH_SIZE = 10000
+
+
+def normalize_skill(skill: str) -> str:
+    """Lower-cases a skill and collapses whitespace, so "Machine  Learning " == "machine learning"."""
+    return re.sub(r"\s+", " ", str(skill)).strip().strip(".,;").lower()
+
+
+class SkillIndex:
+    """
+    Inverted index from normalized skill to the documents (jobs or resumes) that list it.
+
+    Documents live in append-only slots; replacing or removing a document tombstones
+    its old slot (size 0) so posting lists never have to be rewritten in place. The
+    index is compacted once tombstones make up a quarter of the slots.
+    """
+
+    def __init__(self, id_column, skills_column):
+        self.id_column = id_column
+        self.skills_column = skills_column
+        self.high_water = 0  # highest document id loaded by refresh; ad-hoc upserts leave it alone
+        self.refreshed_at = 0.0
+        self._lock = asyncio.Lock()
+        self._reset()
+
+    def _reset(self) -> None:
+        self._vocabulary: Dict[str, int] = {}
+        self._skill_names: List[str] = []
+        self._postings: Dict[int, array] = {}
+        self._doc_ids = array("q")
+        self._sizes = array("i")
+        self._doc_skills: List[Tuple[int, ...]] = []
+        self._slot_of: Dict[int, int] = {}
+        self._dead = 0
+
+    def __len__(self) -> int:
+        return len(self._slot_of)
+
+    def skills_of(self, doc_id: int) -> Optional[List[str]]:
+        """Returns the normalized skills of an indexed document, or None if it is not indexed."""
+        slot = self._slot_of.get(doc_id)
+        if slot is None:
+            return None
+        return [self._skill_names[skill_id] for skill_id in self._doc_skills[slot]]
+
+    def upsert(self, doc_id: int, skills: Optional[Iterable[str]]) -> None:
+        """
+        Adds a document, replacing any previous version of it.
+        Does not move the high-water mark: refresh still loads every id above it, so
+        documents between the mark and an ad-hoc upsert are not skipped.
+        """
+        self.remove(doc_id)
+        skill_ids = []
+        for skill in set(normalize_skill(s) for s in (skills or []) if s):
+            skill_id = self._vocabulary.get(skill)
+            if skill_id is None:
+                skill_id = self._vocabulary[skill] = len(self._skill_names)
+                self._skill_names.append(skill)
+            skill_ids.append(skill_id)
+
+        slot = len(self._doc_ids)
+        self._doc_ids.append(doc_id)
+        self._sizes.append(len(skill_ids))
+        self._doc_skills.append(tuple(skill_ids))
+        self._slot_of[doc_id] = slot
+        for skill_id in skill_ids:
+            self._postings.setdefault(skill_id, array("i")).append(slot)
+
+    def remove(self, doc_id: int) -> None:
+        """Tombstones a document; its slot no longer scores."""
+        slot = self._slot_of.pop(doc_id, None)
+        if slot is None:
+            return
+        self._sizes[slot] = 0
+        self._dead += 1
+        if self._dead * 4 > len(self._doc_ids):
+            self._compact()
+
+    def _compact(self) -> None:
+        live = [(self._doc_ids[slot], self.skills_of(self._doc_ids[slot]))
+                for slot in sorted(self._slot_of.values())]
+        self._reset()
+        for doc_id, skills in live:
+            self.upsert(doc_id, skills)
+
+    def invalidate(self) -> None:
+        """Drops everything; the next refresh reloads the index from scratch (e.g. after a bulk upsert)."""
+        self._reset()
+        self.high_water = 0
+        self.refreshed_at = 0.0
+
+    def top_k(self, skills: Iterable[str], k: int, exclude: Sequence[int] = ()) -> List[Tuple[int, float, List[str]]]:
+        """
+        Scores every document against `skills` by Jaccard similarity of the skill sets.
+        Returns up to k (doc_id, score, matched_skills) tuples, best first.
+        """
+        query = {self._vocabulary[s] for s in (normalize_skill(s) for s in skills) if s in self._vocabulary}
+        if not query or not self._doc_ids:
+            return []
+
+        # Overlap with every slot in one pass over the query's posting lists
+        hits = np.concatenate([np.frombuffer(self._postings[skill_id], dtype=np.int32) for skill_id in query])
+        overlap = np.bincount(hits, minlength=len(self._doc_ids)).astype(np.float32)
+        sizes = np.frombuffer(self._sizes, dtype=np.int32)
+        union = sizes + len(query) - overlap
+        scores = np.where(sizes > 0, overlap / np.maximum(union, 1), 0.0)
+
+        for doc_id in exclude:
+            slot = self._slot_of.get(doc_id)
+            if slot is not None:
+                scores[slot] = 0.0
+
+        candidates = np.flatnonzero(scores)
+        if len(candidates) > k:
+            candidates = candidates[np.argpartition(scores[candidates], -k)[-k:]]
+        doc_ids = np.frombuffer(self._doc_ids, dtype=np.int64)
+        ranked = sorted(candidates, key=lambda slot: (-scores[slot], doc_ids[slot]))
+
+        return [
+            (int(doc_ids[slot]), round(float(scores[slot]), 4),
+             sorted(self._skill_names[skill_id] for skill_id in query.intersection(self._doc_skills[slot])))
+            for slot in ranked
+        ]
+
+    async def refresh(self, db: AsyncSession, force: bool = False) -> None:
+        """
+        Loads documents inserted since the last refresh (id greater than the high-water mark).
+        Skipped when the last refresh is more recent than MATCHING_REFRESH_SECONDS.
+        """
+        if not force and time.monotonic() - self.refreshed_at < settings.MATCHING_REFRESH_SECONDS:
+            return
+        async with self._lock:
+            if not force and time.monotonic() - self.refreshed_at < settings.MATCHING_REFRESH_SECONDS:
+                return
+            loaded = 0
+            while True:
+                stmt = (
+                    select(self.id_column, self.skills_column)
+                    .where(self.id_column > self.high_water)
+                    .order_by(self.id_column)
+                    .limit(REFRESH_BATCH_SIZE)
+                )
+                rows = (await db.execute(stmt)).all()
+                for doc_id, skills in rows:
+                    self.upsert(doc_id, skills)
+                if rows:
+                    self.high_water = rows[-1][0]
+                loaded += len(rows)
+                if len(rows) < REFRESH_BATCH_SIZE:
+                    break
+            self.refreshed_at = time.monotonic()
+            if loaded:
+                logger.info(f"[matching] Indexed {loaded} {self.id_column.class_.__tablename__}, {len(self)} in total")
+
+
+class MatchingEngine:
+    """Matches resumes to jobs and jobs to resumes through two SkillIndexes."""
+
+    def __init__(self):
+        self.jobs = SkillIndex(Job.id, Job.required_skills)
+        self.resumes = SkillIndex(Resume.id, Resume.extracted_skills)
+
+    async def refresh(self, db: AsyncSession, force: bool = False) -> None:
+        await self.jobs.refresh(db, force=force)
+        await self.resumes.refresh(db, force=force)
+
+    async def _skills(self, db: AsyncSession, index: SkillIndex, doc_id: int) -> Optional[List[str]]:
+        skills = index.skills_of(doc_id)
+        if skills is None:
+            # Not indexed yet (or inserted after the last refresh): read it directly
+            row = (await db.execute(
+                select(index.skills_column).where(index.id_column == doc_id)
+            )).first()
+            if row is None:
+                return None
+            skills = row[0] or []
+            index.upsert(doc_id, skills)
+        return skills
+
+    async def matches_for_resume(self, db: AsyncSession, resume_id: int, k: int) -> Optional[List[Tuple[int, float, List[str]]]]:
+        """Top-k jobs for a resume, or None if the resume does not exist."""
+        await self.refresh(db)
+        skills = await self._skills(db, self.resumes, resume_id)
+        if skills is None:
+            return None
+        return self.jobs.top_k(skills, k)
+
+    async def candidates_for_job(self, db: AsyncSession, job_id: int, k: int) -> Optional[List[Tuple[int, float, List[str]]]]:
+        """Top-k resumes for a job, or None if the job does not exist."""
+        await self.refresh(db)
+        skills = await self._skills(db, self.jobs, job_id)
+        if skills is None:
+            return None
+        return self.resumes.top_k(skills, k)
+
+
+# Process-wide engine shared by the jobs and resumes routers
+matching_engine = MatchingEngine()
+
+
+async def warm_matching_index() -> None:
+    """Builds both indexes in the background at startup so the first request does not pay for it."""
+    from app.db.session import AsyncSessionLocal
+
+    try:
+        async with AsyncSessionLocal() as db:
+            await matching_engine.refresh(db, force=True)
+    except Exception as e:
+        logger.error(f"[matching] Initial index build failed, will retry on first request: {e}")
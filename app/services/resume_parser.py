@@ -0,0 +1,365 @@
+"""
+services/resume_parser.py
+
+Resume parsing pipeline: turns a directory of resume files into `resumes` rows.
+
+The directory is walked in the main process; reading, hashing and parsing happen in a
+`ProcessPoolExecutor` (one worker per core by default), so throughput scales with the
+cores available. Results are upserted on `original_file_path` in batches of
+RESUME_INSERT_BATCH rows; the parsed text goes, compressed, to `resume_texts`.
+
+Already loaded files are skipped without being read. With `reindex=True` they are
+re-hashed instead, and only files whose sha256 differs from the stored
+`content_hash` are parsed and updated. Written resumes are upserted into the skill
+matching index.
+
+Supported formats: .txt/.md, .docx (read from its XML, no dependency) and .pdf when
+the optional `pypdf` package is installed.
+
+The owning user is the number in the file's parent directory name
+(`<root>/<user_id>/cv.pdf`) or a leading number in its file name (`42_cv.pdf`),
+otherwise `default_user_id`.
+
+Command line:
+    python -m app.services.resume_parser /data/resumes [--reindex] [--workers 8] [--user-id 1]
+"""
+
+import asyncio
+import functools
+import hashlib
+import html
+import io
+import os
+import re
+import time
+import uuid
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from sqlalchemy import select
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.core.logger import get_logger
+from app.db.models.resume import Resume, ResumeText
+from app.db.versioning import row_version
+from app.services.matching import matching_engine
+
+try:  # optional: PDF text extraction
+    from pypdf import PdfReader
+except ImportError:  # pragma: no cover - depends on the environment
+    PdfReader = None
+
+logger = get_logger("resume_parser")
+
+SUPPORTED_EXTENSIONS = {".txt", ".md", ".docx", ".pdf"}
+
+# Skills recognised in resume text; matched on word boundaries, case-insensitively.
+# Skills that are also everyday words ("go", "rest", "express", "spring") are left out.
+SKILL_VOCABULARY = [
+    "python", "java", "javascript", "typescript", "golang", "rust", "c++", "c#", "scala", "kotlin",
+    "swift", "ruby", "php", "sql", "postgresql", "mysql", "sqlite", "mongodb", "redis", "elasticsearch",
+    "kafka", "rabbitmq", "docker", "kubernetes", "aws", "gcp", "azure", "terraform", "ansible", "linux",
+    "fastapi", "django", "flask", "spring boot", "react", "angular", "vue", "node.js",
+    "graphql", "rest api", "grpc", "html", "css", "sass", "pandas", "numpy", "scipy", "pytorch", "tensorflow",
+    "keras", "scikit-learn", "spark", "hadoop", "airflow", "dbt", "tableau", "power bi", "excel", "git",
+    "ci/cd", "jenkins", "github actions", "selenium", "pytest", "junit", "machine learning", "deep learning",
+    "nlp", "computer vision", "data analysis", "microservices", "agile", "scrum", "figma", "jira",
+]
+_SKILL_PATTERN = re.compile(
+    r"(?<![\w+#.])(" + "|".join(re.escape(s) for s in sorted(SKILL_VOCABULARY, key=len, reverse=True)) + r")(?![\w+#])",
+    re.IGNORECASE,
+)
+_YEARS_PATTERN = re.compile(r"(\d{1,2})(?:\.\d)?\s*\+?\s*(?:years?|yrs?)\b", re.IGNORECASE)
+_DEGREE_PATTERN = re.compile(
+    r"\b(B\.?\s?Tech|M\.?\s?Tech|B\.?\s?E|M\.?\s?E|B\.?\s?Sc|M\.?\s?Sc|BCA|MCA|MBA|Ph\.?\s?D|"
+    r"Bachelor(?:'s)?(?: of [A-Z][a-z]+)?|Master(?:'s)?(?: of [A-Z][a-z]+)?)\b"
+)
+_YEAR_PATTERN = re.compile(r"\b(19[5-9]\d|20[0-4]\d)\b")
+_TITLE_PATTERN = re.compile(
+    r"\b((?:Senior|Junior|Lead|Staff|Principal)?\s*(?:[A-Z][A-Za-z]+\s){0,2}"
+    r"(?:Engineer|Developer|Scientist|Analyst|Manager|Architect|Designer|Consultant))\b"
+)
+
+
+# --- Parsing (runs in worker processes) ---
+
+def _docx_text(data: bytes) -> str:
+    with zipfile.ZipFile(io.BytesIO(data)) as archive:
+        xml = archive.read("word/document.xml").decode("utf-8", errors="replace")
+    xml = re.sub(r"</w:p>", "\n", xml)
+    return html.unescape(re.sub(r"<[^>]+>", "", xml))
+
+
+def _pdf_text(path: str) -> str:
+    if PdfReader is None:
+        raise ValueError("PDF support needs the optional 'pypdf' package")
+    return "\n".join(page.extract_text() or "" for page in PdfReader(path).pages)
+
+
+def extract_text(path: str, data: bytes) -> str:
+    extension = os.path.splitext(path)[1].lower()
+    if extension == ".docx":
+        text = _docx_text(data)
+    elif extension == ".pdf":
+        text = _pdf_text(path)
+    else:
+        text = data.decode("utf-8", errors="replace")
+    # Collapse runs of spaces but keep line breaks, which separate sections
+    return "\n".join(re.sub(r"[ \t\r\f\v]+", " ", line).strip() for line in text.splitlines() if line.strip())
+
+
+def extract_fields(text: str) -> Dict:
+    """Skills, experience and education found in resume text."""
+    skills = sorted({match.lower() for match in _SKILL_PATTERN.findall(text)})
+
+    years = [int(y) for y in _YEARS_PATTERN.findall(text) if int(y) <= 50]
+    title_match = _TITLE_PATTERN.search(text)
+    experience = {
+        "title": title_match.group(1).strip() if title_match else "",
+        "years": max(years) if years else 0,
+    }
+
+    degree_match = _DEGREE_PATTERN.search(text)
+    education = {"degree": "", "year": 0}
+    if degree_match:
+        education["degree"] = degree_match.group(1)
+        # The graduation year is usually on the same line as the degree
+        line_end = text.find("\n", degree_match.end())
+        line = text[text.rfind("\n", 0, degree_match.start()) + 1: line_end if line_end != -1 else len(text)]
+        year_match = _YEAR_PATTERN.findall(line)
+        if year_match:
+            education["year"] = int(max(year_match))
+
+    return {"extracted_skills": skills, "experience": experience, "education": education}
+
+
+def parse_resume_file(path: str, known_hash: Optional[str] = None) -> Dict:
+    """
+    Reads, hashes and parses one file. Returns {"path", "status", ...}:
+    "parsed" with the row fields, "unchanged" when the hash equals `known_hash`,
+    or "error" with the reason.
+    """
+    try:
+        with open(path, "rb") as f:
+            data = f.read()
+        content_hash = hashlib.sha256(data).hexdigest()
+        if content_hash == known_hash:
+            return {"path": path, "status": "unchanged"}
+        text = extract_text(path, data)
+        if not text:
+            return {"path": path, "status": "error", "error": "no text could be extracted"}
+        return {"path": path, "status": "parsed", "content_hash": content_hash, "parsed_text": text,
+                **extract_fields(text)}
+    except Exception as e:
+        return {"path": path, "status": "error", "error": f"{type(e).__name__}: {e}"}
+
+
+# --- Pipeline (main process) ---
+
+# Runs started through the API, by id (kept for the life of the process). The registry is
+# per process: with several workers, a run can only be polled on the worker that started it.
+ingest_runs: Dict[str, "IngestRun"] = {}
+
+# Failures kept per run; later ones are only counted
+RESUME_MAX_REPORTED_ERRORS = 100
+
+def iter_resume_files(root: str) -> Iterator[str]:
+    for directory, _, files in os.walk(root):
+        for name in sorted(files):
+            if os.path.splitext(name)[1].lower() in SUPPORTED_EXTENSIONS:
+                yield os.path.abspath(os.path.join(directory, name))
+
+
+def user_id_for(path: str, default_user_id: Optional[int]) -> Optional[int]:
+    parent = os.path.basename(os.path.dirname(path))
+    if parent.isdigit():
+        return int(parent)
+    prefix = re.match(r"(\d+)[_\-]", os.path.basename(path))
+    if prefix:
+        return int(prefix.group(1))
+    return default_user_id
+
+
+async def _known_hashes(db: AsyncSession, root: str) -> Dict[str, Optional[str]]:
+    prefix = os.path.abspath(root).rstrip(os.sep) + os.sep
+    rows = await db.execute(
+        select(Resume.original_file_path, Resume.content_hash).where(Resume.original_file_path.startswith(prefix))
+    )
+    return dict(rows.all())
+
+
+async def _write_batch(db: AsyncSession, rows: List[dict]) -> List[Tuple[int, list]]:
+    """
+    Upserts the resumes on their path, then their compressed texts on the resume id.
+    Returns (id, extracted_skills) of every resume written.
+    """
+    insert = postgresql.insert if db.get_bind().dialect.name == "postgresql" else sqlite.insert
+    texts = {row["original_file_path"]: row["parsed_text"] for row in rows}
+    resumes = [{**{c: v for c, v in row.items() if c != "parsed_text"}, "version": row_version()} for row in rows]
+    stmt = insert(Resume)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[Resume.original_file_path],
+        set_={c: stmt.excluded[c] for c in resumes[0] if c != "original_file_path"},
+    )
+    await db.execute(stmt, resumes)
+
+    ids = (await db.execute(
+        select(Resume.original_file_path, Resume.id).where(Resume.original_file_path.in_(texts))
+    )).all()
+    stmt = insert(ResumeText)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[ResumeText.resume_id],
+        set_={c: stmt.excluded[c] for c in ("codec", "data", "size")},
+    )
+    await db.execute(stmt, [ResumeText.values(resume_id, texts[path]) for path, resume_id in ids])
+    await db.commit()
+    skills = {row["original_file_path"]: row["extracted_skills"] for row in rows}
+    return [(resume_id, skills[path]) for path, resume_id in ids]
+
+
+class IngestRun:
+    """Progress and outcome of one directory ingest."""
+
+    def __init__(self, root: str, reindex: bool):
+        self.id = uuid.uuid4().hex
+        self.root = root
+        self.reindex = reindex
+        self.status = "running"
+        self.started_at = time.time()
+        self.finished_at: Optional[float] = None
+        self.counts = {"seen": 0, "skipped": 0, "unchanged": 0, "parsed": 0, "written": 0, "failed": 0}
+        self.errors: List[Dict[str, str]] = []  # the first RESUME_MAX_REPORTED_ERRORS failures
+        self.errors_truncated = False
+        self.task: Optional[asyncio.Task] = None  # set when run in the background by the API
+
+    def to_dict(self) -> Dict:
+        end = self.finished_at or time.time()
+        return {"id": self.id, "root": self.root, "reindex": self.reindex, "status": self.status,
+                "elapsed_seconds": round(end - self.started_at, 3), **self.counts, "errors": self.errors,
+                "errors_truncated": self.errors_truncated}
+
+    def report_error(self, path: str, error: str) -> None:
+        if len(self.errors) < RESUME_MAX_REPORTED_ERRORS:
+            self.errors.append({"path": path, "error": error})
+        else:
+            self.errors_truncated = True
+
+
+async def ingest_directory(
+        db: AsyncSession,
+        root: str,
+        reindex: bool = False,
+        default_user_id: Optional[int] = None,
+        workers: Optional[int] = None,
+        run: Optional[IngestRun] = None,
+) -> IngestRun:
+    """Parses every supported file under `root` in a process pool and upserts the results."""
+    run = run or IngestRun(root, reindex)
+    workers = workers or settings.RESUME_PARSE_WORKERS or os.cpu_count() or 1
+    known = await _known_hashes(db, root)
+    loop = asyncio.get_running_loop()
+    batch: List[dict] = []
+
+    def fail(path: str, error: str) -> None:
+        run.counts["failed"] += 1
+        run.report_error(path, error)
+
+    async def flush() -> None:
+        written = await _write_batch(db, batch)
+        run.counts["written"] += len(batch)
+        batch.clear()
+        # New and re-parsed resumes go straight into the skill matching index
+        for resume_id, skills in written:
+            matching_engine.resumes.upsert(resume_id, skills)
+
+    async def collect(result: Dict) -> None:
+        if result["status"] == "unchanged":
+            run.counts["unchanged"] += 1
+            return
+        if result["status"] == "error":
+            fail(result["path"], result["error"])
+            return
+        run.counts["parsed"] += 1
+        user_id = user_id_for(result["path"], default_user_id)
+        if user_id is None:
+            fail(result["path"], "no user id in the path and no default user id given")
+            return
+        batch.append({
+            "user_id": user_id,
+            "original_file_path": result["path"],
+            "parsed_text": result["parsed_text"],
+            "extracted_skills": result["extracted_skills"],
+            "experience": result["experience"],
+            "education": result["education"],
+            "content_hash": result["content_hash"],
+        })
+        if len(batch) >= settings.RESUME_INSERT_BATCH:
+            await flush()
+
+    pool = ProcessPoolExecutor(max_workers=workers)
+    pending = set()
+    try:
+        # Keep a bounded window of files in flight so memory does not grow with the directory size
+        window = workers * 4
+        for path in iter_resume_files(root):
+            run.counts["seen"] += 1
+            if path in known and not reindex:
+                run.counts["skipped"] += 1
+                continue
+            pending.add(loop.run_in_executor(pool, parse_resume_file, path, known.get(path)))
+            if len(pending) >= window:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for future in done:
+                    await collect(future.result())
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for future in done:
+                await collect(future.result())
+        if batch:
+            await flush()
+        run.status = "finished"
+    except Exception as e:
+        run.status = "failed"
+        run.report_error(root, f"{type(e).__name__}: {e}")
+        logger.exception(f"[resume ingest {run.id}] Failed: {e}")
+    finally:
+        run.finished_at = time.time()
+        for future in pending:
+            future.cancel()
+        # Off the event loop: waiting for the workers to exit would block every request meanwhile,
+        # and after a failure the files not started yet are dropped rather than parsed
+        await loop.run_in_executor(None, functools.partial(pool.shutdown, wait=run.status == "finished",
+                                                           cancel_futures=True))
+
+    logger.info(f"[resume ingest {run.id}] {run.status}: {run.counts} in {run.finished_at - run.started_at:.1f} seconds")
+    return run
+
+
+def _main(argv=None) -> int:
+    import argparse
+
+    from app.db.session import AsyncSessionLocal
+
+    parser = argparse.ArgumentParser(prog="python -m app.services.resume_parser",
+                                     description="Parse a directory of resumes into the resumes table")
+    parser.add_argument("root", help="Directory to walk")
+    parser.add_argument("--reindex", action="store_true", help="Re-parse loaded files whose content changed")
+    parser.add_argument("--workers", type=int, help="Parser processes (default: CPU count)")
+    parser.add_argument("--user-id", type=int, help="Owner of files without a user id in their path")
+    args = parser.parse_args(argv)
+
+    async def main() -> IngestRun:
+        async with AsyncSessionLocal() as db:
+            return await ingest_directory(db, args.root, reindex=args.reindex,
+                                          default_user_id=args.user_id, workers=args.workers)
+
+    run = asyncio.run(main())
+    print(run.to_dict())
+    return 0 if run.status == "finished" else 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(_main())
@@ -0,0 +1,183 @@
+"""
+services/resume_texts.py
+
+Moves resume texts stored inline (the former `resumes.parsed_text` column) to the
+compressed `resume_texts` table, then drops the column.
+
+Resumes are walked in id order, MOVE_BATCH_SIZE at a time, each batch in its own short
+transaction: the texts are compressed and inserted, and on Postgres the moved values are
+set to NULL, so the walk frees the space as it goes and an interrupted run picks up
+where it stopped. A text already in `resume_texts` (written by the parser since) is
+kept. Once every text is moved the column is dropped; on Postgres with a lock timeout,
+so a busy table makes the drop fail (and be retried on the next start) rather than
+queue every query on `resumes` behind it.
+
+On Postgres the move is a scheduled job (SCHEDULED_JOBS in scheduler.py), so only the
+elected leader runs it. `apply_migrations` has dropped the column's NOT NULL, so new
+resumes can be written meanwhile, and reads of resumes not moved yet fall back to the
+old column (`attach_legacy_texts`). SQLite, where that constraint cannot be dropped in
+place, moves the texts at startup before the app serves; workers take turns on a file
+lock, so the first one moves them and the others find the column gone.
+
+Command line:
+    python -m app.services.resume_texts [--batch-size 500] [--pause 0.1]
+"""
+
+import asyncio
+import os
+import tempfile
+import time
+from typing import List, Optional
+
+from sqlalchemy import bindparam, inspect, text
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession
+
+from app.core.logger import get_logger
+from app.db.models.resume import Resume, ResumeText
+
+logger = get_logger("resume_texts")
+
+MOVE_BATCH_SIZE = 500
+
+# Column the texts are moved out of
+LEGACY_TABLE, LEGACY_COLUMN = "resumes", "parsed_text"
+
+# SQLite: serializes the startup move across the workers of the host
+MOVE_LOCK_FILE = os.path.join(tempfile.gettempdir(), "job_board_resume_texts.lock")
+
+# Whether this process last saw the old column (None: not checked yet, or to be checked again)
+_legacy_column: Optional[bool] = None
+
+
+def _has_legacy_column(sync_conn) -> bool:
+    inspector = inspect(sync_conn)
+    return (LEGACY_TABLE in inspector.get_table_names()
+            and LEGACY_COLUMN in {column["name"] for column in inspector.get_columns(LEGACY_TABLE)})
+
+
+async def move_resume_texts(engine: AsyncEngine, batch_size: int = MOVE_BATCH_SIZE, pause: float = 0.0) -> int:
+    """
+    Compresses the inline resume texts into `resume_texts` and drops the column; returns
+    the number of texts moved (0 when there is no such column any more).
+    - pause: Seconds to sleep between batches
+    """
+    global _legacy_column
+    start_time = time.time()
+    last_id, moved = 0, 0
+    async with engine.connect() as conn:
+        async with conn.begin():
+            if not await conn.run_sync(_has_legacy_column):
+                _legacy_column = False
+                return 0
+        is_postgres = conn.dialect.name == "postgresql"
+        insert = postgresql.insert if is_postgres else sqlite.insert
+        stmt = insert(ResumeText).on_conflict_do_nothing(index_elements=[ResumeText.resume_id])
+
+        while True:
+            async with conn.begin():
+                rows = (await conn.execute(
+                    text(f"SELECT id, {LEGACY_COLUMN} FROM {LEGACY_TABLE} "
+                         f"WHERE id > :last_id AND {LEGACY_COLUMN} IS NOT NULL ORDER BY id LIMIT :limit"),
+                    {"last_id": last_id, "limit": batch_size},
+                )).all()
+                if rows:
+                    await conn.execute(stmt, [ResumeText.values(row[0], row[1]) for row in rows])
+                    if is_postgres:
+                        await conn.execute(
+                            text(f"UPDATE {LEGACY_TABLE} SET {LEGACY_COLUMN} = NULL WHERE id = ANY(:ids)"),
+                            {"ids": [row[0] for row in rows]},
+                        )
+            if not rows:
+                break
+            last_id = rows[-1][0]
+            moved += len(rows)
+
+            logger.info(f"[resume texts] Up to resume {last_id}: {moved} moved")
+            if pause:
+                await asyncio.sleep(pause)
+
+        async with conn.begin():
+            if is_postgres:
+                await conn.execute(text("SET LOCAL lock_timeout = '5s'"))
+                await conn.execute(text(f"ALTER TABLE {LEGACY_TABLE} DROP COLUMN IF EXISTS {LEGACY_COLUMN}"))
+            else:
+                await conn.execute(text(f"ALTER TABLE {LEGACY_TABLE} DROP COLUMN {LEGACY_COLUMN}"))
+    _legacy_column = False
+
+    logger.info(f"[resume texts] Done: {moved} texts moved and {LEGACY_TABLE}.{LEGACY_COLUMN} dropped "
+                f"in {time.time() - start_time:.1f} seconds")
+    return moved
+
+
+async def attach_legacy_texts(db: AsyncSession, resumes: List[Resume]) -> None:
+    """
+    Until the move is done, reads the texts of resumes not moved yet from the old column
+    (for resumes loaded with `stored_text`, which `Resume.parsed_text` prefers).
+    """
+    global _legacy_column
+    missing = {resume.id: resume for resume in resumes if resume.__dict__.get("stored_text") is None}
+    if not missing or _legacy_column is False:
+        return
+    try:
+        async with db.begin_nested():
+            if _legacy_column is None:
+                _legacy_column = await db.run_sync(lambda session: _has_legacy_column(session.connection()))
+                if not _legacy_column:
+                    return
+            rows = (await db.execute(
+                text(f"SELECT id, {LEGACY_COLUMN} FROM {LEGACY_TABLE} WHERE id IN :ids")
+                .bindparams(bindparam("ids", expanding=True)),
+                {"ids": list(missing)},
+            )).all()
+    except DBAPIError as e:
+        # Most likely dropped by the leader since the last check; look again next time
+        _legacy_column = None
+        logger.info(f"[resume texts] Could not read {LEGACY_TABLE}.{LEGACY_COLUMN}: {e}")
+        return
+    for resume_id, legacy_text in rows:
+        missing[resume_id].legacy_text = legacy_text
+
+
+async def move_legacy_resume_texts(db: AsyncSession) -> int:
+    """Scheduled job: moves the texts left in the old column (nothing to do once it is gone)."""
+    return await move_resume_texts(db.bind)
+
+
+async def prepare_resume_texts() -> None:
+    """
+    SQLite startup task: moves the texts of resumes written before they were stored
+    compressed, one worker at a time.
+    """
+    from app.db.session import async_engine
+    from scheduler import LeaderLock
+
+    lock = LeaderLock(lock_file=MOVE_LOCK_FILE)
+    try:
+        while not await lock.acquire():
+            await asyncio.sleep(0.5)
+        await move_resume_texts(async_engine)
+    except Exception as e:
+        logger.error(f"[resume texts] Could not move the resume texts: {e}")
+    finally:
+        await lock.release()
+
+
+def _main(argv=None) -> int:
+    import argparse
+
+    from app.db.session import async_engine
+
+    parser = argparse.ArgumentParser(prog="python -m app.services.resume_texts",
+                                     description="Move inline resume texts to the compressed resume_texts table")
+    parser.add_argument("--batch-size", type=int, default=MOVE_BATCH_SIZE, help="Resumes per transaction")
+    parser.add_argument("--pause", type=float, default=0.0, help="Seconds to sleep between batches")
+    args = parser.parse_args(argv)
+
+    print(f"{asyncio.run(move_resume_texts(async_engine, batch_size=args.batch_size, pause=args.pause))} texts moved")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(_main())
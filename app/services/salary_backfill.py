@@ -0,0 +1,93 @@
+"""
+services/salary_backfill.py
+
+Fills `salary_min` / `salary_max` / `salary_currency` for jobs written before those
+columns existed (or by anything other than the bulk loader).
+
+Jobs are walked in id order, BACKFILL_BATCH_SIZE at a time, each batch read and
+updated by primary key in its own short transaction. Only the rows of the current
+batch are locked, for the duration of one UPDATE, so the table stays writable and
+readable throughout; `pause` spaces the batches out further on a busy database. The
+walk seeks on id rather than using OFFSET, so an interrupted run can simply be
+restarted.
+
+Command line:
+    python -m app.services.salary_backfill [--batch-size 1000] [--all] [--pause 0.1]
+"""
+
+import asyncio
+import time
+
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.logger import get_logger
+from app.db.models.job import Job
+from app.db.salary import salary_columns
+
+logger = get_logger("salary_backfill")
+
+BACKFILL_BATCH_SIZE = 1000
+
+
+async def backfill_salaries(
+        db: AsyncSession,
+        batch_size: int = BACKFILL_BATCH_SIZE,
+        recompute: bool = False,
+        pause: float = 0.0,
+) -> int:
+    """
+    Parses `salary_range` into the salary columns; returns the number of jobs updated.
+    - recompute: Re-parse every job instead of only those without a currency yet
+    - pause: Seconds to sleep between batches
+    """
+    start_time = time.time()
+    last_id, updated = 0, 0
+    while True:
+        stmt = select(Job.id, Job.salary_range).where(Job.id > last_id, Job.salary_range.isnot(None))
+        if not recompute:
+            stmt = stmt.where(Job.salary_currency.is_(None))
+        rows = (await db.execute(stmt.order_by(Job.id).limit(batch_size))).all()
+        if not rows:
+            break
+        last_id = rows[-1].id
+
+        values = [{"id": row.id, **salary_columns(row.salary_range)} for row in rows]
+        if not recompute:
+            values = [value for value in values if value["salary_currency"] is not None]
+        if values:
+            # ORM bulk UPDATE by primary key: one executemany per batch
+            await db.execute(update(Job), values)
+        await db.commit()
+        updated += len(values)
+
+        logger.info(f"[salary backfill] Up to job {last_id}: {updated} updated")
+        if pause:
+            await asyncio.sleep(pause)
+
+    logger.info(f"[salary backfill] Done: {updated} jobs updated in {time.time() - start_time:.1f} seconds")
+    return updated
+
+
+def _main(argv=None) -> int:
+    import argparse
+
+    from app.db.session import AsyncSessionLocal
+
+    parser = argparse.ArgumentParser(prog="python -m app.services.salary_backfill",
+                                     description="Fill the numeric salary columns of jobs from salary_range")
+    parser.add_argument("--batch-size", type=int, default=BACKFILL_BATCH_SIZE, help="Jobs per transaction")
+    parser.add_argument("--all", action="store_true", help="Re-parse jobs that already have salary columns")
+    parser.add_argument("--pause", type=float, default=0.0, help="Seconds to sleep between batches")
+    args = parser.parse_args(argv)
+
+    async def main() -> int:
+        async with AsyncSessionLocal() as db:
+            return await backfill_salaries(db, batch_size=args.batch_size, recompute=args.all, pause=args.pause)
+
+    print(f"{asyncio.run(main())} jobs updated")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(_main())
@@ -0,0 +1,13 @@
+"""
+benchmarks
+
+Reproducible performance benchmarks for the Job Board API.
+
+- `seed`: fills the database behind DATABASE_URL with deterministic synthetic users,
+  jobs and resumes at a chosen volume profile.
+- `runner`: drives every route in-process through ASGI and records p50/p95/p99 latency,
+  throughput and peak memory per scenario.
+- `compare`: diffs two result files, e.g. the last release against the current tree.
+
+Run `python -m benchmarks --help` for the command line.
+"""
@@ -0,0 +1,99 @@
+"""
+Command line for the benchmark suite.
+
+    python -m benchmarks seed --profile small --database-url sqlite:///./bench.db
+    python -m benchmarks run --database-url sqlite:///./bench.db --requests 200 --output before.json
+    python -m benchmarks compare before.json after.json
+
+The database URL must be known before the app is imported (settings are read at
+import time), so it is applied to the environment before any app module loads.
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import sys
+
+
+def _parse_args(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks", description="Job Board API benchmarks")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    seed = commands.add_parser("seed", help="Recreate and fill the users, jobs and resumes tables")
+    seed.add_argument("--database-url", help="Overrides DATABASE_URL (e.g. sqlite:///./bench.db)")
+    seed.add_argument("--profile", choices=["small", "medium", "large"], default="small")
+    seed.add_argument("--users", type=int, help="Overrides the profile's user count")
+    seed.add_argument("--jobs", type=int, help="Overrides the profile's job count")
+    seed.add_argument("--resumes", type=int, help="Overrides the profile's resume count")
+    seed.add_argument("--seed", type=int, default=42)
+
+    run = commands.add_parser("run", help="Benchmark every route against the seeded database")
+    run.add_argument("--database-url", help="Overrides DATABASE_URL (e.g. sqlite:///./bench.db)")
+    run.add_argument("--requests", type=int, default=200, help="Timed requests per scenario")
+    run.add_argument("--concurrency", type=int, default=1, help="Concurrent in-flight requests")
+    run.add_argument("--warmup", type=int, default=10, help="Untimed requests per scenario")
+    run.add_argument("--only", nargs="*", help="Scenario name prefixes, e.g. jobs. users.filter")
+    run.add_argument("--seed", type=int, default=42)
+    run.add_argument("--output", help="Result file (default: benchmarks/results/<git rev>-<database>.json)")
+
+    diff = commands.add_parser("compare", help="Diff two result files")
+    diff.add_argument("baseline")
+    diff.add_argument("current")
+    diff.add_argument("--threshold", type=float, default=0.10, help="Relative change counted as a regression")
+    diff.add_argument("--fail-on-regression", action="store_true", help="Exit with status 1 on regressions")
+
+    return parser.parse_args(argv)
+
+
+def main(argv=None) -> int:
+    args = _parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+
+    if args.command == "compare":
+        from benchmarks.compare import compare, format_table, load
+
+        rows, regressions = compare(load(args.baseline), load(args.current), args.threshold)
+        print(format_table(rows))
+        for r in regressions:
+            print(f"REGRESSION {r['name']} {r['metric']}: {r['before']} -> {r['after']} ({r['change']:+.1%})")
+        return 1 if regressions and args.fail_on_regression else 0
+
+    if args.database_url:
+        os.environ["DATABASE_URL"] = args.database_url
+        os.environ.pop("ASYNC_DATABASE_URL", None)
+
+    if args.command == "seed":
+        from benchmarks.seed import PROFILES, seed
+
+        volumes = dict(PROFILES[args.profile])
+        for table in volumes:
+            if getattr(args, table) is not None:
+                volumes[table] = getattr(args, table)
+        seed(volumes["users"], volumes["jobs"], volumes["resumes"], seed_value=args.seed)
+        return 0
+
+    from benchmarks.runner import run_benchmarks
+    from benchmarks.seed import table_counts
+
+    # The API logs every request; keep that out of the measurements
+    logging.getLogger().setLevel(logging.WARNING)
+    logging.getLogger("benchmarks").setLevel(logging.INFO)
+    for name in list(logging.root.manager.loggerDict):
+        if not name.startswith("benchmarks"):
+            logging.getLogger(name).setLevel(logging.WARNING)
+
+    report = asyncio.run(run_benchmarks(table_counts(), requests=args.requests, concurrency=args.concurrency,
+                                        warmup=args.warmup, only=args.only, seed_value=args.seed))
+    output = args.output or os.path.join(
+        "benchmarks", "results", f"{report['meta']['git_revision'] or 'local'}-{report['meta']['database']}.json")
+    os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"Wrote {output}")
+    return 1 if any(r["errors"] for r in report["results"]) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,56 @@
+"""
+benchmarks/compare.py
+
+Diffs two benchmark result files scenario by scenario and flags regressions.
+"""
+
+import json
+from typing import Dict, List, Tuple
+
+# Metrics compared between runs; for each, whether higher is better
+METRICS: List[Tuple[str, bool]] = [
+    ("p50_ms", False),
+    ("p95_ms", False),
+    ("p99_ms", False),
+    ("throughput_rps", True),
+    ("peak_memory_kb", False),
+]
+
+
+def load(path: str) -> dict:
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def compare(baseline: dict, current: dict, threshold: float = 0.10) -> Tuple[List[dict], List[dict]]:
+    """
+    Returns (rows, regressions). Each row holds one scenario's metrics in both runs and
+    their relative change; a regression is a change worse than `threshold` (10% by default).
+    """
+    before: Dict[str, dict] = {r["name"]: r for r in baseline["results"]}
+    rows, regressions = [], []
+    for result in current["results"]:
+        old = before.get(result["name"])
+        if old is None:
+            continue
+        row = {"name": result["name"]}
+        for metric, higher_is_better in METRICS:
+            a, b = old.get(metric, 0), result.get(metric, 0)
+            change = (b - a) / a if a else 0.0
+            row[metric] = (a, b, change)
+            worse = -change if higher_is_better else change
+            if worse > threshold:
+                regressions.append({"name": result["name"], "metric": metric, "before": a, "after": b,
+                                    "change": round(change, 4)})
+        rows.append(row)
+    return rows, regressions
+
+
+def format_table(rows: List[dict]) -> str:
+    header = f"{'scenario':<28}" + "".join(f"{metric:>30}" for metric, _ in METRICS)
+    lines = [header, "-" * len(header)]
+    for row in rows:
+        cells = "".join(f"{f'{a:g} -> {b:g} ({change:+.1%})':>30}" for a, b, change in
+                        (row[metric] for metric, _ in METRICS))
+        lines.append(f"{row['name']:<28}{cells}")
+    return "\n".join(lines)
@@ -0,0 +1,244 @@
+"""
+benchmarks/runner.py
+
+Drives the API in-process through `httpx.ASGITransport` (no network, no server) and
+measures every scenario in two passes:
+- a timed pass: `requests` calls issued by `concurrency` workers, giving p50/p95/p99
+  latency and throughput;
+- a memory pass: a few more calls under `tracemalloc`, giving the peak Python
+  allocation of one request (kept out of the timed pass, which it would slow down).
+
+Scenarios run with the response cache cleared before every call by default, so the
+numbers reflect the database path; `cached` scenarios measure the hit path instead.
+"""
+
+import asyncio
+import logging
+import math
+import platform
+import random
+import subprocess
+import time
+import tracemalloc
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional, Tuple
+
+import httpx
+
+from app.core.cache import response_cache
+from app.main import app
+
+logger = logging.getLogger("benchmarks.runner")
+
+MEMORY_PASS_REQUESTS = 5
+
+
+@dataclass
+class Scenario:
+    """One benchmarked request shape; `path` builds a URL from a RNG and the table sizes."""
+    name: str
+    path: Callable[[random.Random, Dict[str, int]], str]
+    cached: bool = False  # measure cache hits instead of clearing the cache before each call
+    stream: bool = False  # read the whole body as a stream (NDJSON exports)
+    requests: Optional[int] = None  # overrides the run-wide request count (slow scenarios)
+
+
+def _rand_id(table: str) -> Callable[[random.Random, Dict[str, int]], int]:
+    return lambda rng, counts: rng.randint(1, max(counts.get(table, 1), 1))
+
+
+def _const(path: str) -> Callable[[random.Random, Dict[str, int]], str]:
+    return lambda rng, counts: path
+
+
+_user_id, _job_id, _resume_id = _rand_id("users"), _rand_id("jobs"), _rand_id("resumes")
+
+SCENARIOS: List[Scenario] = [
+    # users
+    Scenario("users.list", _const("/users/?limit=100")),
+    Scenario("users.list_keyset", lambda rng, c: f"/users/?limit=100&after_id={_user_id(rng, c)}"),
+    Scenario("users.filter", _const("/users/filter?name=Priya&limit=50")),
+    Scenario("users.filter_offset_deep", lambda rng, c: f"/users/filter?role=candidate&limit=50&skip={rng.randint(0, c['users'] // 2)}"),
+    Scenario("users.filter_count", _const("/users/filter?role=candidate&limit=50&count=exact")),
+    Scenario("users.filter_cached", _const("/users/filter?name=Priya&limit=50"), cached=True),
+    Scenario("users.by_id", lambda rng, c: f"/users/users/{_user_id(rng, c)}"),
+    Scenario("users.batch", lambda rng, c: "/users/batch?ids=" + ",".join(str(_user_id(rng, c)) for _ in range(25))),
+    Scenario("users.stream", _const("/users/stream?batch_size=5000"), stream=True, requests=3),
+    # jobs
+    Scenario("jobs.list", _const("/jobs/?limit=100")),
+    Scenario("jobs.filter", _const("/jobs/filter?tittle=Engineer&location=Bangalore&limit=50")),
+    Scenario("jobs.filter_sorted", _const("/jobs/filter?company=Razorpay&limit=50&sort=title")),
+    Scenario("jobs.filter_salary", _const("/jobs/filter?salary_min=2000000&currency=INR&limit=50&sort=-salary")),
+    Scenario("jobs.facets", _const("/jobs/facets?skills=python&top=10")),
+    Scenario("jobs.filter_cached", _const("/jobs/filter?tittle=Engineer&location=Bangalore&limit=50"), cached=True),
+    Scenario("jobs.search", lambda rng, c: f"/jobs/search?q={rng.choice(['python', 'kubernetes', 'data pipelines', 'react'])}&limit=20"),
+    Scenario("jobs.by_id", lambda rng, c: f"/jobs/jobs/{_job_id(rng, c)}"),
+    Scenario("jobs.batch", lambda rng, c: "/jobs/batch?ids=" + ",".join(str(_job_id(rng, c)) for _ in range(25))),
+    Scenario("jobs.candidates", lambda rng, c: f"/jobs/{_job_id(rng, c)}/candidates?k=10"),
+    Scenario("jobs.stream", _const("/jobs/stream?batch_size=5000"), stream=True, requests=3),
+    # resumes
+    Scenario("resumes.list", _const("/Resumes/?limit=100")),
+    Scenario("resumes.filter", lambda rng, c: f"/Resumes/filter?user_id={_user_id(rng, c)}&limit=50"),
+    Scenario("resumes.by_id", lambda rng, c: f"/Resumes/resumes/{_resume_id(rng, c)}"),
+    Scenario("resumes.batch", lambda rng, c: "/Resumes/batch?ids=" + ",".join(str(_resume_id(rng, c)) for _ in range(25))),
+    Scenario("resumes.matches", lambda rng, c: f"/Resumes/{_resume_id(rng, c)}/matches?k=10"),
+    Scenario("resumes.stream", _const("/Resumes/stream?batch_size=5000"), stream=True, requests=3),
+]
+
+
+@dataclass
+class ScenarioResult:
+    name: str
+    requests: int
+    errors: int
+    status_codes: Dict[str, int]
+    p50_ms: float
+    p95_ms: float
+    p99_ms: float
+    mean_ms: float
+    max_ms: float
+    throughput_rps: float
+    bytes_per_request: int
+    peak_memory_kb: int
+    samples_ms: List[float] = field(default_factory=list, repr=False)
+
+    def to_dict(self) -> dict:
+        data = dict(self.__dict__)
+        data.pop("samples_ms")
+        return data
+
+
+def percentile(samples: List[float], pct: float) -> float:
+    """Nearest-rank percentile of an unsorted sample list."""
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    rank = max(math.ceil(pct / 100 * len(ordered)), 1)
+    return ordered[rank - 1]
+
+
+async def _call(client: httpx.AsyncClient, scenario: Scenario, url: str) -> Tuple[int, int]:
+    """Issues one request and returns (status code, body bytes on the wire)."""
+    if not scenario.cached:
+        await response_cache.clear()
+    if scenario.stream:
+        async with client.stream("GET", url) as response:
+            async for _ in response.aiter_raw():
+                pass
+            return response.status_code, response.num_bytes_downloaded
+    response = await client.get(url)
+    return response.status_code, response.num_bytes_downloaded
+
+
+async def run_scenario(
+        client: httpx.AsyncClient,
+        scenario: Scenario,
+        counts: Dict[str, int],
+        requests: int,
+        concurrency: int,
+        warmup: int,
+        seed_value: int,
+) -> ScenarioResult:
+    rng = random.Random(f"{seed_value}:{scenario.name}")
+    requests = scenario.requests or requests
+    urls = [scenario.path(rng, counts) for _ in range(warmup + requests + MEMORY_PASS_REQUESTS)]
+
+    for url in urls[:warmup]:
+        await _call(client, scenario, url)
+
+    # Timed pass
+    queue = iter(urls[warmup:warmup + requests])
+    samples: List[float] = []
+    status_codes: Dict[str, int] = {}
+    total_bytes = 0
+
+    async def worker():
+        nonlocal total_bytes
+        for url in queue:
+            started = time.perf_counter()
+            status, size = await _call(client, scenario, url)
+            samples.append((time.perf_counter() - started) * 1000)
+            status_codes[str(status)] = status_codes.get(str(status), 0) + 1
+            total_bytes += size
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(max(1, min(concurrency, requests)))))
+    elapsed = time.perf_counter() - started
+
+    # Memory pass
+    peak = 0
+    for url in urls[warmup + requests:]:
+        tracemalloc.start()
+        await _call(client, scenario, url)
+        peak = max(peak, tracemalloc.get_traced_memory()[1])
+        tracemalloc.stop()
+
+    errors = sum(n for code, n in status_codes.items() if not code.startswith("2"))
+    return ScenarioResult(
+        name=scenario.name,
+        requests=len(samples),
+        errors=errors,
+        status_codes=status_codes,
+        p50_ms=round(percentile(samples, 50), 3),
+        p95_ms=round(percentile(samples, 95), 3),
+        p99_ms=round(percentile(samples, 99), 3),
+        mean_ms=round(sum(samples) / len(samples), 3) if samples else 0.0,
+        max_ms=round(max(samples), 3) if samples else 0.0,
+        throughput_rps=round(len(samples) / elapsed, 2) if elapsed else 0.0,
+        bytes_per_request=total_bytes // len(samples) if samples else 0,
+        peak_memory_kb=peak // 1024,
+        samples_ms=samples,
+    )
+
+
+def _git_revision() -> Optional[str]:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except Exception:
+        return None
+
+
+async def run_benchmarks(
+        counts: Dict[str, int],
+        requests: int = 200,
+        concurrency: int = 1,
+        warmup: int = 10,
+        only: Optional[List[str]] = None,
+        seed_value: int = 42,
+) -> dict:
+    """
+    Runs the selected scenarios (all by default; `only` takes name prefixes such as
+    "jobs." or "users.filter") and returns a JSON-serializable result document.
+    """
+    from app.db.session import async_engine
+
+    scenarios = [s for s in SCENARIOS if not only or any(s.name.startswith(prefix) for prefix in only)]
+    results = []
+
+    # httpx does not send lifespan events, so run the app's startup (search index, matching warm-up) here
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench",
+                                     headers={"accept-encoding": "identity"}, timeout=None) as client:
+            for scenario in scenarios:
+                result = await run_scenario(client, scenario, counts, requests, concurrency, warmup, seed_value)
+                logger.info(f"[bench] {result.name}: p50={result.p50_ms}ms p95={result.p95_ms}ms "
+                            f"p99={result.p99_ms}ms {result.throughput_rps} req/s errors={result.errors}")
+                results.append(result.to_dict())
+
+    return {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+            "git_revision": _git_revision(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "database": async_engine.dialect.name,
+            "rows": counts,
+            "requests": requests,
+            "concurrency": concurrency,
+            "warmup": warmup,
+            "seed": seed_value,
+        },
+        "results": results,
+    }
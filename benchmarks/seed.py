@@ -0,0 +1,226 @@
+"""
+benchmarks/seed.py
+
+Deterministic synthetic data for the benchmarks.
+
+Rows are generated from a seeded `random.Random`, so two runs with the same profile
+and seed produce the same database and their results can be compared. Inserts go
+through the sync engine in batches, which is the fast path on both SQLite and
+Postgres (`insertmanyvalues`).
+"""
+
+import logging
+import random
+import time
+from typing import Dict, Iterator, List
+
+from sqlalchemy import text
+
+from app.db.session import engine, async_engine, AsyncSessionLocal
+from app.db.models.user import User
+from app.db.models.job import Job
+from app.db.models.resume import Resume, ResumeText
+from app.db.search import ensure_job_search_index
+from app.db.salary import salary_columns
+from app.db.models.canonical import Company, CompanyAlias, Location, LocationAlias
+from app.services.entities import backfill_job_entities
+
+logger = logging.getLogger("benchmarks.seed")
+
+# Row counts per table for each named volume profile
+PROFILES: Dict[str, Dict[str, int]] = {
+    "small": {"users": 10_000, "jobs": 5_000, "resumes": 2_000},
+    "medium": {"users": 100_000, "jobs": 50_000, "resumes": 20_000},
+    "large": {"users": 1_000_000, "jobs": 500_000, "resumes": 200_000},
+}
+
+INSERT_BATCH_SIZE = 10_000
+
+FIRST_NAMES = ["Aarav", "Priya", "Rahul", "Ananya", "Vikram", "Sneha", "Arjun", "Divya", "Karan", "Meera",
+               "John", "Emma", "Liam", "Olivia", "Noah", "Sophia", "Mateo", "Yuki", "Chen", "Fatima"]
+LAST_NAMES = ["Sharma", "Reddy", "Iyer", "Patel", "Nair", "Gupta", "Rao", "Singh", "Das", "Kumar",
+              "Smith", "Brown", "Garcia", "Tanaka", "Wang", "Khan", "Muller", "Rossi", "Silva", "Kim"]
+ROLES = ["candidate"] * 8 + ["recruiter", "admin"]
+
+TITLES = ["Backend Engineer", "Frontend Developer", "Data Scientist", "DevOps Engineer", "Python Developer",
+          "Full Stack Developer", "Machine Learning Engineer", "QA Engineer", "Product Manager",
+          "Site Reliability Engineer", "Data Engineer", "Mobile Developer", "Security Analyst"]
+SENIORITY = ["Junior", "", "Senior", "Lead", "Staff", "Principal"]
+COMPANIES = ["Infosys", "TCS", "Wipro", "Flipkart", "Swiggy", "Zomato", "Razorpay", "Freshworks", "Zoho",
+             "Google", "Microsoft", "Amazon", "Atlassian", "Stripe", "Shopify", "ABC Corp", "Acme Labs"]
+LOCATIONS = ["Bangalore", "Hyderabad", "Chennai", "Pune", "Mumbai", "Delhi", "Noida", "Gurgaon", "Kochi",
+             "Remote", "London", "Berlin", "Singapore", "New York", "San Francisco", "Toronto"]
+SKILLS = ["python", "java", "javascript", "typescript", "go", "rust", "c++", "sql", "postgresql", "mysql",
+          "mongodb", "redis", "kafka", "docker", "kubernetes", "aws", "gcp", "azure", "terraform", "linux",
+          "fastapi", "django", "flask", "spring", "react", "angular", "vue", "node.js", "graphql", "rest",
+          "pandas", "numpy", "pytorch", "tensorflow", "scikit-learn", "spark", "airflow", "git", "ci/cd",
+          "machine learning", "nlp", "computer vision", "selenium", "jenkins", "html", "css", "figma"]
+DEGREES = ["B.Tech", "B.E.", "B.Sc", "BCA", "M.Tech", "M.Sc", "MCA", "MBA", "PhD"]
+DESCRIPTION_PHRASES = [
+    "Design and build scalable APIs", "Own services end to end", "Work with product and design",
+    "Improve reliability and observability", "Mentor junior engineers", "Write clean, tested code",
+    "Optimize database queries", "Build data pipelines", "Ship features every week",
+    "Collaborate across distributed teams", "Participate in on-call rotation", "Drive architecture decisions",
+]
+
+
+def _skills(rng: random.Random, low: int, high: int) -> List[str]:
+    # Skew towards the head of the list so some skills are much more common than others
+    count = rng.randint(low, high)
+    picked = {SKILLS[min(int(rng.expovariate(1 / 12)), len(SKILLS) - 1)] for _ in range(count * 2)}
+    return sorted(picked)[:count]
+
+
+def _salary_range(rng: random.Random) -> List[str]:
+    # Mostly INR amounts as strings, like the API already stores, with some other formats mixed in
+    kind = rng.random()
+    if kind < 0.7:
+        low = rng.randrange(300_000, 4_000_000, 50_000)
+        return [str(low), str(low + rng.randrange(100_000, 2_000_000, 50_000))]
+    if kind < 0.9:
+        low = rng.randint(4, 40)
+        return [f"{low} LPA", f"{low + rng.randint(2, 15)} LPA"]
+    low = rng.randrange(60, 200, 5)
+    return [f"${low}k", f"${low + rng.randrange(10, 60, 5)}k"]
+
+
+def generate_users(rng: random.Random, count: int) -> Iterator[dict]:
+    for user_id in range(1, count + 1):
+        first, last = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+        yield {
+            "id": user_id,
+            "name": f"{first} {last}",
+            "email": f"{first.lower()}.{last.lower()}.{user_id}@example.com",
+            "role": rng.choice(ROLES),
+        }
+
+
+def generate_jobs(rng: random.Random, count: int, users: int) -> Iterator[dict]:
+    for job_id in range(1, count + 1):
+        title = f"{rng.choice(SENIORITY)} {rng.choice(TITLES)}".strip()
+        skills = _skills(rng, 3, 8)
+        phrases = rng.sample(DESCRIPTION_PHRASES, 4)
+        salary = _salary_range(rng)
+        yield {
+            "id": job_id,
+            "title": title,
+            # `description` is unique, so the id is part of it
+            "description": f"{'. '.join(phrases)}. Stack: {', '.join(skills)}. Ref #{job_id}.",
+            "company": rng.choice(COMPANIES),
+            "location": rng.choice(LOCATIONS),
+            "salary_range": salary,
+            "required_skills": skills,
+            "posted_by": rng.randint(1, max(users, 1)),
+            **salary_columns(salary),
+        }
+
+
+def generate_resumes(rng: random.Random, count: int, users: int) -> Iterator[dict]:
+    for resume_id in range(1, count + 1):
+        skills = _skills(rng, 4, 12)
+        title = rng.choice(TITLES)
+        years = rng.randint(0, 20)
+        yield {
+            "id": resume_id,
+            "user_id": rng.randint(1, max(users, 1)),
+            "original_file_path": f"/uploads/resumes/{resume_id:08d}.pdf",
+            "parsed_text": f"{title} with {years} years of experience. Skills: {', '.join(skills)}. "
+                           + " ".join(rng.sample(DESCRIPTION_PHRASES, 3)),
+            "extracted_skills": skills,
+            "experience": {"title": title, "years": years},
+            "education": {"year": rng.randint(1995, 2024), "degree": rng.choice(DEGREES)},
+        }
+
+
+def _insert(table, rows: Iterator[dict], label: str) -> int:
+    inserted = 0
+    batch: List[dict] = []
+    with engine.begin() as conn:
+        for row in rows:
+            batch.append(row)
+            if len(batch) >= INSERT_BATCH_SIZE:
+                conn.execute(table.insert(), batch)
+                inserted += len(batch)
+                batch = []
+        if batch:
+            conn.execute(table.insert(), batch)
+            inserted += len(batch)
+    logger.info(f"[seed] Inserted {inserted} {label}")
+    return inserted
+
+
+def _insert_resumes(rows: Iterator[dict]) -> int:
+    """Inserts resumes, with their parsed text compressed into resume_texts as the parser stores it."""
+    inserted = 0
+    batch: List[dict] = []
+
+    def flush(conn) -> None:
+        conn.execute(Resume.__table__.insert(), [{k: v for k, v in row.items() if k != "parsed_text"} for row in batch])
+        conn.execute(ResumeText.__table__.insert(), [ResumeText.values(row["id"], row["parsed_text"]) for row in batch])
+
+    with engine.begin() as conn:
+        for row in rows:
+            batch.append(row)
+            if len(batch) >= INSERT_BATCH_SIZE:
+                flush(conn)
+                inserted += len(batch)
+                batch = []
+        if batch:
+            flush(conn)
+            inserted += len(batch)
+    logger.info(f"[seed] Inserted {inserted} resumes")
+    return inserted
+
+
+async def _prepare_indexes() -> None:
+    async with async_engine.begin() as conn:
+        await ensure_job_search_index(conn)
+    # Link the jobs to canonical locations and companies, as the app does at startup
+    async with AsyncSessionLocal() as db:
+        await backfill_job_entities(db)
+    await async_engine.dispose()
+
+
+def seed(users: int, jobs: int, resumes: int, seed_value: int = 42) -> Dict[str, int]:
+    """
+    Drops and recreates the users, jobs and resumes tables (and the resume texts and
+    canonical location/company tables), then fills them.
+    Returns the number of rows per table.
+    """
+    import asyncio
+
+    start_time = time.time()
+    for model in (User, Job, ResumeText, Resume, LocationAlias, Location, CompanyAlias, Company):
+        model.metadata.drop_all(engine, tables=[model.__table__])
+    for model in (User, Job, Resume, ResumeText, Location, LocationAlias, Company, CompanyAlias):
+        model.metadata.create_all(engine, tables=[model.__table__])
+    if engine.dialect.name == "sqlite":
+        # Leftovers from a previous seed that referenced the old `jobs` table
+        with engine.begin() as conn:
+            conn.execute(text("DROP TABLE IF EXISTS jobs_fts"))
+
+    rng = random.Random(seed_value)
+    counts = {
+        "users": _insert(User.__table__, generate_users(rng, users), "users"),
+        "jobs": _insert(Job.__table__, generate_jobs(rng, jobs, users), "jobs"),
+        "resumes": _insert_resumes(generate_resumes(rng, resumes, users)),
+    }
+
+    with engine.begin() as conn:
+        if engine.dialect.name == "postgresql":
+            conn.execute(text("ANALYZE users; ANALYZE jobs; ANALYZE resumes"))
+        elif engine.dialect.name == "sqlite":
+            conn.execute(text("ANALYZE"))
+    asyncio.run(_prepare_indexes())
+
+    logger.info(f"[seed] Seeded {counts} in {time.time() - start_time:.1f} seconds")
+    return counts
+
+
+def table_counts() -> Dict[str, int]:
+    """Row counts of the seeded tables, recorded with every benchmark result."""
+    with engine.connect() as conn:
+        return {
+            table: conn.execute(text(f"SELECT count(*) FROM {table}")).scalar_one()
+            for table in ("users", "jobs", "resumes")
+        }
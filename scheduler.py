@@ -1,37 +1,268 @@
-import os
+"""
+scheduler.py
+
+Periodic maintenance jobs (SCHEDULED_JOBS), run exactly once per deployment however
+many API workers there are.
+
+Every worker starts the scheduler from the app lifespan, paused, and takes part in a
+leader election every SCHEDULER_LEADER_RETRY_SECONDS:
+- on Postgres, the leader holds a session-level advisory lock (`pg_try_advisory_lock`)
+  on a dedicated autocommit connection; the lock goes away with the connection, so if
+  the leader dies another worker takes over at its next attempt;
+- elsewhere (local development on SQLite), an exclusive `flock` on
+  SCHEDULER_LOCK_FILE, which only coordinates the workers of one machine.
+Only the leader's scheduler is resumed; the others stay paused.
 
-from apscheduler.schedulers.background import BackgroundScheduler
-import requests
-import logging
+Each job fires on fixed slots (multiples of its period since the epoch), spread out by
+up to SCHEDULER_JITTER_SECONDS. A run that is late by less than
+SCHEDULER_MISFIRE_GRACE_SECONDS (e.g. right after a leadership change) still happens,
+missed runs are coalesced into one, and later ones are skipped. Every run is recorded
+in `scheduler_runs`, whose unique (job, slot) pair also guarantees that a slot runs
+once even if two workers briefly both believe they lead.
+"""
+
+import asyncio
+import os
+import socket
+import tempfile
+import time
+import zlib
+from datetime import datetime, timedelta, timezone as dt_timezone
+from typing import Awaitable, Callable, List, NamedTuple, Optional
 
-from dotenv import load_dotenv
+from apscheduler.schedulers.asyncio import AsyncIOScheduler
+from apscheduler.triggers.interval import IntervalTrigger
 from pytz import timezone
+from sqlalchemy import delete, text, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession
+
+from app.core.config import settings
+from app.core.logger import get_logger
+from app.db.models.scheduler_run import ScheduledRun
+from app.services.entities import backfill_job_entities
+from app.services.resume_texts import move_legacy_resume_texts
+from app.services.salary_backfill import backfill_salaries
+
+try:
+    import fcntl
+except ImportError:  # Windows: no flock, every process schedules on its own
+    fcntl = None
+
+logger = get_logger("scheduler")
+
+# Advisory lock id shared by every worker of the deployment
+ADVISORY_LOCK_KEY = zlib.crc32(b"job_board.scheduler")
+
+HOST = f"{socket.gethostname()}:{os.getpid()}"
+
+
+async def prune_scheduler_runs(db: AsyncSession) -> int:
+    """Deletes run history older than SCHEDULER_HISTORY_DAYS; returns the number of rows removed."""
+    cutoff = datetime.now(dt_timezone.utc) - timedelta(days=settings.SCHEDULER_HISTORY_DAYS)
+    result = await db.execute(delete(ScheduledRun).where(ScheduledRun.started_at < cutoff))
+    await db.commit()
+    return result.rowcount
+
+
+class ScheduledJob(NamedTuple):
+    id: str
+    func: Callable[[AsyncSession], Awaitable]  # gets its own session, commits its own work
+    period: int  # seconds between runs
+
+
+SCHEDULED_JOBS: List[ScheduledJob] = [
+    # Link jobs written outside the API's write path to canonical locations and companies
+    ScheduledJob("link_job_entities", backfill_job_entities, 3600),
+    # Parse salary ranges of jobs that have none parsed yet
+    ScheduledJob("backfill_salaries", backfill_salaries, 3600),
+    # Move resume texts still stored inline to the compressed table, then drop the old column;
+    # a schema check once it is gone
+    ScheduledJob("move_resume_texts", move_legacy_resume_texts, 600),
+    ScheduledJob("prune_scheduler_runs", prune_scheduler_runs, 86400),
+]
+
+
+def job_jitter(job: ScheduledJob) -> int:
+    """Jitter of a job, capped at a tenth of its period so runs stay inside their slot."""
+    return min(settings.SCHEDULER_JITTER_SECONDS, job.period // 10)
+
+
+def slot_start(now: float, job: ScheduledJob) -> datetime:
+    """
+    The slot a run firing at `now` belongs to: the slot boundary it was scheduled for,
+    given it may fire up to the jitter early, or up to jitter + misfire grace late.
+    """
+    slot = (now + job_jitter(job)) // job.period * job.period
+    return datetime.fromtimestamp(slot, tz=dt_timezone.utc)
+
+
+class LeaderLock:
+    """Leadership among the workers: a Postgres advisory lock, or a file lock elsewhere."""
+
+    def __init__(self, engine: Optional[AsyncEngine] = None, lock_file: Optional[str] = None):
+        self.engine = engine
+        self.lock_file = lock_file or settings.SCHEDULER_LOCK_FILE or \
+            os.path.join(tempfile.gettempdir(), "job_board_scheduler.lock")
+        self._conn = None
+        self._fd: Optional[int] = None
+
+    @property
+    def _postgres(self) -> bool:
+        return self.engine is not None and self.engine.dialect.name == "postgresql"
+
+    async def acquire(self) -> bool:
+        """Tries to become the leader, without waiting."""
+        if self._postgres:
+            conn = await self.engine.connect()
+            try:
+                # Autocommit: the lock is held by the session, not by an idle open transaction
+                await conn.execution_options(isolation_level="AUTOCOMMIT")
+                acquired = await conn.scalar(text("SELECT pg_try_advisory_lock(:key)"), {"key": ADVISORY_LOCK_KEY})
+            except Exception:
+                await conn.close()
+                raise
+            if acquired:
+                self._conn = conn
+            else:
+                await conn.close()
+            return bool(acquired)
+
+        if fcntl is None:
+            return True
+        fd = os.open(self.lock_file, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            os.close(fd)
+            return False
+        self._fd = fd
+        return True
+
+    async def held(self) -> bool:
+        """Whether leadership is still ours (the lock connection may have dropped)."""
+        if self._postgres:
+            if self._conn is None:
+                return False
+            try:
+                await self._conn.scalar(text("SELECT 1"))
+                return True
+            except Exception:
+                await self.release()
+                return False
+        return fcntl is None or self._fd is not None
+
+    async def release(self) -> None:
+        if self._conn is not None:
+            conn, self._conn = self._conn, None
+            try:
+                await conn.scalar(text("SELECT pg_advisory_unlock(:key)"), {"key": ADVISORY_LOCK_KEY})
+            except Exception:
+                pass  # closing the connection releases it too
+            try:
+                await conn.close()
+            except Exception:
+                await conn.invalidate()
+        if self._fd is not None:
+            fd, self._fd = self._fd, None
+            fcntl.flock(fd, fcntl.LOCK_UN)
+            os.close(fd)
+
+
+class JobScheduler:
+    """APScheduler running SCHEDULED_JOBS while this worker holds the leader lock."""
+
+    def __init__(self, lock: LeaderLock, session_factory, jobs: List[ScheduledJob] = SCHEDULED_JOBS):
+        self.lock = lock
+        self.session_factory = session_factory
+        self.jobs = jobs
+        self.is_leader = False
+        self.scheduler = AsyncIOScheduler(
+            timezone=timezone('Asia/Kolkata'),
+            job_defaults={
+                "coalesce": True,  # several missed runs become one
+                "misfire_grace_time": settings.SCHEDULER_MISFIRE_GRACE_SECONDS,
+                "max_instances": 1,
+            },
+        )
+
+    async def run_job(self, job: ScheduledJob) -> Optional[str]:
+        """
+        Runs `job` for the current slot and records it; returns the run's status, or None
+        if the slot was already claimed by another run.
+        """
+        slot = slot_start(time.time(), job)
+        async with self.session_factory() as db:
+            run = ScheduledRun(job_id=job.id, scheduled_for=slot, started_at=datetime.now(dt_timezone.utc),
+                               status="running", host=HOST)
+            db.add(run)
+            try:
+                await db.flush()
+                run_id = run.id
+                await db.commit()
+            except IntegrityError:
+                await db.rollback()
+                logger.info(f"[scheduler] {job.id} already ran for {slot.isoformat()}, skipping")
+                return None
+
+            status, error = "succeeded", None
+            try:
+                await job.func(db)
+            except Exception as e:
+                await db.rollback()
+                status, error = "failed", str(e)[:1000]
+                logger.error(f"[scheduler] {job.id} failed: {e}")
+            await db.execute(
+                update(ScheduledRun).where(ScheduledRun.id == run_id)
+                .values(status=status, error=error, finished_at=datetime.now(dt_timezone.utc))
+            )
+            await db.commit()
+        logger.info(f"[scheduler] {job.id} {status} for {slot.isoformat()}")
+        return status
+
+    def add_jobs(self) -> None:
+        for job in self.jobs:
+            trigger = IntervalTrigger(
+                seconds=job.period,
+                start_date=datetime.fromtimestamp(0, tz=dt_timezone.utc),  # fire on slot boundaries
+                jitter=job_jitter(job),
+            )
+            self.scheduler.add_job(self.run_job, trigger, args=[job], id=job.id, replace_existing=True)
+
+    async def elect(self) -> bool:
+        """One election round: takes or keeps leadership and resumes/pauses the scheduler to match."""
+        if self.is_leader:
+            if not await self.lock.held():
+                self.is_leader = False
+                self.scheduler.pause()
+                logger.warning(f"[scheduler] Lost the leader lock on {HOST}, pausing")
+        else:
+            try:
+                acquired = await self.lock.acquire()
+            except Exception as e:
+                logger.warning(f"[scheduler] Leader election failed: {e}")
+                acquired = False
+            if acquired:
+                self.is_leader = True
+                self.scheduler.resume()
+                logger.info(f"[scheduler] {HOST} is the scheduler leader")
+        return self.is_leader
+
+    async def run(self) -> None:
+        """Background loop started from the app lifespan."""
+        self.add_jobs()
+        self.scheduler.start(paused=True)
+        try:
+            while True:
+                await self.elect()
+                await asyncio.sleep(settings.SCHEDULER_LEADER_RETRY_SECONDS)
+        finally:
+            self.scheduler.shutdown(wait=False)
+            await self.lock.release()
+
+
+async def run_scheduler() -> None:
+    """Lifespan task: schedules the maintenance jobs while this worker is the leader."""
+    from app.db.session import AsyncSessionLocal, async_engine
 
-load_dotenv()
-BASE_API_URL = os.getenv("BASE_API_URL")
-
-def call_user_filter_api():
-    try:
-        url = f"{BASE_API_URL}/users/filter?skip=0&limit=10"
-        response = requests.get(url)
-        logging.info(f"Scheduled call result: {response.status_code} - {response.text}")
-    except Exception as e:
-        logging.error(f"Error calling /users/filter: {str(e)}")
-#
-# def call_user_filter_api():
-#     try:
-#         # Adjust query parameters as needed
-#         response = requests.get("http://127.0.0.1:8025/users/filter?skip=0&limit=10")
-#         logging.info(f"Scheduled call result: {response.status_code} - {response.text}")
-#     except Exception as e:
-#         logging.error(f"Error calling /users/filter: {str(e)}")
-
-def start_scheduler():
-    india_tz = timezone('Asia/Kolkata')
-    scheduler = BackgroundScheduler(timezone=india_tz)
-    # Trigger every day at 12:00 AM (midnight) IST hour=0, minute=0 means 00:00 hours = midnight
-
-    # scheduler.add_job(call_user_filter_api, 'cron', hour=0, minute=0)
-
-    scheduler.add_job(call_user_filter_api, 'cron', hour=11, minute=40)
-    scheduler.start()
+    await JobScheduler(LeaderLock(async_engine), AsyncSessionLocal).run()
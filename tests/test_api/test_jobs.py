@@ -1,5 +1,7 @@
 # tests/test_api/test_jobs.py
 
+import json
+
 import pytest
 from httpx import AsyncClient, ASGITransport
 from fastapi.testclient import TestClient
@@ -62,3 +64,280 @@ def test_fetch_jobs_with_types(test_client):
     data = response.json()
     assert isinstance(data, list)  # Ensure it's a list of jobs
     # assert len(data) <= 10  # Check that the number of jobs does not exceed the limit
+
+
+# Test for ranked full-text search
+def test_search_jobs(test_client):
+    response = test_client.get("/jobs/search?q=python developer&limit=5")
+    assert response.status_code == 200
+    data = response.json()
+    assert isinstance(data, list)
+    assert len(data) <= 5
+
+    # Results come best match first and carry highlight fragments
+    ranks = [job["rank"] for job in data]
+    assert ranks == sorted(ranks, reverse=True)
+    for job in data:
+        assert "snippet" in job and "title_highlight" in job
+
+
+def test_search_jobs_requires_query(test_client):
+    # The search text is mandatory and must not be empty
+    response = test_client.get("/jobs/search")
+    assert response.status_code == 422
+    response = test_client.get("/jobs/search?q=")
+    assert response.status_code == 422
+
+
+# Databases without a full-text index fall back to an unranked substring search
+@pytest.mark.asyncio
+async def test_search_jobs_like_fallback():
+    from app.crud.job import _like_search
+    from app.db.session import AsyncSessionLocal
+
+    async def _like_search_all(q):
+        async with AsyncSessionLocal() as db:
+            return await _like_search(db, q, skip=0, limit=10000)
+
+    async with AsyncSessionLocal() as db:
+        jobs = await _like_search(db, "a e", skip=0, limit=5)
+        assert await _like_search(db, "%", skip=0, limit=5) == []
+    assert len(jobs) <= 5 and [job["id"] for job in jobs] == sorted(job["id"] for job in jobs)
+    for job in jobs:
+        assert job["rank"] == 0.0 and job["title_highlight"] == job["title"]
+        word = job["title"].split()[0]
+        assert job["id"] in {hit["id"] for hit in await _like_search_all(word.upper())}
+
+
+# Test for skill-based candidate matching
+def test_job_candidates(test_client):
+    # An unknown job has no candidates
+    response = test_client.get("/jobs/0/candidates?k=5")
+    assert response.status_code == 404
+
+    # k is bounded so one call can not rank the whole resume table
+    response = test_client.get("/jobs/1/candidates?k=1000")
+    assert response.status_code == 422
+
+
+# Test for bulk ingestion: invalid rows are reported by line and nothing is written for them
+def test_bulk_ingest_reports_invalid_rows(test_client):
+    body = '{"title": "No description"}\n{not json\n\n{"title": "T", "description": "D", "company": "C", "location": "L", "posted_by": "x"}\n'
+    response = test_client.post("/jobs/bulk", content=body, headers={"Content-Type": "application/x-ndjson"})
+    assert response.status_code == 200
+
+    report = response.json()
+    assert report["received"] == 3
+    assert report["failed"] == 3
+    assert report["inserted"] == report["updated"] == 0
+    assert [error["line"] for error in report["errors"]] == [1, 2, 4]
+
+    # Only NDJSON and CSV uploads are accepted
+    response = test_client.post("/jobs/bulk", content="<jobs/>", headers={"Content-Type": "application/xml"})
+    assert response.status_code == 415
+
+
+# Test for the skills filter: every returned job requires the skill (any) or all the skills (all)
+def test_fetch_jobs_with_skills(test_client):
+    response = test_client.get("/jobs/filter?skills=Python,%20SQL&match=any&limit=50")
+    assert response.status_code == 200
+    for job in response.json():
+        assert {"python", "sql"} & {skill.lower() for skill in job["required_skills"]}
+
+    response = test_client.get("/jobs/filter?skills=python,sql&match=all&limit=50")
+    assert response.status_code == 200
+    for job in response.json():
+        assert {"python", "sql"} <= {skill.lower() for skill in job["required_skills"]}
+
+    response = test_client.get("/jobs/filter?skills=python&match=some&limit=50")
+    assert response.status_code == 422
+
+
+# Test for salary parsing: amounts, units and currencies normalize to yearly numbers
+def test_parse_salary_range():
+    from app.db.salary import parse_salary_range
+
+    assert parse_salary_range(["1200000", "1800000"]) == (1200000, 1800000, "INR")
+    assert parse_salary_range(["12 LPA", "18 LPA"]) == (1200000, 1800000, "INR")
+    assert parse_salary_range(["$60-80k"]) == (60000, 80000, "USD")
+    assert parse_salary_range(["negotiable"]) == (None, None, None)
+
+
+# Test for the salary filter and the highest-paying-first order
+def test_fetch_jobs_by_salary(test_client):
+    response = test_client.get("/jobs/filter?salary_min=1000000&currency=INR&sort=-salary&limit=50")
+    assert response.status_code == 200
+    jobs = response.json()
+    assert all(job["salary_max"] >= 1000000 and job["salary_currency"] == "INR" for job in jobs)
+    assert [job["salary_max"] for job in jobs] == sorted((job["salary_max"] for job in jobs), reverse=True)
+
+    # Jobs without a parsed salary never match a salary filter, on any dialect
+    from sqlalchemy import select
+    from sqlalchemy.dialects import postgresql
+    from app.db.models.job import Job
+    from app.db.salary import salary_filter
+    sql = str(select(Job.id).where(salary_filter(Job.salary_min, Job.salary_max, 1, None, "postgresql"))
+              .compile(dialect=postgresql.dialect()))
+    assert "jobs.salary_min IS NOT NULL" in sql
+
+    # An inverted range is rejected rather than failing on Postgres
+    assert test_client.get("/jobs/filter?salary_min=20&salary_max=10&limit=5").status_code == 422
+    assert test_client.get("/jobs/facets?salary_min=20&salary_max=10").status_code == 422
+
+
+# Test for canonical locations/companies: spellings of the same place or company share one key
+def test_entity_keys():
+    from app.services.entities import company_key, location_key
+
+    assert location_key("Bengaluru, Karnataka") == location_key("  bengaluru ")
+    assert company_key("The Acme Labs Pvt. Ltd.") == company_key("ACME LABS") == "acme labs"
+    assert company_key("Corp") == "corp"
+
+
+# Test for the location filter: an alias and a typo resolve to the same canonical location
+def test_fetch_jobs_by_location_alias(test_client):
+    canonical = test_client.get("/jobs/filter?location=Bangalore&limit=50&count=exact")
+    alias = test_client.get("/jobs/filter?location=Bengaluru&limit=50&count=exact")
+    typo = test_client.get("/jobs/filter?location=Bangalor&limit=50&count=exact")
+    assert canonical.status_code == alias.status_code == typo.status_code == 200
+    assert canonical.json() == alias.json() == typo.json()
+    assert canonical.headers["X-Total-Count"] == alias.headers["X-Total-Count"]
+
+
+# Test for facet counts: one request returns the total and the top values of every facet
+def test_job_facets(test_client):
+    response = test_client.get("/jobs/facets?skills=python&top=5")
+    assert response.status_code == 200
+    facets = response.json()
+    assert set(facets) == {"total", "company", "location", "skill", "salary"}
+    for name in ("company", "location", "skill", "salary"):
+        assert len(facets[name]) <= 5
+        assert all(value["count"] <= facets["total"] for value in facets[name])
+    if facets["total"]:
+        # Every job in the filter set requires python, so it tops the skill facet
+        assert facets["skill"][0]["value"] == "python"
+        assert facets["skill"][0]["count"] == facets["total"]
+
+
+# The batch endpoint keeps the requested order and marks unknown ids
+def test_batch_jobs(test_client):
+    jobs = test_client.get("/jobs/?limit=2").json()
+    ids = [job["id"] for job in jobs] + [0]
+    response = test_client.get(f"/jobs/batch?ids={','.join(map(str, reversed(ids)))}")
+    assert response.status_code == 200
+    items = response.json()
+    assert [item["id"] for item in items] == list(reversed(ids))
+    assert items[0] == {"id": 0, "found": False, "data": None}
+    assert all(item["found"] and item["data"]["id"] == item["id"] for item in items[1:])
+
+    assert test_client.get("/jobs/batch?ids=1,x").status_code == 400
+
+
+# List pages and the export leave description out unless it is asked for, and return only requested fields
+def test_jobs_fields_projection(test_client):
+    jobs = test_client.get("/jobs/?limit=5").json()
+    assert all("description" not in job and "title" in job for job in jobs)
+
+    response = test_client.get("/jobs/filter?limit=5&sort=title&fields=company")
+    assert response.status_code == 200
+    assert all(set(job) == {"id", "title", "company"} for job in response.json())
+
+    assert all("description" in job for job in test_client.get("/jobs/?limit=5&fields=*").json())
+    assert test_client.get("/jobs/?limit=5&fields=nope").status_code == 400
+
+    streamed = [json.loads(line) for line in test_client.get("/jobs/stream").text.splitlines()]
+    assert all("description" not in job for job in streamed)
+    streamed = [json.loads(line) for line in test_client.get("/jobs/stream?fields=*").text.splitlines()]
+    assert all("description" in job for job in streamed)
+
+
+# Pages and items carry ETags from the row versions; a matching If-None-Match gets an empty 304
+def test_jobs_conditional_get(test_client):
+    response = test_client.get("/jobs/filter?limit=5")
+    etag = response.headers["ETag"]
+    assert etag.startswith('W/"')  # weak: the same tag is sent for the gzip and identity encodings
+    assert all("version" not in job for job in response.json())
+    response = test_client.get("/jobs/filter?limit=5&count=exact", headers={"If-None-Match": etag})
+    assert response.status_code == 304 and response.content == b""
+    assert "X-Total-Count" not in response.headers  # answered before the count
+    assert test_client.get("/jobs/filter?limit=5&fields=company", headers={"If-None-Match": etag}).status_code == 200
+
+    jobs = test_client.get("/jobs/?limit=1")
+    if not jobs.json():
+        return
+    item = test_client.get(f"/jobs/jobs/{jobs.json()[0]['id']}")
+    assert item.headers["ETag"].startswith('W/"jobs-')
+    assert test_client.get(f"/jobs/jobs/{jobs.json()[0]['id']}",
+                           headers={"If-None-Match": item.headers["ETag"]}).status_code == 304
+    assert test_client.get("/jobs/?limit=1", headers={"If-None-Match": jobs.headers["ETag"]}).status_code == 304
+
+
+# An ad-hoc upsert of a new job does not make refresh skip the jobs inserted before it
+@pytest.mark.asyncio
+async def test_skill_index_refresh_after_adhoc_upsert(tmp_path):
+    from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+    from app.db.models.job import Base, Job
+    from app.services.matching import SkillIndex
+
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'jobs.db'}")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    async with async_sessionmaker(engine)() as db:
+        db.add_all([Job(id=i, title="t", description=f"d{i}", company="c", location="l", required_skills=["python"])
+                    for i in range(1, 4)])
+        await db.commit()
+        index = SkillIndex(Job.id, Job.required_skills)
+        index.upsert(3, ["python"])
+        await index.refresh(db, force=True)
+    assert len(index) == 3 and index.high_water == 3
+    await engine.dispose()
+
+
+# A description repeated in an upload counts as an update, and written jobs go straight into the matching index
+def test_bulk_ingest_duplicates_and_matching_index(test_client):
+    import uuid
+    from sqlalchemy import select
+    from app.db.models.job import Job
+    from app.db.session import engine
+    from app.services.matching import matching_engine
+
+    description = f"Bulk test {uuid.uuid4().hex}"
+    rows = [{"title": "T", "description": description, "company": "C", "location": "L", "posted_by": 1,
+             "required_skills": skills} for skills in (["go"], ["rust", "go"])]
+    body = "\n".join(json.dumps(row) for row in rows)
+    report = test_client.post("/jobs/bulk", content=body, headers={"Content-Type": "application/x-ndjson"}).json()
+    assert (report["received"], report["inserted"], report["updated"], report["failed"]) == (2, 1, 1, 0)
+
+    with engine.connect() as conn:
+        job_id = conn.execute(select(Job.id).where(Job.description == description)).scalar_one()
+    assert sorted(matching_engine.jobs.skills_of(job_id)) == ["go", "rust"]
+
+
+# A batch the database rejects is reported with its line range; the other batches are still written
+@pytest.mark.asyncio
+async def test_bulk_ingest_reports_failed_batch(monkeypatch):
+    from app.db.session import AsyncSessionLocal
+    from app.services import job_ingest
+
+    calls = []
+
+    async def write_batch(db, rows):
+        calls.append(len(rows))
+        if len(calls) == 2:
+            raise RuntimeError("connection lost")
+        return 0, len(rows), []
+
+    monkeypatch.setattr(job_ingest, "BULK_BATCH_SIZE", 2)
+    monkeypatch.setattr(job_ingest, "write_batch", write_batch)
+
+    async def upload():
+        for i in range(5):
+            yield json.dumps({"title": "T", "description": f"D{i}", "company": "C", "location": "L",
+                              "posted_by": 1}).encode() + b"\n"
+
+    async with AsyncSessionLocal() as db:
+        report = await job_ingest.ingest_jobs(db, upload(), "ndjson")
+    assert calls == [2, 2, 1]
+    assert (report["received"], report["updated"], report["failed"]) == (5, 3, 2)
+    assert report["errors"] == [{"line": 3, "last_line": 4,
+                                 "error": "batch not written, the database rejected it (RuntimeError)"}]
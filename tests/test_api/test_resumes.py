@@ -0,0 +1,125 @@
+# tests/test_api/test_resumes.py
+
+import pytest
+from fastapi.testclient import TestClient
+from app.main import app  # Import the FastAPI app
+from app.services.resume_parser import extract_fields
+
+
+@pytest.fixture(scope="module")
+def test_client():
+    with TestClient(app) as client:  # Initialize the TestClient with the FastAPI app
+        yield client  # Return the client instance to be used in tests
+
+
+# The parser pulls skills, experience and education out of plain resume text
+def test_extract_resume_fields():
+    text = "Priya Sharma\nSenior Backend Engineer\n6+ years building APIs with Python, FastAPI and PostgreSQL.\nB.Tech Computer Science, 2015"
+    fields = extract_fields(text)
+
+    assert fields["extracted_skills"] == ["fastapi", "postgresql", "python"]
+    assert fields["experience"] == {"title": "Senior Backend Engineer", "years": 6}
+    assert fields["education"] == {"degree": "B.Tech", "year": 2015}
+
+
+# The ingest endpoint only reads below RESUME_ROOT
+def test_resume_ingest_rejects_outside_root(test_client):
+    response = test_client.post("/Resumes/ingest?directory=../../etc")
+    assert response.status_code in (400, 404)
+
+    response = test_client.get("/Resumes/ingest/unknown-run")
+    assert response.status_code == 404
+
+
+# Texts stored inline by older versions are moved, compressed, to resume_texts and the column dropped
+@pytest.mark.asyncio
+async def test_move_resume_texts(tmp_path, monkeypatch):
+    from sqlalchemy import inspect, select, text
+    from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+    from sqlalchemy.orm import joinedload
+    from app.crud.resume import get_resume_by_id, get_resumes_by_ids
+    from app.db.models.resume import Base, Resume
+    from app.services import resume_texts
+    from app.services.resume_texts import move_resume_texts
+
+    monkeypatch.setattr(resume_texts, "_legacy_column", None)
+
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'resumes.db'}")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+        await conn.execute(text("ALTER TABLE resumes ADD COLUMN parsed_text VARCHAR"))
+        await conn.execute(
+            text("INSERT INTO resumes (id, user_id, original_file_path, parsed_text, extracted_skills) "
+                 "VALUES (:id, 1, :path, :text, '[]')"),
+            [{"id": i, "path": f"/r/{i}.txt", "text": f"Resume {i} " * 200} for i in range(1, 6)],
+        )
+
+    # Before the move, reads fall back to the old column
+    async with async_sessionmaker(engine)() as db:
+        assert [r.parsed_text for r in await get_resumes_by_ids(db, [1, 2])] == ["Resume 1 " * 200, "Resume 2 " * 200]
+
+    assert await move_resume_texts(engine, batch_size=2) == 5
+    async with engine.connect() as conn:
+        columns = await conn.run_sync(lambda c: {col["name"] for col in inspect(c).get_columns("resumes")})
+    assert "parsed_text" not in columns
+    assert await move_resume_texts(engine) == 0
+
+    async with async_sessionmaker(engine)() as db:
+        resumes = (await db.execute(select(Resume).options(joinedload(Resume.stored_text)).order_by(Resume.id))).scalars().all()
+        assert [resume.parsed_text for resume in resumes] == [f"Resume {i} " * 200 for i in range(1, 6)]
+        assert resumes[0].stored_text.size == len(resumes[0].parsed_text) > len(resumes[0].stored_text.data)
+    async with async_sessionmaker(engine)() as db:
+        # Without the text loaded (list pages, matching) nothing is read or decompressed
+        assert (await db.get(Resume, 1)).parsed_text is None
+
+    # A worker that still believes the column exists finds it dropped and checks again next time
+    monkeypatch.setattr(resume_texts, "_legacy_column", True)
+    async with async_sessionmaker(engine)() as db:
+        await db.execute(text("DELETE FROM resume_texts WHERE resume_id = 1"))
+        assert (await get_resume_by_id(db, 1)).parsed_text is None
+        assert resume_texts._legacy_column is None
+        assert (await get_resume_by_id(db, 2)).parsed_text == "Resume 2 " * 200
+    await engine.dispose()
+
+
+# A run keeps the first RESUME_MAX_REPORTED_ERRORS failures and only counts the rest
+@pytest.mark.asyncio
+async def test_resume_ingest_caps_errors(tmp_path, monkeypatch):
+    from app.db.session import AsyncSessionLocal
+    from app.services import resume_parser
+
+    monkeypatch.setattr(resume_parser, "RESUME_MAX_REPORTED_ERRORS", 3)
+    for i in range(5):
+        (tmp_path / f"cv_{i}.txt").write_text("")  # no text to extract
+
+    async with AsyncSessionLocal() as db:
+        run = await resume_parser.ingest_directory(db, str(tmp_path), workers=1)
+    report = run.to_dict()
+    assert report["status"] == "finished" and report["failed"] == 5
+    assert len(report["errors"]) == 3 and report["errors_truncated"]
+
+
+# Written resumes are upserted into the skill index, which keeps what it had loaded
+@pytest.mark.asyncio
+async def test_resume_ingest_updates_matching_index(tmp_path, monkeypatch):
+    from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+    from app.db.models.resume import Base, Resume
+    from app.services import resume_parser
+    from app.services.matching import SkillIndex
+
+    index = SkillIndex(Resume.id, Resume.extracted_skills)
+    index.upsert(1000, ["go"])
+    index.high_water = 1000
+    monkeypatch.setattr(resume_parser.matching_engine, "resumes", index)
+    (tmp_path / "7").mkdir()
+    (tmp_path / "7" / "cv.txt").write_text("Backend developer, 5 years of Python and SQL")
+
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'resumes.db'}")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    async with async_sessionmaker(engine)() as db:
+        run = await resume_parser.ingest_directory(db, str(tmp_path / "7"), workers=1, default_user_id=7)
+    await engine.dispose()
+    assert run.counts["written"] == 1
+    assert {"python", "sql"} <= set(index.skills_of(1))
+    assert index.skills_of(1000) == ["go"] and index.high_water == 1000
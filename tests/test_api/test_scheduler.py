@@ -0,0 +1,56 @@
+import pytest
+
+from app.core.logger import get_logger
+
+logger = get_logger("test_scheduler", log_file="log/test_scheduler.log")
+
+
+# Only one LeaderLock on the same lock file can lead at a time
+@pytest.mark.asyncio
+async def test_leader_lock_is_exclusive(tmp_path):
+    from scheduler import LeaderLock
+
+    lock_file = str(tmp_path / "scheduler.lock")
+    first, second = LeaderLock(lock_file=lock_file), LeaderLock(lock_file=lock_file)
+
+    assert await first.acquire()
+    assert not await second.acquire()
+    assert await first.held()
+
+    await first.release()
+    assert await second.acquire()
+    await second.release()
+
+
+# A slot is run once, even if a second worker fires the same job for it
+@pytest.mark.asyncio
+async def test_scheduled_job_runs_once_per_slot(tmp_path):
+    from sqlalchemy import select
+    from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+    from app.db.models.scheduler_run import Base, ScheduledRun
+    from scheduler import JobScheduler, LeaderLock, ScheduledJob
+
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'runs.db'}")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    session_factory = async_sessionmaker(engine, expire_on_commit=False)
+    calls = []
+
+    async def job_func(db):
+        calls.append(db)
+
+    async def failing(db):
+        raise RuntimeError("boom")
+
+    job = ScheduledJob("test_job", job_func, 86400)
+    workers = [JobScheduler(LeaderLock(lock_file=str(tmp_path / "lock")), session_factory, [job]) for _ in range(2)]
+    assert await workers[0].run_job(job) == "succeeded"
+    assert await workers[1].run_job(job) is None
+    assert len(calls) == 1
+    assert await workers[0].run_job(ScheduledJob("failing_job", failing, 86400)) == "failed"
+
+    async with session_factory() as db:
+        runs = {run.job_id: run for run in (await db.execute(select(ScheduledRun))).scalars()}
+    assert runs["test_job"].status == "succeeded" and runs["test_job"].finished_at is not None
+    assert runs["failing_job"].error == "boom"
+    await engine.dispose()
@@ -4,6 +4,7 @@ created_date:08-05-2025
 modified_date:09-05-2025
 Description:This test file uses httpx.AsyncClient
 """
+import json
 import pytest
 from httpx import AsyncClient, ASGITransport
 from app.main import app  # Import your FastAPI application
@@ -71,3 +72,232 @@ async def test_get_users_invalid_params_async():
         assert "detail" in response.json()
 
     logger.info("test_get_users_invalid_params_async completed.")
+
+# Keyset pagination: a cursor that was not issued by the API must be rejected
+@pytest.mark.asyncio
+async def test_get_users_invalid_cursor_async():
+    logger.info("Starting test_get_users_invalid_cursor_async")
+
+    transport = ASGITransport(app=app)
+
+    async with AsyncClient(transport=transport, base_url="http://test") as client:
+        # A malformed cursor should fail fast with 400 instead of reaching the database
+        response = await client.get("/users/?limit=10&cursor=not-a-cursor")
+        assert response.status_code == 400
+
+        # A cursor is only valid for the sort order it was issued for (this one is for sort=name)
+        response = await client.get("/users/?limit=10&cursor=eyJzIjoibmFtZSIsInYiOlsiVXNlcl8xIiwxXX0")
+        assert response.status_code == 400
+
+    logger.info("test_get_users_invalid_cursor_async completed.")
+
+# The shared response cache exposes its counters
+@pytest.mark.asyncio
+async def test_cache_stats_async():
+    transport = ASGITransport(app=app)
+
+    async with AsyncClient(transport=transport, base_url="http://test") as client:
+        response = await client.get("/cache/stats")
+        assert response.status_code == 200
+
+        stats = response.json()
+        for counter in ("hits", "misses", "evictions", "entries", "bytes", "max_bytes"):
+            assert counter in stats
+        assert stats["bytes"] <= stats["max_bytes"]
+
+# The warmer rebuilds hot entries about to expire, and drops results invalidated mid-flight
+@pytest.mark.asyncio
+async def test_cache_warmer_refreshes_hot_keys():
+    from contextlib import asynccontextmanager
+    from app.core.cache import ResponseCache
+    from app.core.warmer import CacheWarmer
+
+    cache = ResponseCache(max_bytes=1024 * 1024, default_ttl=300)
+    warmer = CacheWarmer(cache)
+    loads = []
+
+    async def loader(session):
+        loads.append(session)
+        return b"[1]", {"X-Next-Cursor": "c"}
+
+    @asynccontextmanager
+    async def session_factory():
+        yield "session"
+
+    await cache.set("hot", b"[0]", ttl=1)
+    warmer.track("hot", loader, ttl=300)
+    await cache.set("cold", b"[0]", ttl=1)
+    warmer.track("cold", loader, ttl=300)
+    for _ in range(3):
+        warmer.hit("hot")
+
+    assert await warmer.run_round(session_factory, pool_busy=lambda: False) == 1
+    assert (await cache.get("hot")).body == b"[1]"
+    assert cache.expires_in("hot") > 200
+    assert (await cache.get("cold")).body == b"[0]"
+    assert loads == ["session"]
+
+    # A busy pool skips the round entirely
+    assert await warmer.run_round(session_factory, pool_busy=lambda: True) == 0
+
+# The NDJSON export emits one full user object per line, with the same fields as the list pages
+@pytest.mark.asyncio
+async def test_stream_users_async():
+    transport = ASGITransport(app=app)
+
+    async with AsyncClient(transport=transport, base_url="http://test") as client:
+        response = await client.get("/users/stream?batch_size=100")
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("application/x-ndjson")
+
+        lines = [line for line in response.text.split("\n") if line]
+        for line in lines[:10]:
+            user = json.loads(line)
+            assert set(user) == {"id", "name", "email", "role"}
+
+# count=exact reports the filtered total in X-Total-Count; the default skips counting
+@pytest.mark.asyncio
+async def test_fetch_users_total_count_async():
+    transport = ASGITransport(app=app)
+
+    async with AsyncClient(transport=transport, base_url="http://test") as client:
+        response = await client.get("/users/filter?limit=5&count=exact")
+        assert response.status_code == 200
+        total = int(response.headers["x-total-count"])
+        assert total >= len(response.json())
+
+        response = await client.get("/users/filter?limit=5")
+        assert response.status_code == 200
+        assert "x-total-count" not in response.headers
+
+        response = await client.get("/users/filter?limit=5&count=estimate")
+        assert response.status_code == 200
+        assert int(response.headers["x-total-count"]) == total
+
+# /metrics reports per-route latency and DB usage in the Prometheus text format
+@pytest.mark.asyncio
+async def test_metrics_async():
+    transport = ASGITransport(app=app)
+
+    async with AsyncClient(transport=transport, base_url="http://test") as client:
+        response = await client.get("/users/filter?limit=5")
+        assert response.status_code == 200
+
+        response = await client.get("/metrics")
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/plain")
+
+        body = response.text
+        # Requests are labelled by route template, not by raw path
+        assert 'http_request_duration_seconds_count{method="GET",route="/users/filter"}' in body
+        assert 'http_request_db_queries_bucket{method="GET",route="/users/filter",le="+Inf"}' in body
+        assert "cache_hit_ratio" in body
+
+# Log records are written as one JSON object per line, with `extra=` fields kept
+def test_json_log_format():
+    import logging
+    from app.core.logger import JsonFormatter
+
+    record = logging.LogRecord("users", logging.INFO, __file__, 1, "Retrieved %s users", (3,), None)
+    record.route = "/users/filter"
+    entry = json.loads(JsonFormatter().format(record))
+    assert entry["message"] == "Retrieved 3 users"
+    assert entry["level"] == "INFO"
+    assert entry["route"] == "/users/filter"
+
+
+# Two workers over one shared store: an entry cached by one is served by the other,
+# and an invalidation by either reaches the other's local tier
+@pytest.mark.asyncio
+@pytest.mark.parametrize("backend", ["memory", "sqlite"])
+async def test_tiered_cache_shares_entries_and_invalidations(backend, tmp_path):
+    from app.core.cache import TieredCache
+    from app.core.shared_cache import MemorySharedCache, SqliteSharedCache
+
+    if backend == "memory":
+        shared = MemorySharedCache()
+        stores = [shared, shared]
+    else:
+        stores = [SqliteSharedCache(str(tmp_path / "l2.db"), max_bytes=1024 * 1024) for _ in range(2)]
+    first, second = (TieredCache(store, max_bytes=1024 * 1024, default_ttl=300) for store in stores)
+    await first.sync()
+    await second.sync()
+
+    await first.set("users_0_10", b"[1]", tags=["users", "users:list"], headers={"X-Next-Cursor": "c"})
+    cached = await second.get("users_0_10")
+    assert cached.body == b"[1]" and cached.headers == {"X-Next-Cursor": "c"}
+    assert second.stats()["l2_hits"] == 1
+
+    await first.invalidate("users:list")
+    assert await second.sync() == 1
+    assert await second.get("users_0_10") is None
+    for store in stores:
+        await store.close()
+
+
+# Deleting or re-tagging an entry of the in-process store leaves no stale key in its tag sets
+@pytest.mark.asyncio
+async def test_memory_shared_cache_drops_deleted_keys_from_tags():
+    from app.core.shared_cache import MemorySharedCache
+
+    store = MemorySharedCache()
+    await store.set("a", b"1", {}, ("users", "users:list"), ttl=60)
+    await store.set("b", b"2", {}, ("users",), ttl=60)
+    await store.delete("a")
+    assert store._tags == {"users": {"b"}}
+    await store.set("b", b"3", {}, ("jobs",), ttl=60)
+    assert store._tags == {"jobs": {"b"}}
+    await store.invalidate(("jobs",))
+    assert store._tags == {} and await store.get("b") is None
+
+
+# Concurrent misses share one load; an expired entry is served while one refresh runs
+@pytest.mark.asyncio
+async def test_cached_lookup_coalesces_and_serves_stale():
+    import asyncio
+    from contextlib import asynccontextmanager
+    from app.core.cache import ResponseCache
+    from app.core.coalesce import cached_lookup
+
+    cache = ResponseCache(max_bytes=1024 * 1024, default_ttl=300)
+    loads = []
+
+    async def loader(session):
+        loads.append(session)
+        await asyncio.sleep(0.05)
+        return f"[{len(loads)}]".encode(), {}
+
+    @asynccontextmanager
+    async def session_factory():
+        yield "session"
+
+    lookups = await asyncio.gather(*(cached_lookup("users_1", loader, ttl=300, tags=["users"], cache=cache,
+                                                   session_factory=session_factory) for _ in range(10)))
+    assert len(loads) == 1
+    assert {lookup.value.body for lookup in lookups} == {b"[1]"}
+
+    # Past its TTL but within the stale grace: served as-is, refreshed in the background
+    await cache.set("users_1", b"[old]", ttl=0, tags=["users"], stale_ttl=60)
+    lookup = await cached_lookup("users_1", loader, ttl=300, tags=["users"], cache=cache,
+                                 session_factory=session_factory)
+    assert (lookup.source, lookup.value.body) == ("stale", b"[old]")
+    await asyncio.sleep(0.1)  # let the background refresh finish
+    assert (await cache.get("users_1")).body == b"[2]"
+    assert len(loads) == 2
+
+# Filter values containing ":word" are plain text, also in the planner's EXPLAIN for count=estimate
+@pytest.mark.asyncio
+async def test_filter_value_with_colon_async():
+    from sqlalchemy import select
+    from sqlalchemy.dialects import postgresql
+    from app.core.counting import explain_sql
+    from app.db.models.user import User
+
+    query = select(User.id).where(User.name.like("%:abc%"))
+    assert "'%:abc%'" in explain_sql(query, postgresql.asyncpg.dialect())
+
+    transport = ASGITransport(app=app)
+    async with AsyncClient(transport=transport, base_url="http://test") as client:
+        response = await client.get("/users/filter", params={"name": ":abc", "limit": 5, "count": "estimate"})
+        assert response.status_code == 200
+        assert response.headers["x-total-count"] == "0"